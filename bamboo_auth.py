@@ -8,13 +8,7 @@ import time
 import json
 import logging
 import pyotp
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from bamboo_http_login import http_login
 
 # Configure logging
 logging.basicConfig(
@@ -29,9 +23,36 @@ username = os.getenv("BAMBOOHR_USERNAME", "bolaji+1@ccdocs.com")
 password = os.getenv("BAMBOOHR_PASSWORD", "AdminDev2025")
 totp_secret = os.getenv("BAMBOOHR_TOTP_SECRET", "ZVFC264YXJVN7SSD")
 subdomain = os.getenv("BAMBOOHR_SUBDOMAIN", "ccdocs")
+web_base = os.getenv("BAMBOOHR_WEB_BASE", f"https://{subdomain}.bamboohr.com")
+login_method = os.getenv("BAMBOOHR_LOGIN_METHOD", "auto")  # "auto" (HTTP, then browser), "http" or "browser"
 
 def authenticate_bamboohr():
-    """Authenticate with BambooHR and save cookies"""
+    """Authenticate with BambooHR and save cookies: plain HTTP login first, the browser as fallback"""
+    if login_method != "browser":
+        logger.info(f"Authenticating to BambooHR over HTTP as {username}")
+        headers, _, error = http_login(web_base, username, password, totp_secret)
+        if headers:
+            with open("bamboo_headers.json", "w") as f:
+                json.dump(headers, f)
+            logger.info("Saved headers to bamboo_headers.json")
+            return headers
+        logger.warning(f"HTTP login failed: {error}")
+        if login_method == "http":
+            return None
+        logger.info("Falling back to browser login")
+    return authenticate_with_browser()
+
+def authenticate_with_browser():
+    """Authenticate with BambooHR in Chrome and save cookies"""
+    # Selenium is only needed for this fallback, so slim installs can skip it
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     logger.info(f"Authenticating to BambooHR as {username}")
     
     # Configure Chrome
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+BambooHR HTTP Login
+
+Logs in to the BambooHR web app with plain HTTP requests instead of a browser.
+Each page of the login flow (login form, multi-factor code, "trust this
+browser") is fetched, the form it contains is filled in and posted back the
+way the browser would, and the resulting cookies become the same session
+headers bamboo_auth.py writes to bamboo_headers.json.
+
+A login takes a handful of requests and a few MB of memory, against 10-20
+seconds and a full Chrome for the Selenium login, which stays available as the
+fallback for pages this client does not recognise.
+"""
+
+import time
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+
+# Pages in the flow before landing on the home page: login, MFA, trusted browser (plus slack for redirects)
+MAX_LOGIN_PAGES = 6
+
+class _FormParser(HTMLParser):
+    """Collects every <form> on a page with its inputs and submit buttons."""
+
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self._button = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self.forms.append({"action": attrs.get("action", ""), "method": (attrs.get("method") or "get").upper(),
+                               "inputs": [], "buttons": []})
+        elif not self.forms:
+            return
+        elif tag == "input":
+            self.forms[-1]["inputs"].append(attrs)
+        elif tag == "button":
+            self._button = dict(attrs, text="")
+            self.forms[-1]["buttons"].append(self._button)
+
+    def handle_data(self, data):
+        if self._button is not None:
+            self._button["text"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "button":
+            self._button = None
+
+def _parse_forms(page_html):
+    parser = _FormParser()
+    parser.feed(page_html)
+    return parser.forms
+
+def _form_data(form, button=None):
+    """The values the browser would submit: hidden/prefilled inputs plus the clicked button."""
+    data = {}
+    for field in form["inputs"]:
+        if field.get("name") and field.get("type", "text").lower() not in ("submit", "button", "checkbox", "radio"):
+            data[field["name"]] = field.get("value", "")
+    if button and button.get("name"):
+        data[button["name"]] = button.get("value", "")
+    return data
+
+def _fill_login(forms, username, password):
+    for form in forms:
+        inputs = form["inputs"]
+        password_field = next((f for f in inputs if f.get("type", "").lower() == "password" and f.get("name")), None)
+        if not password_field:
+            continue
+        user_field = next((f for f in inputs if f.get("id") == "lemail" and f.get("name")), None) or \
+                     next((f for f in inputs if f.get("type", "text").lower() in ("email", "text") and f.get("name")), None)
+        if not user_field:
+            continue
+        data = _form_data(form)
+        data[user_field["name"]] = username
+        data[password_field["name"]] = password
+        return form, data
+    return None, None
+
+def _fill_mfa(forms, totp_secret):
+    import pyotp
+    for form in forms:
+        code_field = next((f for f in form["inputs"] if f.get("name") == "oneTimeCode"), None) or \
+                     next((f for f in form["inputs"] if f.get("type", "text").lower() in ("text", "number", "tel")
+                           and f.get("name")), None)
+        if code_field:
+            data = _form_data(form)
+            data[code_field["name"]] = pyotp.TOTP(totp_secret).now()
+            return form, data
+    return None, None
+
+def _fill_trust(forms):
+    for form in forms:
+        button = next((b for b in form["buttons"] if b["text"].strip().lower().startswith("yes")), None)
+        if button:
+            return form, _form_data(form, button)
+    return None, None
+
+def session_headers(session, base_url):
+    """bamboo_headers.json-shaped headers for a logged-in session."""
+    return {
+        "Cookie": "; ".join(f"{c.name}={c.value}" for c in session.cookies),
+        "X-Requested-With": "XMLHttpRequest",
+        "Referer": f"{base_url}/files/",
+        "Accept": "application/json, text/plain, */*",
+        "User-Agent": USER_AGENT,
+    }
+
+def http_login(base_url, username, password, totp_secret, timeout=30, session=None, session_cookie="PHPSESSID"):
+    """
+    Walk the BambooHR login flow with requests. Returns (headers, expires_at, error):
+    the session headers and the expiry of the session_cookie (None if it is a
+    session-only cookie) on success, or (None, None, reason) if the flow could not
+    be completed. Pass a fresh session to send the flow through a different transport.
+    """
+    if not all([username, password, totp_secret]):
+        return None, None, "Missing BambooHR credentials"
+    started = time.perf_counter()
+    session = session or requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    try:
+        page = session.get(f"{base_url}/login.php", timeout=timeout)
+        submitted = set()
+        for _ in range(MAX_LOGIN_PAGES):
+            path = urlsplit(page.url).path
+            if "home" in path:
+                break
+            if path in submitted:
+                # Back on a page we already filled in: the credentials or code were rejected
+                return None, None, f"Login rejected at {page.url}"
+            submitted.add(path)
+            forms = _parse_forms(page.text)
+            if "multi_factor_authentication" in path:
+                form, data = _fill_mfa(forms, totp_secret)
+            elif "trusted_browser" in path:
+                form, data = _fill_trust(forms)
+            else:
+                form, data = _fill_login(forms, username, password)
+            if not form:
+                return None, None, f"Unrecognised login page {page.url} (HTTP {page.status_code})"
+            action = urljoin(page.url, form["action"] or page.url)
+            if form["method"] == "POST":
+                page = session.post(action, data=data, timeout=timeout)
+            else:
+                page = session.get(action, params=data, timeout=timeout)
+        else:
+            return None, None, f"Login did not reach the home page (stopped at {page.url})"
+    except requests.exceptions.RequestException as e:
+        return None, None, f"Login request failed: {e}"
+    finally:
+        session.close()
+
+    # Only the session cookie's expiry counts: the others (load balancer, MFA state) can expire in minutes
+    expiries = [c.expires for c in session.cookies if c.name == session_cookie and c.expires]
+    logger.info(f"HTTP login completed in {time.perf_counter() - started:.2f}s")
+    return session_headers(session, base_url), (max(expiries) if expiries else None), None
@@ -3,8 +3,6 @@ BambooHR Job Titles Extractor (with .env support)
 Author: CC Docs Assistant
 """
 
-import requests
-from requests.auth import HTTPBasicAuth
 from dotenv import load_dotenv
 import os
 import sys
@@ -24,45 +22,32 @@ if not API_KEY or not SUBDOMAIN:
     print("❌ Missing BAMBOOHR_API_KEY or BAMBOOHR_SUBDOMAIN in your .env file")
     sys.exit(1)
 
+# Imported after load_dotenv() so the snapshot settings in .env apply
+from directory_snapshot import DirectorySnapshot
+
 # ============
 # FUNCTION
 # ============
 
 def get_unique_job_titles():
-    # 1. Build URL
-    url = f"https://api.bamboohr.com/api/gateway.php/{SUBDOMAIN}/v1/employees/directory"
-    print(f"📌 Requesting URL: {url}")
+    # Served from the shared local snapshot; only syncs with BambooHR when stale
+    snapshot = DirectorySnapshot(SUBDOMAIN, API_KEY)
+    print(f"📌 Reading directory snapshot: {snapshot.path}")
 
-    # 2. Make GET request
     try:
-        response = requests.get(
-            url,
-            headers={
-                "Accept": "application/json"
-            },
-            auth=HTTPBasicAuth(API_KEY, "")
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            employees = data.get("employees", [])
-
-            job_titles = set()
-            for emp in employees:
-                job_title = emp.get("jobTitle")
-                if job_title and job_title.strip():
-                    job_titles.add(job_title.strip())
+        employees = snapshot.employees()
 
-            print("\n✅ Unique Job Titles:")
-            for title in sorted(job_titles):
-                print(f"- {title}")
+        job_titles = set()
+        for emp in employees:
+            job_title = emp.get("jobTitle")
+            if job_title and job_title.strip():
+                job_titles.add(job_title.strip())
 
-            print(f"\nTotal unique titles found: {len(job_titles)}")
+        print("\n✅ Unique Job Titles:")
+        for title in sorted(job_titles):
+            print(f"- {title}")
 
-        else:
-            print(f"❌ Error: HTTP {response.status_code}")
-            print(response.text)
-            sys.exit(1)
+        print(f"\nTotal unique titles found: {len(job_titles)}")
 
     except Exception as e:
         print(f"❌ Exception: {str(e)}")
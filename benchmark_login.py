@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Login Benchmark
+
+Compares the HTTP login (bamboo_http_login.py) with the Selenium browser login
+against the mock BambooHR login pages in mock_services.py: seconds per login
+and resident memory of the process tree that performed it.
+
+Each login runs in a fresh child process so the memory figures don't mix.
+Memory is the summed RSS of the child and its descendants (chromedriver and
+Chrome for the browser), sampled right after the login; it is read from /proc,
+so it is only reported on Linux.
+
+Usage:
+    python benchmark_login.py --runs 3 --methods http browser
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+def tree_rss_mb(pid):
+    """Summed RSS of a process and all its descendants, or None where /proc is unavailable."""
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+def child(method, base_url):
+    """Run one login in this process and print the result as JSON."""
+    os.environ.update({
+        "BAMBOOHR_WEB_BASE": base_url,
+        "BAMBOOHR_LOGIN_METHOD": method,
+    })
+    # Logins save bamboo_headers.json to the working directory; keep the real one untouched
+    os.chdir(tempfile.mkdtemp(prefix="login_benchmark_"))
+    sys.path.insert(0, script_dir)
+    if method == "http":
+        from bamboo_http_login import http_login
+        started = time.perf_counter()
+        headers, _, error = http_login(base_url, "mock@example.com", "mock", "JBSWY3DPEHPK3PXP")
+        ok = bool(headers)
+        rss = tree_rss_mb(os.getpid())
+    else:
+        import onboard
+        manager = onboard.BambooHRManager(subdomain="mock", api_key="mock", username="mock@example.com",
+                                          password="mock", totp_secret="JBSWY3DPEHPK3PXP", template_id="319")
+        # Includes the browser launch: the first login of a run pays it
+        started = time.perf_counter()
+        ok = manager._create_new_session()
+        error = None if ok else "browser login failed (see log)"
+        # Measure while the warm browser is still running
+        rss = tree_rss_mb(os.getpid())
+        onboard.LOGIN_BROWSER.discard()
+    print(json.dumps({"ok": ok, "seconds": time.perf_counter() - started, "rss_mb": rss, "error": error}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTTP and browser logins against the mock BambooHR login")
+    parser.add_argument("--runs", type=int, default=3, help="logins per method")
+    parser.add_argument("--methods", nargs="+", choices=["http", "browser"], default=["http", "browser"])
+    parser.add_argument("--child", nargs=2, metavar=("METHOD", "BASE_URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    from benchmark_onboard import start_mock_process
+    proc, base_url = start_mock_process(0.0)
+    try:
+        print(f"Mock login pages at {base_url}\n")
+        print(f"{'method':>8} {'runs':>5} {'ok':>4} {'avg s':>8} {'max s':>8} {'RSS MB':>8}")
+        for method in args.methods:
+            results, error = [], None
+            for _ in range(args.runs):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", method, base_url],
+                                     capture_output=True, text=True)
+                lines = out.stdout.strip().splitlines()
+                errors = [line for line in out.stderr.splitlines() if "ERROR" in line or "Error" in line]
+                result = json.loads(lines[-1]) if lines else {"ok": False}
+                if not result["ok"] and errors:
+                    result["error"] = errors[-1].split(" - ")[-1][:160]
+                results.append(result)
+                error = error or result.get("error")
+            done = [r for r in results if r["ok"]]
+            if done:
+                seconds = [r["seconds"] for r in done]
+                rss = max((r["rss_mb"] for r in done if r["rss_mb"] is not None), default=None)
+                print(f"{method:>8} {len(results):>5} {len(done):>4} {sum(seconds) / len(seconds):>8.2f} "
+                      f"{max(seconds):>8.2f} {rss if rss is None else round(rss):>8}")
+            else:
+                print(f"{method:>8} {len(results):>5} {0:>4}   unavailable: {error}")
+            sys.stdout.flush()
+    finally:
+        proc.terminate()
+
+if __name__ == "__main__":
+    main()
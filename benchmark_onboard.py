@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Onboarding Throughput Benchmark
+
+Runs the real onboard.py pipeline against the local mock in mock_services.py
+and reports hires per minute for several worker counts. The mock runs in its
+own process so it does not compete with the pipeline for the GIL.
+
+Rate budgets are disabled by default so the numbers show what the pipeline
+itself can do; export BAMBOOHR_RATE / WEBWORK_RATE / SHEETS_RATE to measure
+under production pacing instead.
+
+With --record the run is also written to a cassette (http_cassettes.py);
+with --replay the pipeline runs from a cassette instead of the mock, with the
+recorded (or a fixed) latency and optional injected failures, so the same
+traffic can be replayed against every concurrency or caching change.
+
+Usage:
+    python benchmark_onboard.py --hires 64 --latency 0.05 --workers 1 4 16 64
+    python benchmark_onboard.py --hires 64 --latency 0.05 --workers 16 --record run.jsonl
+    python benchmark_onboard.py --replay run.jsonl --workers 1 4 16 --error-rate 0.05
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import tempfile
+import subprocess
+
+import requests
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+def start_mock_process(latency):
+    """Launch mock_services.py on a free port and wait until it answers. Returns (process, base_url)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(script_dir, "mock_services.py"),
+         "--port", str(port), "--latency", str(latency), "--employees", "0", "--hires", "0"],
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base_url}/__mock/calls", timeout=1)
+            return proc, base_url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Mock server did not start")
+
+def configure_environment(base_url):
+    """Point onboard.py at the mock server. Must run before onboard is imported."""
+    os.environ.update({
+        "BAMBOOHR_API_BASE": f"{base_url}/api/gateway.php",
+        "BAMBOOHR_WEB_BASE": base_url,
+        "WEBWORK_URL": f"{base_url}/rest-api/users",
+        "WEBWORK_USERNAME": "mock",
+        "WEBWORK_PASSWORD": "mock",
+        "BAMBOOHR_API_KEY": "mock",
+        "SHEET_ID": "mock-sheet",
+        "SHEET_NAME": "Sheet1",
+        "BAMBOOHR_DIRECTORY_SNAPSHOT": os.path.join(tempfile.gettempdir(), f"onboard_benchmark_{os.getpid()}.sqlite3"),
+        "ENDPOINT_CAPABILITIES_FILE": os.path.join(tempfile.gettempdir(), f"onboard_benchmark_{os.getpid()}.json"),
+        "ONBOARD_JOURNAL": os.path.join(tempfile.gettempdir(), f"onboard_benchmark_{os.getpid()}.jsonl"),
+        "ONBOARD_REPORT": os.path.join(tempfile.gettempdir(), f"onboard_benchmark_{os.getpid()}_report.json"),
+    })
+    for var in ("BAMBOOHR_RATE", "WEBWORK_RATE", "SHEETS_RATE"):
+        os.environ.setdefault(var, "0")
+
+def build_mock_sheets(base_url):
+    """Real googleapiclient Sheets client whose endpoint is the mock server (through the cassette, if one is in use)."""
+    import httplib2
+    from googleapiclient.discovery import build
+    from http_cassettes import get_cassette, CassetteHttp
+    http = httplib2.Http()
+    if get_cassette() is not None:
+        http = CassetteHttp(get_cassette(), "sheets", http)
+    return build(
+        "sheets", "v4",
+        http=http,
+        client_options={"api_endpoint": f"{base_url}/"},
+        static_discovery=True,
+    ).spreadsheets()
+
+def run_once(onboard, base_url, args, workers):
+    """
+    Run one full batch on a fresh mock data set (or from the start of the cassette
+    when replaying). Returns (elapsed, successes, failures, calls, reuse).
+    """
+    if not args.replay:
+        requests.post(f"{base_url}/__mock/reset", json={
+            "employees": args.employees, "hires": args.hires, "completed": args.completed,
+        }).raise_for_status()
+    # Per-run caches would otherwise carry the previous data set into this run
+    onboard.EMPLOYEE_DIRECTORIES.clear()
+    onboard.WEBWORK_USERS = onboard.WebWorkUsers()
+    onboard.COMPENSATION_TABLES = onboard.CompensationTables()
+    for session in onboard.HTTP_SESSIONS.values():
+        session.close()
+    onboard.HTTP_SESSIONS.clear()
+    for var in ("BAMBOOHR_DIRECTORY_SNAPSHOT", "ENDPOINT_CAPABILITIES_FILE", "ONBOARD_JOURNAL"):
+        if os.path.exists(os.environ[var]):
+            os.remove(os.environ[var])
+    import endpoint_capabilities, hire_journal, http_cassettes
+    endpoint_capabilities._shared = None
+    hire_journal._shared = None
+    # A replay starts again from the first recording of every request
+    if args.replay:
+        http_cassettes._shared = None
+
+    manager = onboard.BambooHRManager(
+        subdomain=onboard.BAMBOO_SUB, api_key="mock", username=None, password=None,
+        totp_secret=None, template_id="319",
+    )
+    manager.headers = {"Cookie": "PHPSESSID=mock-session"}
+    manager.session_expires_at = time.time() + 3600
+    sheets = build_mock_sheets(base_url)
+
+    start = time.perf_counter()
+    successes, failures = onboard.run_onboarding(sheets, None, manager, workers=workers)
+    elapsed = time.perf_counter() - start
+    if args.replay:
+        calls = {service: totals["calls"] for service, totals in onboard.RUN_METRICS.service_totals().items()}
+        return elapsed, successes, failures, calls, None
+    calls = requests.get(f"{base_url}/__mock/calls").json()
+    stats = onboard.connection_stats().values()
+    reuse = sum(s["reused"] for s in stats) / max(1, sum(s["requests"] for s in stats))
+    return elapsed, successes, failures, calls, reuse
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark onboard.py against the local mock services")
+    parser.add_argument("--hires", type=int, default=64, help="pending rows in the mock sheet")
+    parser.add_argument("--employees", type=int, default=2500, help="existing employees in the mock directory")
+    parser.add_argument("--completed", type=int, default=0, help="already-processed rows in the mock sheet")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every mock request")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--record", metavar="CASSETTE", help="also record the runs into this cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="run from this cassette instead of the mock")
+    parser.add_argument("--replay-latency", default="recorded", help="replay: 'recorded' or seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="replay: share of requests failed on purpose")
+    parser.add_argument("--seed", default="0", help="replay: seed for the injected failures")
+    args = parser.parse_args()
+
+    if args.replay:
+        os.environ.update({
+            "ONBOARD_CASSETTE_MODE": "replay",
+            "ONBOARD_CASSETTE": args.replay,
+            "ONBOARD_REPLAY_LATENCY": args.replay_latency,
+            "ONBOARD_REPLAY_ERROR_RATE": str(args.error_rate),
+            "ONBOARD_REPLAY_SEED": args.seed,
+        })
+        proc, base_url = None, "http://replay.invalid"
+    else:
+        if args.record:
+            # One data set per cassette: recording several runs would interleave their traffic
+            if os.path.exists(args.record):
+                os.remove(args.record)
+            os.environ.update({"ONBOARD_CASSETTE_MODE": "record", "ONBOARD_CASSETTE": args.record})
+        proc, base_url = start_mock_process(args.latency)
+    try:
+        configure_environment(base_url)
+        import onboard
+        onboard.logger.setLevel(logging.ERROR)
+        logging.getLogger("googleapiclient").setLevel(logging.ERROR)
+        logging.getLogger("directory_snapshot").setLevel(logging.ERROR)
+        logging.getLogger("endpoint_capabilities").setLevel(logging.ERROR)
+        logging.getLogger("http_cassettes").setLevel(logging.ERROR)
+
+        if args.replay:
+            print(f"Replaying {args.replay}: {args.replay_latency} latency, {args.error_rate:.0%} injected failures\n")
+        else:
+            print(f"Mock services at {base_url}: {args.hires} hires, {args.employees} employees, "
+                  f"{args.latency * 1000:.0f} ms latency per request\n")
+        print(f"{'workers':>8} {'seconds':>9} {'hires/min':>10} {'ok':>5} {'failed':>7} {'calls/hire':>11} {'conn reuse':>11}")
+        for workers in args.workers:
+            elapsed, successes, failures, calls, reuse = run_once(onboard, base_url, args, workers)
+            hires = successes + failures if args.replay else args.hires
+            total_calls = sum(n for key, n in calls.items() if " " not in key)
+            print(f"{workers:>8} {elapsed:>9.2f} {hires / elapsed * 60:>10.1f} "
+                  f"{successes:>5} {failures:>7} {total_calls / max(hires, 1):>11.1f} "
+                  f"{'-' if reuse is None else format(reuse, '.0%'):>11}")
+            sys.stdout.flush()
+    finally:
+        if proc is not None:
+            proc.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Start-up Benchmark
+
+Measures how long a fresh onboard.py process takes to get to its first sheet
+read: the interpreter plus `import onboard`, setup_google_sheets() (credentials
+and the Sheets client built from the discovery document) and the first
+read_sheet_headers() call against the mock in mock_services.py. The target is
+under 300 ms.
+
+Each sample is a fresh child process. Three modes are measured:
+- full:  the whole bundled Sheets discovery document (SHEETS_DISCOVERY_CACHE empty)
+- cold:  the trimmed document, built and cached on this start
+- warm:  the trimmed document read from the cache
+
+The service-account key is generated for the run and its token_uri points at
+the mock, so the first read includes the real OAuth token exchange.
+
+Usage:
+    python benchmark_startup.py --runs 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+PROCESS_START = time.perf_counter()
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+TARGET_MS = 300
+
+def write_service_account(path, base_url):
+    """A throwaway service-account key file whose token endpoint is the mock."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    with open(path, "w") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "mock",
+            "private_key_id": "mock",
+            "private_key": pem,
+            "client_email": "onboard@mock.iam.gserviceaccount.com",
+            "client_id": "0",
+            "token_uri": f"{base_url}/token",
+        }, f)
+
+def child():
+    """Import onboard, build the Sheets client and read the headers; print the timings as JSON."""
+    started = time.perf_counter()
+    sys.path.insert(0, script_dir)
+    import onboard
+    imported = time.perf_counter()
+    sheets = onboard.setup_google_sheets()
+    built = time.perf_counter()
+    headers = onboard.read_sheet_headers(sheets)
+    read = time.perf_counter()
+    print(json.dumps({
+        "ok": bool(headers),
+        "error": None if headers else "empty header row",
+        # PROCESS_START is taken before this script's own imports, so interpreter start-up is excluded
+        "import_ms": (imported - started) * 1000,
+        "setup_ms": (built - imported) * 1000,
+        "read_ms": (read - built) * 1000,
+        "total_ms": (read - PROCESS_START) * 1000,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time onboard.py start-up to the first sheet read")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode")
+    parser.add_argument("--modes", nargs="+", choices=["full", "cold", "warm"], default=["full", "cold", "warm"])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child()
+
+    # Imported here rather than at the top so the children's import timings stay clean
+    import requests
+    from benchmark_onboard import start_mock_process, configure_environment
+    proc, base_url = start_mock_process(0.0)
+    workdir = tempfile.mkdtemp(prefix="startup_benchmark_")
+    try:
+        requests.post(f"{base_url}/__mock/reset", json={"employees": 0, "hires": 1}).raise_for_status()
+        configure_environment(base_url)
+        key_file = os.path.join(workdir, "service_account.json")
+        write_service_account(key_file, base_url)
+        cache_file = os.path.join(workdir, "sheets_discovery.json")
+        os.environ.update({
+            "GOOGLE_SERVICE_ACCOUNT_FILE": key_file,
+            "SHEETS_API_ENDPOINT": f"{base_url}/",
+            "ONBOARD_LOG_FILE": "",
+        })
+
+        print(f"Mock sheet at {base_url}, target {TARGET_MS} ms to the first read\n")
+        print(f"{'mode':>6} {'runs':>5} {'import':>8} {'setup':>8} {'read':>8} {'total':>8} {'wall':>8}   (median ms)")
+        for mode in args.modes:
+            env = dict(os.environ, SHEETS_DISCOVERY_CACHE="" if mode == "full" else cache_file)
+            results, error = [], None
+            for _ in range(args.runs):
+                if mode == "cold" and os.path.exists(cache_file):
+                    os.remove(cache_file)
+                started = time.perf_counter()
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                                     capture_output=True, text=True, env=env)
+                wall_ms = (time.perf_counter() - started) * 1000
+                lines = out.stdout.strip().splitlines()
+                result = json.loads(lines[-1]) if lines else {"ok": False, "error": out.stderr.strip()[-300:]}
+                if result["ok"]:
+                    results.append({**result, "wall_ms": wall_ms})
+                else:
+                    error = error or result.get("error")
+            if not results:
+                print(f"{mode:>6} {args.runs:>5}   failed: {error}")
+                continue
+            medians = [statistics.median(r[k] for r in results)
+                       for k in ("import_ms", "setup_ms", "read_ms", "total_ms", "wall_ms")]
+            verdict = "ok" if medians[3] < TARGET_MS else "over target"
+            print(f"{mode:>6} {len(results):>5} " + " ".join(f"{m:>8.0f}" for m in medians) + f"   {verdict}")
+            sys.stdout.flush()
+        print("\ntotal: from process start to the first read (excluding interpreter start-up); "
+              "wall: the whole child process, as seen by the parent")
+    finally:
+        proc.terminate()
+
+if __name__ == "__main__":
+    main()
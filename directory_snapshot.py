@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+BambooHR Directory Snapshot
+
+Keeps a local SQLite copy of the BambooHR employee directory so onboard.py and
+the bamboohr_* helper scripts don't each download the whole directory on startup.
+
+- A snapshot younger than the TTL is read straight from disk (milliseconds).
+- An older snapshot is brought up to date with BambooHR's changed-since feed
+  (/v1/employees/changed), fetching only the employees that changed.
+- With no snapshot, or too many changes to replay, the full directory is fetched.
+- Employees added locally (hires created during a run) are marked partial and
+  fetched in full by the next sync, whether or not the feed lists them.
+
+Environment Variables (optional):
+- BAMBOOHR_DIRECTORY_SNAPSHOT: Path of the SQLite file (default: bamboo_directory.sqlite3 next to this script)
+- BAMBOOHR_DIRECTORY_TTL: Seconds a snapshot is served without checking for changes (default: 900)
+- BAMBOOHR_API_BASE: BambooHR API base URL (default: https://api.bamboohr.com/api/gateway.php)
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import datetime
+import threading
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+logger = logging.getLogger(__name__)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+SNAPSHOT_PATH = os.getenv("BAMBOOHR_DIRECTORY_SNAPSHOT", os.path.join(script_dir, "bamboo_directory.sqlite3"))
+SNAPSHOT_TTL  = float(os.getenv("BAMBOOHR_DIRECTORY_TTL", "900"))
+API_BASE      = os.getenv("BAMBOOHR_API_BASE", "https://api.bamboohr.com/api/gateway.php")
+
+# Fields requested for a single changed employee, matching the directory payload
+DIRECTORY_FIELDS = "displayName,firstName,lastName,preferredName,jobTitle,workEmail,department,division,location,supervisorId"
+
+# Replaying more changes than this costs more than one full directory fetch
+MAX_INCREMENTAL_CHANGES = 200
+
+class DirectorySnapshot:
+    """
+    SQLite-backed snapshot of one subdomain's employee directory.
+    `request` is the callable used for HTTP calls, with the signature of
+    requests.request; onboard.py passes its rate-budgeted client instead.
+    """
+    def __init__(self, subdomain, api_key, path=SNAPSHOT_PATH, ttl=SNAPSHOT_TTL, request=requests.request):
+        self.subdomain = subdomain
+        self.api_key = api_key
+        self.path = path
+        self.ttl = ttl
+        self.request = request
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS employees (subdomain TEXT, id TEXT, data TEXT, PRIMARY KEY (subdomain, id))")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (subdomain TEXT, key TEXT, value TEXT, PRIMARY KEY (subdomain, key))")
+            # Employees known only from add(): missing fields like jobTitle and location until refetched
+            db.execute("CREATE TABLE IF NOT EXISTS partial (subdomain TEXT, id TEXT, PRIMARY KEY (subdomain, id))")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get(self, url, **kwargs):
+        response = self.request("GET", url, auth=HTTPBasicAuth(self.api_key, "x"),
+                                headers={"Accept": "application/json"}, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    # ── meta ──────────────────────────────────────────────────────────────────
+    def _meta(self, db, key):
+        row = db.execute("SELECT value FROM meta WHERE subdomain = ? AND key = ?", (self.subdomain, key)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, db, key, value):
+        db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?, ?)", (self.subdomain, key, str(value)))
+
+    def age(self):
+        """Seconds since the snapshot was last synced with BambooHR, or None if there is none."""
+        with self._connect() as db:
+            synced_at = self._meta(db, "synced_at")
+        return time.time() - float(synced_at) if synced_at else None
+
+    # ── reading ───────────────────────────────────────────────────────────────
+    def employees(self, force=False):
+        """
+        Return the directory as a list of employee dicts, syncing first if the
+        snapshot is missing or older than the TTL (or always, with force=True).
+        Raises requests.exceptions.RequestException if a needed sync fails.
+        """
+        with self._lock:
+            age = self.age()
+            if force or age is None or age > self.ttl:
+                self._sync()
+            else:
+                logger.info(f"Using directory snapshot from {age:.0f}s ago")
+            with self._connect() as db:
+                rows = db.execute("SELECT data FROM employees WHERE subdomain = ?", (self.subdomain,)).fetchall()
+            return [json.loads(data) for (data,) in rows]
+
+    # ── syncing ───────────────────────────────────────────────────────────────
+    def _sync(self):
+        with self._connect() as db:
+            since = self._meta(db, "changed_since")
+        started = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        if since and self._sync_changes(since, started):
+            return
+        self._sync_full(started)
+
+    def _sync_full(self, started):
+        logger.info("Fetching full employee directory from BambooHR API...")
+        directory = self._get(f"{API_BASE}/{self.subdomain}/v1/employees/directory")
+        employees = directory.get("employees", [])
+        with self._connect() as db:
+            db.execute("DELETE FROM employees WHERE subdomain = ?", (self.subdomain,))
+            db.executemany("INSERT INTO employees VALUES (?, ?, ?)",
+                           [(self.subdomain, str(e.get("id")), json.dumps(e)) for e in employees])
+            db.execute("DELETE FROM partial WHERE subdomain = ?", (self.subdomain,))
+            self._set_meta(db, "changed_since", started)
+            self._set_meta(db, "synced_at", time.time())
+        logger.info(f"Saved directory snapshot with {len(employees)} employees")
+
+    def _sync_changes(self, since, started):
+        """Apply the changed-since feed to the snapshot. Returns False if a full fetch is needed instead."""
+        try:
+            feed = self._get(f"{API_BASE}/{self.subdomain}/v1/employees/changed/", params={"since": since})
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Changed-employees feed unavailable, falling back to full fetch: {e}")
+            return False
+
+        changes = list((feed.get("employees") or {}).values())
+        # Partial rows are refetched too: a hire added after the feed's cut-off may not be listed yet
+        with self._connect() as db:
+            partial = {employee_id for (employee_id,) in
+                       db.execute("SELECT id FROM partial WHERE subdomain = ?", (self.subdomain,))}
+        partial -= {str(change.get("id")) for change in changes}
+        changes += [{"id": employee_id, "action": "Partial"} for employee_id in sorted(partial)]
+        if len(changes) > MAX_INCREMENTAL_CHANGES:
+            logger.info(f"{len(changes)} employees changed since {since}, doing a full fetch instead")
+            return False
+
+        updated, deleted = [], []
+        for change in changes:
+            employee_id = str(change.get("id"))
+            if change.get("action") == "Deleted":
+                deleted.append(employee_id)
+                continue
+            employee = self._get(f"{API_BASE}/{self.subdomain}/v1/employees/{employee_id}",
+                                 params={"fields": DIRECTORY_FIELDS})
+            employee["id"] = employee_id
+            updated.append(employee)
+
+        with self._connect() as db:
+            db.executemany("DELETE FROM employees WHERE subdomain = ? AND id = ?",
+                           [(self.subdomain, employee_id) for employee_id in deleted])
+            db.executemany("INSERT OR REPLACE INTO employees VALUES (?, ?, ?)",
+                           [(self.subdomain, e["id"], json.dumps(e)) for e in updated])
+            db.executemany("DELETE FROM partial WHERE subdomain = ? AND id = ?",
+                           [(self.subdomain, employee_id) for employee_id in deleted + [e["id"] for e in updated]])
+            self._set_meta(db, "changed_since", feed.get("latest") or started)
+            self._set_meta(db, "synced_at", time.time())
+        logger.info(f"Directory snapshot refreshed: {len(updated)} changed, {len(deleted)} deleted since {since}")
+        return True
+
+    def add(self, employee):
+        """
+        Insert or replace one employee known only locally, e.g. a hire created
+        during the current run. The row is marked partial, so the next sync
+        replaces it with the full record from BambooHR.
+        """
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO employees VALUES (?, ?, ?)",
+                       (self.subdomain, str(employee.get("id")), json.dumps(employee)))
+            db.execute("INSERT OR REPLACE INTO partial VALUES (?, ?)", (self.subdomain, str(employee.get("id"))))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Endpoint Capability Cache
+
+Remembers, across runs, which variant of a multi-fallback call an upstream
+actually accepts, so later calls go straight to the variant known to work and
+skip the ones that hard-failed (404/403 and friends). Hard failures are
+re-probed once they are older than the re-probe interval, in case the account's
+plan or permissions changed.
+
+Capabilities are grouped by scope, e.g. "self_service:ccdocs", and each scope
+records one entry per variant name:
+    {"self_service:ccdocs": {"meta_users": {"state": "unsupported", "status": 404, "checked_at": ...}}}
+
+Environment Variables (optional):
+- ENDPOINT_CAPABILITIES_FILE: JSON file the cache lives in (default: endpoint_capabilities.json next to this script)
+- ENDPOINT_REPROBE_SECONDS: Age after which an unsupported variant is tried again (default: 86400)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+CAPABILITIES_FILE = os.getenv("ENDPOINT_CAPABILITIES_FILE", os.path.join(script_dir, "endpoint_capabilities.json"))
+REPROBE_SECONDS   = float(os.getenv("ENDPOINT_REPROBE_SECONDS", "86400"))
+
+# Statuses that mean "this variant will never work here", not "try again later"
+HARD_FAILURE_STATUSES = {403, 404, 405, 410, 501}
+
+class EndpointCapabilities:
+    """Thread-safe, file-backed record of which endpoint variants work per scope."""
+
+    def __init__(self, path=CAPABILITIES_FILE, reprobe_seconds=REPROBE_SECONDS):
+        self.path = path
+        self.reprobe_seconds = reprobe_seconds
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("not a JSON object")
+            # Drop entries that are not shaped like ours rather than failing on them mid-run
+            return {scope: {name: entry for name, entry in entries.items()
+                            if isinstance(entry, dict) and entry.get("state") in ("ok", "unsupported")
+                            and isinstance(entry.get("checked_at"), (int, float))}
+                    for scope, entries in data.items() if isinstance(entries, dict)}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable capability cache {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        # Write-then-rename so a crash never leaves a half-written cache behind
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save capability cache {self.path}: {e}")
+
+    def order(self, scope, names):
+        """
+        The variants worth trying, best first: the known-good one, then untested
+        ones and unsupported ones due for a re-probe, in their original order.
+        """
+        now = time.time()
+        with self._lock:
+            known = self._data.get(scope, {})
+            good, rest = [], []
+            for name in names:
+                entry = known.get(name)
+                if entry and entry["state"] == "ok":
+                    good.append(name)
+                elif entry and entry["state"] == "unsupported" and now - entry["checked_at"] < self.reprobe_seconds:
+                    continue
+                else:
+                    rest.append(name)
+        return good + rest
+
+    def record(self, scope, name, success, status=None, unsupported=False):
+        """
+        Record a variant's outcome. Transient failures (5xx, timeouts, 400s) are not
+        remembered unless the caller knows better and passes unsupported=True.
+        """
+        if success:
+            state = "ok"
+        elif unsupported or status in HARD_FAILURE_STATUSES:
+            state = "unsupported"
+        else:
+            return
+        with self._lock:
+            entries = self._data.setdefault(scope, {})
+            previous = entries.get(name, {}).get("state")
+            entries[name] = {"state": state, "status": status, "checked_at": time.time()}
+            # Only touch the file when the verdict changes, not on every call
+            if previous != state:
+                logger.info(f"Capability {scope}/{name}: {state} (HTTP {status})")
+                self._save()
+
+    def run(self, scope, variants, *args):
+        """
+        Try (name, func) variants in capability order until one succeeds.
+        Each func(*args) returns (success, message, status). Returns (success, message, status)
+        of the winner, or of the last variant tried (status None if none was tried).
+        """
+        funcs = dict(variants)
+        names = self.order(scope, [name for name, _ in variants])
+        success, message, status = False, "No usable variant (all known to be unsupported)", None
+        for name in names:
+            success, message, status = funcs[name](*args)
+            self.record(scope, name, success, status)
+            if success:
+                return True, message, status
+            logger.warning(f"⚠️ {scope}/{name} failed: {message}")
+        return success, message, status
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_capabilities():
+    """The process-wide capability cache, loaded on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EndpointCapabilities()
+        return _shared
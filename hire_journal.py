@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Per-Hire Step Journal
+
+Append-only JSONL record of the onboarding steps each hire has completed, so a
+run that crashes or is killed part-way can be restarted without repeating the
+work it already did. Every completed step is one line, flushed and fsync'ed
+before the pipeline moves on:
+    {"hire": "jane@example.com|2024-06-03", "step": "employee", "at": 1717400000.0, "bamboo_id": "412", "existing": false}
+
+Hires are keyed on (work email, start date). On restart onboard.process_hire()
+skips every step already in the journal and re-uses the ids it recorded
+(BambooHR employee id, compensation row id, WebWork user id). A hire whose run
+finished successfully is answered straight from the journal, which covers a
+crash between finishing a hire and writing its status back to the sheet.
+
+Entries for hires whose last recorded step is older than the retention period
+are dropped when the journal is opened, so the file stays small: finished
+hires, and failed or abandoned ones that nobody re-ran.
+
+Environment Variables (optional):
+- ONBOARD_JOURNAL: Path of the journal file (default: onboarding_journal.jsonl next to this script)
+- ONBOARD_JOURNAL_RETENTION_DAYS: Days a hire is kept in the journal after its last step (default: 14)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+JOURNAL_PATH   = os.getenv("ONBOARD_JOURNAL", os.path.join(script_dir, "onboarding_journal.jsonl"))
+RETENTION_DAYS = float(os.getenv("ONBOARD_JOURNAL_RETENTION_DAYS", "14"))
+
+def hire_key(person):
+    """Journal key for a hire: lower-cased work email plus start date."""
+    return f"{str(person.get('Email', '')).strip().lower()}|{str(person.get('Start Date', '')).strip()}"
+
+class HireJournal:
+    """Thread-safe, append-only log of completed onboarding steps per hire."""
+
+    def __init__(self, path=JOURNAL_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self._lock = threading.Lock()
+        self._hires = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write; everything before it is intact
+                    logger.warning(f"Skipping unreadable journal line {lines} in {self.path}")
+                    continue
+                step_data = {k: v for k, v in entry.items() if k not in ("hire", "step")}
+                self._hires.setdefault(entry["hire"], {})[entry["step"]] = step_data
+
+        cutoff = time.time() - self.retention_seconds
+        # Finished hires age from the "finished" step, failed or abandoned ones from the last step they got to
+        expired = [key for key, steps in self._hires.items()
+                   if max(data.get("at", 0) for data in steps.values()) < cutoff]
+        for key in expired:
+            del self._hires[key]
+        if expired:
+            self._rewrite()
+        logger.info(f"Loaded onboarding journal with {len(self._hires)} hire(s) from {self.path}")
+
+    def _rewrite(self):
+        # Write-then-rename so a crash never leaves a half-written journal behind
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, steps in self._hires.items():
+                for step, data in steps.items():
+                    f.write(json.dumps({"hire": key, "step": step, **data}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def steps(self, key):
+        """Completed steps for a hire, as {step: recorded data}, in completion order."""
+        with self._lock:
+            return {step: dict(data) for step, data in self._hires.get(key, {}).items()}
+
+    def record(self, key, step, **data):
+        """Durably record that a hire completed a step, with any ids worth keeping."""
+        data["at"] = time.time()
+        line = json.dumps({"hire": key, "step": step, **data}) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._hires.setdefault(key, {})[step] = data
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_journal():
+    """The process-wide journal, loaded on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HireJournal()
+        return _shared
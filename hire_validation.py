@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Pre-flight Hire Validation
+
+Checks and normalises the whole pending batch in one local pass before any
+BambooHR or WebWork call, so a row that can only fail (an unparseable pay
+rate, a start date that is not a date) is written back straight away instead
+of failing half-way through the pipeline after using API budget.
+
+Per row:
+- required fields: First Name, Last Name, Email, Start Date, and Pay Rate (or
+  Salary) when a compensation row will be written; employees who already exist
+  in BambooHR skip the compensation step, so their update-only rows need none
+- Email must look like an address
+- Start Date is accepted as MM/DD/YY, MM/DD/YYYY or YYYY-MM-DD and normalised to YYYY-MM-DD
+- Pay Rate / Salary, when filled in: "$45,000" -> "45000"; must be a positive number
+- Pay Type and Pay Schedule, when filled in, are matched case-insensitively
+  (ignoring spaces and hyphens) to the values BambooHR accepts and
+  written in BambooHR's spelling ("bi-weekly" -> "Biweekly", "salaried" -> "Salary")
+- Reports To, when filled in, must end in the supervisor's employee id,
+  "Jane Doe (123)"; the id is stored as "Supervisor ID"
+
+Across the batch, a row with the same email and start date as an earlier row
+is rejected as a duplicate (both would map to the same journal entry).
+
+Environment Variables (optional):
+- ONBOARD_PAY_TYPES: Accepted Pay Type values (default: Hourly,Salary,Commission,Exception Hourly,Daily,Weekly,Monthly,Piece Rate,Contract,Pro Rata)
+- ONBOARD_PAY_SCHEDULES: Accepted Pay Schedule values (default: Weekly,Biweekly,Semimonthly,Monthly)
+"""
+
+import os
+import re
+import datetime
+
+from hire_journal import hire_key
+
+PAY_TYPES = [t.strip() for t in os.getenv(
+    "ONBOARD_PAY_TYPES",
+    "Hourly,Salary,Commission,Exception Hourly,Daily,Weekly,Monthly,Piece Rate,Contract,Pro Rata").split(",") if t.strip()]
+PAY_SCHEDULES = [s.strip() for s in os.getenv(
+    "ONBOARD_PAY_SCHEDULES", "Weekly,Biweekly,Semimonthly,Monthly").split(",") if s.strip()]
+
+REQUIRED_FIELDS = ("First Name", "Last Name", "Email", "Start Date")
+START_DATE_FORMATS = ("%m/%d/%y", "%m/%d/%Y", "%Y-%m-%d")
+
+# "Jane Doe (123)" -> 123; compiled once instead of in every BambooHR call
+SUPERVISOR_ID = re.compile(r"\((\d+)\)$")
+EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+def _spelling_key(value):
+    return re.sub(r"[\s\-_]", "", value).lower()
+
+_PAY_TYPE_SPELLINGS = {_spelling_key(t): t for t in PAY_TYPES}
+_PAY_TYPE_SPELLINGS.setdefault("salaried", "Salary")
+_PAY_SCHEDULE_SPELLINGS = {_spelling_key(s): s for s in PAY_SCHEDULES}
+
+def supervisor_id(person):
+    """The supervisor's employee id from "Reports To" ("Name (ID)"), or None."""
+    if person.get("Supervisor ID"):
+        return person["Supervisor ID"]
+    match = SUPERVISOR_ID.search(str(person.get("Reports To", "")).strip())
+    return match.group(1) if match else None
+
+def normalize_start_date(value):
+    """YYYY-MM-DD for a start date in one of START_DATE_FORMATS, or None."""
+    for fmt in START_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+def normalize_pay_rate(value):
+    """"$45,000.00" -> "45000.00"; None unless it is a positive number."""
+    cleaned = value.replace("$", "").replace(",", "").strip()
+    try:
+        return cleaned if float(cleaned) > 0 else None
+    except ValueError:
+        return None
+
+def normalize_hire(hire, needs_compensation=None):
+    """
+    Validate and normalise one pending hire. Returns (hire, error): a normalised
+    copy, and None or every problem found joined with "; ". needs_compensation(hire)
+    says whether a compensation row will be written for the (date-normalised)
+    hire, i.e. whether Pay Rate is required; without it Pay Rate always is.
+    """
+    hire = {k: v.strip() if isinstance(v, str) else v for k, v in hire.items()}
+    problems = [f"{field} is missing" for field in REQUIRED_FIELDS if not hire.get(field)]
+
+    if hire.get("Email") and not EMAIL.match(hire["Email"]):
+        problems.append(f"Email '{hire['Email']}' is not an email address")
+
+    if hire.get("Start Date"):
+        start_date = normalize_start_date(hire["Start Date"])
+        if start_date:
+            hire["Start Date"] = start_date
+        else:
+            problems.append(f"Start Date '{hire['Start Date']}' is not a date (use MM/DD/YY or YYYY-MM-DD)")
+
+    # Pay Rate wins; Salary is the older column name for the same thing
+    pay_rate = hire.get("Pay Rate") or hire.get("Salary") or ""
+    if not pay_rate:
+        if needs_compensation is None or needs_compensation(hire):
+            problems.append("Pay Rate is missing")
+    elif normalize_pay_rate(pay_rate) is None:
+        problems.append(f"Pay Rate '{pay_rate}' is not a positive number")
+    else:
+        hire["Pay Rate"] = normalize_pay_rate(pay_rate)
+
+    for field, spellings in (("Pay Type", _PAY_TYPE_SPELLINGS), ("Pay Schedule", _PAY_SCHEDULE_SPELLINGS)):
+        if hire.get(field):
+            canonical = spellings.get(_spelling_key(hire[field]))
+            if canonical:
+                hire[field] = canonical
+            else:
+                problems.append(f"{field} '{hire[field]}' is not one of {', '.join(sorted(set(spellings.values())))}")
+
+    if hire.get("Reports To"):
+        match = SUPERVISOR_ID.search(hire["Reports To"])
+        if match:
+            hire["Supervisor ID"] = match.group(1)
+        else:
+            problems.append(f"Reports To '{hire['Reports To']}' has no employee id, expected 'Name (ID)'")
+
+    return hire, "; ".join(problems) or None
+
+def preflight(rows, needs_compensation=None, seen=None):
+    """
+    Validate a pending batch of (row_index, hire). Returns (valid, rejected):
+    [(row_index, normalised hire)] and [(row_index, notes)], both in row order.
+    needs_compensation is passed on to normalize_hire(). seen maps the hire
+    keys of rows already accepted to their row index; pass the same dict to
+    check a batch page by page.
+    """
+    valid, rejected = [], []
+    seen = {} if seen is None else seen
+    for row_index, hire in rows:
+        hire, error = normalize_hire(hire, needs_compensation)
+        if error is None:
+            key = hire_key(hire)
+            if key in seen:
+                error = f"Duplicate of row {seen[key]} (same Email and Start Date)"
+            else:
+                seen[key] = row_index
+        if error is None:
+            valid.append((row_index, hire))
+        else:
+            rejected.append((row_index, f"Invalid row: {error}"))
+    return valid, rejected
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+HTTP Cassettes (record / replay)
+
+Records the request/response pairs of an onboard.py run into a cassette and
+replays them later without touching BambooHR, WebWork, Google Sheets or Slack,
+so main() can be benchmarked and tuned reproducibly.
+
+- record: the run talks to the real upstreams as usual; every request and its
+  response are appended to the cassette (JSONL, one interaction per line).
+  Secrets are scrubbed before anything is written: Authorization, Cookie and
+  CSRF headers, and password / token / one-time-code / key fields in JSON
+  bodies, forms and query strings. Employee data is kept, so treat a cassette
+  like the sheet it came from.
+- replay: nothing leaves the process. Each request is answered from the
+  cassette after a latency (the recorded one, or a fixed number of seconds),
+  and a share of requests can fail on purpose (503, 429, timeout, connection
+  reset) to exercise the retry and backoff paths. Whether a request fails is
+  decided from the seed, the request and how often it has been seen, so the
+  same cassette, seed and settings fail the same requests on every replay
+  regardless of thread scheduling.
+
+Requests are matched on service, method, path, query and body (the host is
+ignored, so a cassette recorded against mock_services.py replays the same).
+Responses to the same request are served in recorded order, the last one
+repeating. A request whose body differs from every recording (a timestamp in a
+note, say) falls back to the recordings of the same method and path, and one
+for an id that was never recorded (concurrency changed which hire probed an
+endpoint first) to the recordings of the same endpoint for any id. A request
+with no recording at all raises CassetteMiss.
+
+The pooled REST sessions, the HTTP login flow, the Sheets client (httplib2)
+and the Slack client all go through the cassette. The browser login cannot be
+replayed and is skipped in replay mode. A replay keeps its journal, directory
+snapshot, capability cache and BambooHR session files in a throwaway directory
+(see isolate_replay_state()), so it never disturbs the real run state and each
+replay starts from the same place.
+
+Usage:
+    ONBOARD_CASSETTE_MODE=record ONBOARD_CASSETTE=run.jsonl python onboard.py
+    ONBOARD_CASSETTE_MODE=replay ONBOARD_CASSETTE=run.jsonl ONBOARD_REPLAY_ERROR_RATE=0.05 python onboard.py
+
+Environment Variables (optional):
+- ONBOARD_CASSETTE_MODE: off, record or replay (default: off)
+- ONBOARD_CASSETTE: Cassette path (default: onboard_cassette.jsonl)
+- ONBOARD_REPLAY_LATENCY: recorded, or a fixed number of seconds for every replayed response (default: recorded)
+- ONBOARD_REPLAY_ERROR_RATE: Share of replayed requests that fail on purpose (default: 0)
+- ONBOARD_REPLAY_ERRORS: Failures to pick from: 503, 429, timeout, reset (default: 503,429,timeout,reset)
+- ONBOARD_REPLAY_SEED: Seed for the injected failures (default: 0)
+"""
+
+import os
+import re
+import json
+import time
+import base64
+import random
+import hashlib
+import logging
+import datetime
+import tempfile
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from run_metrics import endpoint_label
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODE       = os.getenv("ONBOARD_CASSETTE_MODE", "off").lower()
+CASSETTE_PATH       = os.getenv("ONBOARD_CASSETTE", "onboard_cassette.jsonl")
+REPLAY_LATENCY      = os.getenv("ONBOARD_REPLAY_LATENCY", "recorded")
+REPLAY_ERROR_RATE   = float(os.getenv("ONBOARD_REPLAY_ERROR_RATE", "0"))
+REPLAY_ERRORS       = [e.strip() for e in os.getenv("ONBOARD_REPLAY_ERRORS", "503,429,timeout,reset").split(",") if e.strip()]
+REPLAY_SEED         = os.getenv("ONBOARD_REPLAY_SEED", "0")
+
+SCRUBBED = "<scrubbed>"
+# Header and field names whose values never go into a cassette
+_SECRET_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-csrf-token"}
+_SECRET_FIELD = re.compile(r"pass(word)?|secret|token|one_?time_?code|api_?key|private_?key|assertion|credential",
+                           re.IGNORECASE)
+# Response headers worth keeping: the pipeline reads them (redirects, throttling, content type)
+_KEPT_RESPONSE_HEADERS = {"content-type", "location", "retry-after"}
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """A replayed request has no recording in the cassette."""
+
+# ─── Scrubbing & matching ───────────────────────────────────────────────────
+def _scrub_fields(value):
+    if isinstance(value, dict):
+        return {k: SCRUBBED if _SECRET_FIELD.search(str(k)) else _scrub_fields(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub_fields(v) for v in value]
+    return value
+
+def scrub_body(body):
+    """Request body text with secret fields blanked; JSON is canonicalised (sorted keys) so it matches on replay."""
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        try:
+            body = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return f"<{len(body)} bytes>"
+    try:
+        return json.dumps(_scrub_fields(json.loads(body)), sort_keys=True)
+    except ValueError:
+        pass
+    if "=" in body and " " not in body:
+        pairs = parse_qsl(body, keep_blank_values=True)
+        if pairs:
+            return urlencode([(k, SCRUBBED if _SECRET_FIELD.search(k) else v) for k, v in pairs])
+    return body
+
+def request_path(url):
+    """Path plus scrubbed, sorted query; the host is left out so cassettes move between environments."""
+    parts = urlsplit(url)
+    query = sorted((k, SCRUBBED if _SECRET_FIELD.search(k) else v) for k, v in parse_qsl(parts.query, keep_blank_values=True))
+    return parts.path + (f"?{urlencode(query)}" if query else "")
+
+def scrub_headers(headers, keep=None):
+    """Headers without secrets; with keep, only those names (lower-case) are kept."""
+    return {k: v for k, v in (headers or {}).items()
+            if k.lower() not in _SECRET_HEADERS and (keep is None or k.lower() in keep)}
+
+def _request_key(service, method, path, body):
+    return f"{service} {method.upper()} {path} {hashlib.sha1((body or '').encode('utf-8')).hexdigest()[:12]}"
+
+def _route_key(service, method, path):
+    return f"{service} {method.upper()} {path.split('?', 1)[0]}"
+
+def _endpoint_key(service, method, path):
+    return f"{service} {endpoint_label(method, path)}"
+
+# ─── Cassette ───────────────────────────────────────────────────────────────
+class Cassette:
+    """A cassette file in record or replay mode. Thread-safe."""
+
+    def __init__(self, path=CASSETTE_PATH, mode=CASSETTE_MODE, latency=REPLAY_LATENCY,
+                 error_rate=REPLAY_ERROR_RATE, errors=REPLAY_ERRORS, seed=REPLAY_SEED):
+        self.path = path
+        self.mode = mode
+        self.latency = None if str(latency).lower() == "recorded" else float(latency)
+        self.error_rate = error_rate
+        self.errors = list(errors) or ["503"]
+        self.seed = str(seed)
+        self._lock = threading.Lock()
+        # Replay: recordings by exact request, route and endpoint, and how many times each key was served / seen
+        self._by_request = {}
+        self._by_route = {}
+        self._by_endpoint = {}
+        self._served = {}
+        self._seen = {}
+        self.misses = 0
+        self.injected = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._by_request.setdefault(entry["key"], []).append(entry)
+                self._by_route.setdefault(_route_key(entry["service"], entry["method"], entry["path"]), []).append(entry)
+                self._by_endpoint.setdefault(_endpoint_key(entry["service"], entry["method"], entry["path"]), []).append(entry)
+        logger.info(f"Replaying {sum(len(v) for v in self._by_request.values())} recorded requests from {self.path}")
+
+    def record(self, service, method, url, body, status, headers, content, elapsed):
+        """Append one interaction (scrubbed) to the cassette."""
+        path = request_path(url)
+        body = scrub_body(body)
+        entry = {"key": _request_key(service, method, path, body), "service": service, "method": method.upper(),
+                 "path": path, "body": body, "status": status,
+                 "headers": scrub_headers(dict(headers or {}), keep=_KEPT_RESPONSE_HEADERS),
+                 "elapsed": round(elapsed, 4)}
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["base64"] = base64.b64encode(content).decode("ascii")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def replay(self, service, method, url, body):
+        """
+        Answer a request from the cassette: (status, headers, content, elapsed).
+        Raises CassetteMiss if it was never recorded, or the injected failure.
+        """
+        path = request_path(url)
+        key = _request_key(service, method, path, scrub_body(body))
+        with self._lock:
+            seen = self._seen[key] = self._seen.get(key, 0) + 1
+            injected = self._injected_failure(key, seen)
+            if injected is None:
+                recordings, served_key = None, None
+                for served_key, recorded in ((key, self._by_request),
+                                             (_route_key(service, method, path), self._by_route),
+                                             (_endpoint_key(service, method, path), self._by_endpoint)):
+                    recordings = recorded.get(served_key)
+                    if recordings:
+                        break
+                if not recordings:
+                    self.misses += 1
+                    raise CassetteMiss(f"No recording for {service} {method.upper()} {path} in {self.path}")
+                served = self._served.get(served_key, 0)
+                self._served[served_key] = served + 1
+                entry = recordings[min(served, len(recordings) - 1)]
+            else:
+                self.injected += 1
+        if injected is not None:
+            return self._fail(injected, service, method, path)
+        self._wait(entry["elapsed"])
+        content = entry["text"].encode("utf-8") if "text" in entry else base64.b64decode(entry["base64"])
+        return entry["status"], entry["headers"], content, entry["elapsed"]
+
+    def _injected_failure(self, key, seen):
+        if not self.error_rate:
+            return None
+        # Seeded per request and occurrence, so thread scheduling cannot change which requests fail
+        chance = random.Random(f"{self.seed}|{key}|{seen}")
+        if chance.random() >= self.error_rate:
+            return None
+        return chance.choice(self.errors)
+
+    def _fail(self, kind, service, method, path):
+        self._wait(None)
+        logger.debug(f"Injecting {kind} into {service} {method.upper()} {path}")
+        if kind == "timeout":
+            raise requests.exceptions.ReadTimeout(f"Injected timeout: {service} {method.upper()} {path}")
+        if kind == "reset":
+            raise requests.exceptions.ConnectionError(f"Injected connection reset: {service} {method.upper()} {path}")
+        return int(kind), {"Content-Type": "application/json"}, b'{"error": "injected"}', 0.0
+
+    def _wait(self, recorded):
+        seconds = self.latency if self.latency is not None else (recorded or 0.0)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def stats(self):
+        """Replay counters: {"misses", "injected"}."""
+        with self._lock:
+            return {"misses": self.misses, "injected": self.injected}
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_cassette():
+    """The process-wide cassette, or None when ONBOARD_CASSETTE_MODE is off."""
+    global _shared
+    if CASSETTE_MODE not in ("record", "replay"):
+        return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = Cassette()
+        return _shared
+
+# ─── Transports ─────────────────────────────────────────────────────────────
+class CassetteAdapter(HTTPAdapter):
+    """requests transport adapter that records to, or replays from, a cassette."""
+
+    def __init__(self, cassette, service, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.service = service
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == "record":
+            started = time.perf_counter()
+            response = super().send(request, **kwargs)
+            self.cassette.record(self.service, request.method, request.url, request.body, response.status_code,
+                                 response.headers, response.content, time.perf_counter() - started)
+            return response
+        status, headers, content, elapsed = self.cassette.replay(self.service, request.method, request.url, request.body)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        # There is no socket behind a replayed response (nothing for close() to release)
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.elapsed = datetime.timedelta(seconds=elapsed)
+        return response
+
+def session_adapter(service, **kwargs):
+    """The transport adapter for a pooled session: the cassette's when recording or replaying, else plain HTTP."""
+    cassette = get_cassette()
+    if cassette is None:
+        return HTTPAdapter(**kwargs)
+    return CassetteAdapter(cassette, service, **kwargs)
+
+def cassette_session(service):
+    """A fresh requests.Session going through the cassette, or None when cassettes are off."""
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    session = requests.Session()
+    adapter = CassetteAdapter(cassette, service)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class CassetteHttp:
+    """
+    httplib2-compatible transport for googleapiclient. Records what the wrapped
+    http returns, or (replaying) answers without it.
+    """
+
+    def __init__(self, cassette, service, http=None):
+        self.cassette = cassette
+        self.service = service
+        self.http = http
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        import httplib2
+        if self.cassette.mode == "record":
+            started = time.perf_counter()
+            response, content = self.http.request(uri, method, body=body, headers=headers, **kwargs)
+            headers_out = {k: v for k, v in response.items() if not k.startswith("-")}
+            self.cassette.record(self.service, method, uri, body, response.status, headers_out,
+                                 content, time.perf_counter() - started)
+            return response, content
+        status, headers_out, content, _ = self.cassette.replay(self.service, method, uri, body)
+        return httplib2.Response({**{k.lower(): v for k, v in headers_out.items()}, "status": str(status)}), content
+
+    def close(self):
+        if self.http is not None and hasattr(self.http, "close"):
+            self.http.close()
+
+class _SlackResponse(dict):
+    """The parts of slack_sdk's SlackResponse onboard.py reads."""
+
+    @property
+    def data(self):
+        return self
+
+class CassetteSlack:
+    """Slack client stand-in: records chat.postMessage calls of the wrapped WebClient, or replays them."""
+
+    def __init__(self, cassette, client=None):
+        self.cassette = cassette
+        self.client = client
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        url = "https://slack.com/api/chat.postMessage"
+        body = json.dumps({"channel": channel, "text": text, **kwargs})
+        if self.cassette.mode == "record":
+            started = time.perf_counter()
+            response = self.client.chat_postMessage(channel=channel, text=text, **kwargs)
+            self.cassette.record("slack", "POST", url, body, response.status_code, {"Content-Type": "application/json"},
+                                 json.dumps(response.data).encode("utf-8"), time.perf_counter() - started)
+            return response
+        _, _, content, _ = self.cassette.replay("slack", "POST", url, body)
+        return _SlackResponse(json.loads(content or b"{}"))
+
+# ─── Replay state ───────────────────────────────────────────────────────────
+# Files a run reads and writes as state, and what a replay names them in its own directory
+REPLAY_STATE_FILES = {
+    "ONBOARD_JOURNAL": "onboarding_journal.jsonl",
+    "BAMBOOHR_DIRECTORY_SNAPSHOT": "bamboo_directory.sqlite3",
+    "ENDPOINT_CAPABILITIES_FILE": "endpoint_capabilities.json",
+    "BAMBOOHR_HEADERS_FILE": "bamboo_headers.json",
+    "BAMBOOHR_SESSION_FILE": "bamboo_session.json",
+}
+
+def isolate_replay_state():
+    """
+    When replaying, point every state file that is not configured explicitly at a
+    fresh temporary directory, with a placeholder logged-in BambooHR session (the
+    replayed session probe decides whether it is still good). Must run before
+    the modules that read these variables are imported. Returns the directory, or None.
+    """
+    if CASSETTE_MODE != "replay":
+        return None
+    state_dir = tempfile.mkdtemp(prefix="onboard_replay_")
+    for var, name in REPLAY_STATE_FILES.items():
+        os.environ.setdefault(var, os.path.join(state_dir, name))
+    headers_file, session_file = os.environ["BAMBOOHR_HEADERS_FILE"], os.environ["BAMBOOHR_SESSION_FILE"]
+    if not os.path.exists(headers_file):
+        with open(headers_file, "w") as f:
+            json.dump({"Cookie": SCRUBBED}, f)
+        with open(session_file, "w") as f:
+            json.dump({"issued_at": time.time(), "expires_at": time.time() + 3600}, f)
+    return state_dir
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Metrics Endpoint
+
+Serves the onboarding worker's metrics (run_metrics.RunMetrics) in the
+Prometheus text exposition format, so a long-running worker can be scraped:
+    curl http://127.0.0.1:9464/metrics
+
+Everything is cumulative over the life of the process:
+- onboard_hires_total{result}                                hires processed
+- onboard_step_duration_seconds{step}                        histogram per pipeline step
+- onboard_steps_total{step,outcome}
+- onboard_upstream_request_duration_seconds{service,endpoint} histogram per outbound endpoint
+- onboard_upstream_requests_total{service,endpoint,status}   (error rate = non-2xx / all)
+- onboard_upstream_retries_total / _errors_total {service,endpoint}
+- onboard_upstream_bytes_sent_total / _received_total {service}
+- onboard_session_refreshes_total{result}
+- onboard_runs_total
+plus gauges (onboard_queue_depth{queue}) and whatever the caller's collectors
+add (onboard.py adds the rate limiter wait time, throttles and current rate).
+
+Only the standard library is used; the server runs on a daemon thread and
+never blocks onboarding work.
+
+Environment Variables (optional):
+- ONBOARD_METRICS_PORT: Port to serve /metrics on (default: 0, disabled)
+- ONBOARD_METRICS_HOST: Address to bind (default: 127.0.0.1; use 0.0.0.0 to allow remote scrapes)
+"""
+
+import os
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("ONBOARD_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("ONBOARD_METRICS_HOST", "127.0.0.1")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Named counters/gauges recorded by onboard.py: name -> (exported name, type, help)
+NAMED_METRICS = {
+    "hires": ("onboard_hires_total", "counter", "Hires processed, by result"),
+    "runs": ("onboard_runs_total", "counter", "Onboarding runs started"),
+    "session_refreshes": ("onboard_session_refreshes_total", "counter", "BambooHR web session logins, by result"),
+    "queue_depth": ("onboard_queue_depth", "gauge", "Items waiting in the worker's queues"),
+}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Writer:
+    def __init__(self):
+        self.lines = []
+        self._declared = set()
+
+    def declare(self, name, kind, help_text):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name, labels, value):
+        self.lines.append(f"{name}{_labels(labels)} {_value(value)}")
+
+    def histogram(self, name, labels, histogram):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            self.sample(f"{name}_bucket", labels + (("le", le),), cumulative)
+        self.sample(f"{name}_sum", labels, round(histogram.sum, 6))
+        self.sample(f"{name}_count", labels, histogram.count)
+
+def render(metrics, collectors=()):
+    """
+    The exposition text for a RunMetrics. Each collector is a callable returning
+    an iterable of (name, type, help, [(labels, value), ...]) with labels a dict.
+    """
+    calls, steps, counters, gauges = metrics.snapshot()
+    out = _Writer()
+
+    for kind, values in (("counter", counters), ("gauge", gauges)):
+        for (name, labels), value in sorted(values.items()):
+            exported, declared_kind, help_text = NAMED_METRICS.get(
+                name, (f"onboard_{name}" + ("_total" if kind == "counter" else ""), kind, name.replace("_", " ")))
+            out.declare(exported, declared_kind, help_text)
+            out.sample(exported, labels, value)
+
+    out.declare("onboard_step_duration_seconds", "histogram", "Duration of each pipeline step")
+    for step, stats in sorted(steps.items()):
+        out.histogram("onboard_step_duration_seconds", (("step", step),), stats.latency)
+    out.declare("onboard_steps_total", "counter", "Pipeline step runs, by outcome")
+    for step, stats in sorted(steps.items()):
+        for outcome, count in sorted(stats.outcomes.items()):
+            out.sample("onboard_steps_total", (("step", step), ("outcome", outcome)), count)
+
+    per_endpoint = [((("service", service), ("endpoint", endpoint)), stats)
+                    for service, endpoints in sorted(calls.items()) for endpoint, stats in sorted(endpoints.items())]
+    out.declare("onboard_upstream_request_duration_seconds", "histogram", "Latency of each outbound call attempt")
+    for labels, stats in per_endpoint:
+        out.histogram("onboard_upstream_request_duration_seconds", labels, stats.latency)
+    out.declare("onboard_upstream_requests_total", "counter", "Outbound call attempts, by status or exception")
+    for labels, stats in per_endpoint:
+        for status, count in sorted(stats.status.items()):
+            out.sample("onboard_upstream_requests_total", labels + (("status", status),), count)
+    out.declare("onboard_upstream_retries_total", "counter", "Outbound call attempts that were retries")
+    out.declare("onboard_upstream_errors_total", "counter", "Outbound call attempts that failed (exception or HTTP >= 400)")
+    for labels, stats in per_endpoint:
+        out.sample("onboard_upstream_retries_total", labels, stats.retries)
+        out.sample("onboard_upstream_errors_total", labels, stats.errors)
+    out.declare("onboard_upstream_bytes_sent_total", "counter", "Request body bytes sent")
+    out.declare("onboard_upstream_bytes_received_total", "counter", "Response body bytes received")
+    for service, endpoints in sorted(calls.items()):
+        out.sample("onboard_upstream_bytes_sent_total", (("service", service),),
+                   sum(s.bytes_sent for s in endpoints.values()))
+        out.sample("onboard_upstream_bytes_received_total", (("service", service),),
+                   sum(s.bytes_received for s in endpoints.values()))
+
+    for collector in collectors:
+        try:
+            for name, kind, help_text, samples in collector():
+                out.declare(name, kind, help_text)
+                for labels, value in samples:
+                    out.sample(name, tuple(sorted(labels.items())), value)
+        except Exception as e:
+            logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+    return "\n".join(out.lines) + "\n"
+
+def start_metrics_server(metrics, port=METRICS_PORT, host=METRICS_HOST, collectors=()):
+    """
+    Serve /metrics on a daemon thread. Returns the server (call shutdown() to
+    stop it), or None if port is 0 or the address could not be bound.
+    """
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render(metrics, collectors).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"Metrics endpoint: {format % args}")
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        logger.error(f"Metrics endpoint disabled: cannot bind {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Local mock of the BambooHR, WebWork and Google Sheets APIs used by onboard.py.
+
+Serves all three upstreams from one threaded HTTP server so onboarding runs can
+be benchmarked without touching production. Every request sleeps for a fixed
+latency to stand in for the network round-trip.
+
+Routes:
+- /api/gateway.php/{sub}/v1/...  BambooHR REST API
+- /ajax/...                      BambooHR web AJAX endpoints
+- /home                          BambooHR web session probe
+- /login.php, ...                BambooHR web login flow (login, MFA code, trust this browser)
+- /rest-api/users[/teams]        WebWork REST API
+- /v4/spreadsheets/{id}/values   Google Sheets values API
+- /token                         Google OAuth token endpoint (any service-account assertion is accepted)
+- /__mock/reset, /__mock/calls   reset the data set / read call counters
+- /__mock/append                 add pending rows to the sheet
+
+Usage:
+    python mock_services.py --port 8099 --latency 0.05
+"""
+
+import re
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+SHEET_HEADERS = [
+    "First Name", "Last Name", "Email", "Start Date", "Job Title", "Department",
+    "Division", "Location", "Reports To", "Pay Rate", "Pay Type", "Pay Schedule",
+    "Position", "Salary", "Overall status", "Notes",
+]
+
+def column_index(letters):
+    """Convert a column reference like 'A' or 'AB' to a 0-based index."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - 64)
+    return index - 1
+
+def utc_now():
+    """Current time in the ISO 8601 form BambooHR uses for change timestamps."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+def parse_a1_range(a1):
+    """
+    Parse 'Sheet1!B2:P10' into (sheet, first_col, first_row, last_col, last_row).
+    Rows are 1-based; last_row is None for open-ended ranges like 'A1:P'.
+    Whole-row ranges like '1:1' span every column.
+    """
+    sheet, _, cells = a1.rpartition("!")
+    start, _, end = cells.partition(":")
+    m = re.match(r"([A-Z]*)(\d*)", start)
+    first_col, first_row = column_index(m.group(1) or "A"), int(m.group(2) or 1)
+    if not end:
+        return sheet, first_col, first_row, first_col, first_row
+    m = re.match(r"([A-Z]*)(\d*)", end)
+    last_col = column_index(m.group(1)) if m.group(1) else len(SHEET_HEADERS) - 1
+    last_row = int(m.group(2)) if m.group(2) else None
+    return sheet, first_col, first_row, last_col, last_row
+
+# Load-balancer affinity cookie, far shorter-lived than the session, set with every login and probe
+LB_COOKIE = "lb_affinity=mock; Path=/; Max-Age=60"
+
+# BambooHR web login pages, shaped like the real ones (element ids/names the browser login looks for)
+MOCK_CSRF = "mock-csrf-token"
+LOGIN_PAGES = {
+    "/login.php": """<html><body><form method="post" action="/login.php">
+<input type="hidden" name="CSRFToken" value="{csrf}">
+<input type="email" id="lemail" name="username"><input type="password" id="password" name="password">
+<button type="submit">Log In</button></form></body></html>""",
+    "/multi_factor_authentication.php": """<html><body><form method="post" action="/multi_factor_authentication.php">
+<input type="hidden" name="CSRFToken" value="{csrf}"><input type="text" name="oneTimeCode">
+<button type="submit">Continue</button></form></body></html>""",
+    "/trusted_browser.php": """<html><body><form method="post" action="/trusted_browser.php">
+<input type="hidden" name="CSRFToken" value="{csrf}">
+<button type="submit" name="trust" value="no">No, Don't Trust this Browser</button>
+<button type="submit" name="trust" value="yes">Yes, Trust this Browser</button></form></body></html>""",
+}
+
+class MockState:
+    """Mutable data behind the mock server. All access goes through `lock`."""
+
+    def __init__(self, employees=500, hires=50, completed=0, bamboo_limit=0, lost_creates=0, lost_create_status=502):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        # BambooHR REST calls allowed per second before answering 429 (0 = unlimited)
+        self.bamboo_limit = bamboo_limit
+        # Employee creates that succeed but answer lost_create_status (502 or 503), as if the response was lost
+        self.lost_creates = lost_creates
+        self.lost_create_status = lost_create_status
+        self.bamboo_window = (0, 0)  # (second, calls in that second)
+        self.employees = {}
+        self.compensation = {}
+        self.webwork_users = {}
+        self.changed = {}  # employee id -> (lastChanged, action), for /employees/changed
+        self.next_id = 1000
+        for _ in range(employees):
+            eid = self._new_employee_id()
+            self.employees[eid] = {
+                "id": eid,
+                "displayName": f"Existing Employee{eid}",
+                "firstName": "Existing",
+                "lastName": f"Employee{eid}",
+                "workEmail": f"existing{eid}@example.com",
+                "jobTitle": "Agent",
+                "location": "Remote",
+                "department": "Operations",
+                "supervisorId": "1000" if eid != "1000" else None,
+            }
+
+        self.sheet = [list(SHEET_HEADERS)]
+        for n in range(completed):
+            self.sheet.append(self._sheet_row(f"done{n}@example.com", "SUCCESS", "OK"))
+        for n in range(hires):
+            self.sheet.append(self._sheet_row(f"hire{n}@example.com", "", ""))
+
+    def _new_employee_id(self):
+        eid = str(self.next_id)
+        self.next_id += 1
+        return eid
+
+    @staticmethod
+    def _sheet_row(email, status, notes):
+        first = email.split("@")[0].capitalize()
+        return [
+            first, "Mock", email, "07/01/25", "Agent", "Operations", "North America",
+            "Remote", "Existing Employee1000 (1000)", "$18.50", "Hourly", "Biweekly",
+            "Agent", "", status, notes,
+        ]
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Routes requests for all three mocked upstreams."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse connections
+    disable_nagle_algorithm = True  # headers and body are written separately; don't stall on delayed ACKs
+    state = None
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    # ── plumbing ──────────────────────────────────────────────────────────────
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def _send(self, status, payload=None, headers=None):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/html; charset=utf-8"
+        else:
+            body, content_type = (b"" if payload is None else json.dumps(payload).encode()), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, values in (headers or {}).items():
+            for value in values if isinstance(values, list) else [values]:
+                self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        path, query = unquote(url.path), parse_qs(url.query)
+        body = self._body() if method in ("POST", "PUT") else ""
+        if path.startswith("/__mock/"):
+            return self._send(*self._admin(method, path, body))
+        if self.latency:
+            time.sleep(self.latency)
+        if path.startswith("/api/gateway.php/"):
+            route = path.split("/v1/", 1)[1]
+            self._count("bamboohr", method, route)
+            response = self._throttle() or self._bamboo_api(method, route, query, body)
+        elif path.startswith("/ajax/"):
+            self._count("bamboohr_web", method, path)
+            response = (200, {"success": True})
+        elif path == "/home":
+            # Session probe: logged in with a session cookie, otherwise bounced to the login page
+            self._count("bamboohr_web", method, path)
+            response = (200, "<html>Home</html>", {"Set-Cookie": LB_COOKIE}) \
+                if "PHPSESSID=" in (self.headers.get("Cookie") or "") else (302, None, {"Location": "/login.php"})
+        elif path in LOGIN_PAGES:
+            self._count("bamboohr_web", method, path)
+            response = self._login(method, path, body)
+        elif path.startswith("/rest-api/users"):
+            self._count("webwork", method, path)
+            response = self._webwork(method, path, body)
+        elif path.startswith("/v4/spreadsheets/"):
+            self._count("sheets", method, path)
+            response = self._sheets(method, path, body, query)
+        elif path == "/token" and method == "POST":
+            self._count("google_oauth", method, path)
+            response = (200, {"access_token": "mock-access-token", "token_type": "Bearer", "expires_in": 3600})
+        else:
+            response = (404, {"error": "unknown route"})
+        # Handlers only build the response under the state lock; send it outside
+        self._send(*response)
+
+    def _admin(self, method, path, body):
+        if path == "/__mock/reset" and method == "POST":
+            type(self).state = MockState(**json.loads(body or "{}"))
+            return (200, {"reset": True})
+        if path == "/__mock/append" and method == "POST":
+            # New pending rows typed into the sheet while onboard.py is running (watch mode)
+            options = json.loads(body or "{}")
+            with self.state.lock:
+                start = len(self.state.sheet)
+                for n in range(options.get("hires", 1)):
+                    self.state.sheet.append(self.state._sheet_row(f"{options.get('prefix', 'late')}{start + n}@example.com", "", ""))
+            return (200, {"appended": options.get("hires", 1)})
+        if path == "/__mock/calls":
+            with self.state.lock:
+                return (200, dict(self.state.calls))
+        return (404, {"error": "unknown admin route"})
+
+    def _count(self, service, method, route):
+        # Collapse numeric ids so counters group by endpoint, not by employee
+        route = re.sub(r"/\d+", "/{id}", route.split("!")[0])
+        with self.state.lock:
+            self.state.calls[service] += 1
+            self.state.calls[f"{service} {method} {route}"] += 1
+
+    def _throttle(self):
+        """A 429 with Retry-After once more than bamboo_limit calls arrive in the same second."""
+        state = self.state
+        if not state.bamboo_limit:
+            return None
+        with state.lock:
+            second = int(time.time())
+            window, calls = state.bamboo_window
+            calls = calls + 1 if window == second else 1
+            state.bamboo_window = (second, calls)
+            if calls <= state.bamboo_limit:
+                return None
+            state.calls["bamboohr 429"] += 1
+        return (429, {"error": "Too Many Requests"}, {"Retry-After": "1"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    # ── BambooHR REST ─────────────────────────────────────────────────────────
+    def _bamboo_api(self, method, route, query, body):
+        state = self.state
+        parts = route.strip("/").split("/")
+        with state.lock:
+            if route == "employees/directory" and method == "GET":
+                employees = [dict(e) for e in state.employees.values()]
+                return (200, {"fields": [], "employees": employees})
+            if parts == ["employees"] and method == "POST":
+                payload = json.loads(body) if body.startswith("{") else {}
+                email = (payload.get("workEmail") or "").lower()
+                if email and any((e.get("workEmail") or "").lower() == email for e in state.employees.values()):
+                    return (400, {"error": "Duplicate email"})
+                eid = state._new_employee_id()
+                state.employees[eid] = {
+                    "id": eid,
+                    "displayName": f"{payload.get('firstName', '')} {payload.get('lastName', '')}",
+                    "firstName": payload.get("firstName"),
+                    "lastName": payload.get("lastName"),
+                    "workEmail": payload.get("workEmail"),
+                }
+                state.changed[eid] = (utc_now(), "Inserted")
+                if state.lost_creates > 0:
+                    state.lost_creates -= 1
+                    state.calls["bamboohr lost create"] += 1
+                    if state.lost_create_status == 503:
+                        return (503, {"error": "Service Unavailable"}, {"Retry-After": "0"})
+                    return (502, {"error": "Bad gateway"})
+                return (201, None, {"Location": f"/v1/employees/{eid}"})
+            if parts == ["employees", "changed"] and method == "GET":
+                since = query.get("since", [""])[0]
+                changes = {
+                    eid: {"id": eid, "action": action, "lastChanged": changed_at}
+                    for eid, (changed_at, action) in state.changed.items() if changed_at >= since
+                }
+                return (200, {"latest": utc_now(), "employees": changes})
+            if len(parts) == 2 and parts[0] == "employees" and method == "GET":
+                employee = state.employees.get(parts[1])
+                return (200, dict(employee)) if employee else (404, {"error": "Not found"})
+            if parts[0] == "applicant_tracking":
+                return (200, [])
+            if len(parts) == 2 and parts[0] == "employees" and method == "POST":
+                return (200 if parts[1] in state.employees else 404, None)
+            if len(parts) >= 4 and parts[2:4] == ["tables", "compensation"]:
+                rows = state.compensation.setdefault(parts[1], [])
+                if method == "GET":
+                    return (200, rows)
+                if method == "POST":
+                    date = re.search(r'id="effectiveDate">([^<]*)<', body)
+                    row_id = str(len(rows) + 1)
+                    rows.append({"id": row_id, "effectiveDate": date.group(1) if date else ""})
+                    return (201, None, {"Location": f"/v1/employees/{parts[1]}/tables/compensation/{row_id}"})
+                return (200, None)
+        # Self-service, onboarding and notification endpoints are not on our plan
+        return (404, {"error": "Not found"})
+
+    # ── BambooHR web login ────────────────────────────────────────────────────
+    def _login(self, method, path, body):
+        """Login form -> MFA code -> trust this browser -> home, with a CSRF token on every form."""
+        if method == "GET":
+            return (200, LOGIN_PAGES[path].format(csrf=MOCK_CSRF))
+        form = {k: v[0] for k, v in parse_qs(body).items()}
+        if form.get("CSRFToken") != MOCK_CSRF:
+            return (200, LOGIN_PAGES[path].format(csrf=MOCK_CSRF))
+        if path == "/login.php" and form.get("username") and form.get("password"):
+            return (302, None, {"Location": "/multi_factor_authentication.php", "Set-Cookie": "mfa_pending=1; Path=/"})
+        if path == "/multi_factor_authentication.php" and re.fullmatch(r"\d{6}", form.get("oneTimeCode", "")):
+            return (302, None, {"Location": "/trusted_browser.php"})
+        if path == "/trusted_browser.php":
+            expires = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 3600))
+            return (302, None, {"Location": "/home",
+                                "Set-Cookie": [f"PHPSESSID=mock-{int(time.time() * 1000)}; Path=/; Expires={expires}",
+                                               LB_COOKIE]})
+        return (200, LOGIN_PAGES[path].format(csrf=MOCK_CSRF))
+
+    # ── WebWork ───────────────────────────────────────────────────────────────
+    def _webwork(self, method, path, body):
+        state = self.state
+        with state.lock:
+            if path.rstrip("/") == "/rest-api/users" and method == "GET":
+                return (200, list(state.webwork_users.values()))
+            if path.rstrip("/") == "/rest-api/users" and method == "POST":
+                payload = json.loads(body or "{}")
+                email = payload.get("email", "")
+                if email in state.webwork_users:
+                    return (200, {"success": False, "message": ["User already exists."]})
+                user = {"id": len(state.webwork_users) + 1, "email": email}
+                state.webwork_users[email] = user
+                return (200, {"success": True, "user": user})
+            return (200, {"success": True})
+
+    # ── Google Sheets ─────────────────────────────────────────────────────────
+    def _sheets(self, method, path, body, query):
+        state = self.state
+        sheet_id, _, rest = path[len("/v4/spreadsheets/"):].partition("/")
+        with state.lock:
+            if rest == "values:batchGet" and method == "GET":
+                major = query.get("majorDimension", ["ROWS"])[0]
+                value_ranges = []
+                for a1 in query.get("ranges", []):
+                    values = self._read_range(a1)
+                    if major == "COLUMNS":
+                        values = self._columns(values)
+                    value_ranges.append({"range": a1, "majorDimension": major, "values": values})
+                return (200, {"spreadsheetId": sheet_id, "valueRanges": value_ranges})
+            if rest == "values:batchUpdate" and method == "POST":
+                data = json.loads(body).get("data", [])
+                for item in data:
+                    self._write_range(item["range"], item["values"])
+                return (200, {"spreadsheetId": sheet_id, "totalUpdatedCells": len(data)})
+            if rest.startswith("values/"):
+                a1 = rest[len("values/"):]
+                if method == "GET":
+                    return (200, {"range": a1, "majorDimension": "ROWS", "values": self._read_range(a1)})
+                if method == "PUT":
+                    self._write_range(a1, json.loads(body)["values"])
+                    return (200, {"spreadsheetId": sheet_id, "updatedRange": a1})
+        return (404, {"error": "unknown sheets route"})
+
+    def _read_range(self, a1):
+        _, c0, r0, c1, r1 = parse_a1_range(a1)
+        rows = self.state.sheet[r0 - 1:r1 if r1 else None]
+        # Like the real API, drop trailing empty cells and trailing empty rows
+        values = []
+        for row in rows:
+            cells = row[c0:c1 + 1]
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    @staticmethod
+    def _columns(rows):
+        """Row-major values to column-major, dropping each column's trailing empty cells."""
+        columns = []
+        for c in range(max((len(row) for row in rows), default=0)):
+            cells = [row[c] if c < len(row) else "" for row in rows]
+            while cells and cells[-1] == "":
+                cells.pop()
+            columns.append(cells)
+        return columns
+
+    def _write_range(self, a1, values):
+        _, c0, r0, _, _ = parse_a1_range(a1)
+        for dr, row_values in enumerate(values):
+            row = self.state.sheet[r0 - 1 + dr]
+            for dc, value in enumerate(row_values):
+                row[c0 + dc] = value
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # benchmarks open many connections at once
+
+def start_mock_server(state, port=0, latency=0.0):
+    """Start the mock server on a background thread. Returns (server, base_url)."""
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state, "latency": latency})
+    server = MockServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local BambooHR/WebWork/Sheets mock")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--hires", type=int, default=50)
+    parser.add_argument("--completed", type=int, default=0)
+    parser.add_argument("--bamboo-limit", type=int, default=0, help="BambooHR calls/second before 429s (0 = unlimited)")
+    parser.add_argument("--lost-creates", type=int, default=0, help="employee creates that succeed but answer an error")
+    parser.add_argument("--lost-create-status", type=int, choices=[502, 503], default=502)
+    args = parser.parse_args()
+
+    state = MockState(args.employees, args.hires, args.completed, args.bamboo_limit,
+                      args.lost_creates, args.lost_create_status)
+    server, base_url = start_mock_server(state, args.port, args.latency)
+    print(f"Mock services listening on {base_url} (Ctrl+C to stop)", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -23,15 +23,20 @@ Environment Variables Required:
 """
 
 import os
+import sys
 import time
 import logging
+import random
+import types
+import atexit
+import threading
+import functools
 import requests
 import base64
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 import json
+from collections import deque
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from requests.auth import HTTPBasicAuth
 
@@ -42,16 +47,23 @@ dotenv_path = os.path.join(script_dir, '.env')
 # Load environment variables from .env file
 load_dotenv(dotenv_path=dotenv_path)
 
-# Selenium and 2FA imports for automated login
-import pyotp
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
+# A replay keeps its run state in a throwaway directory; this must happen before the imports below
+from http_cassettes import (isolate_replay_state, get_cassette, session_adapter, cassette_session,
+                            CassetteHttp, CassetteSlack)
+isolate_replay_state()
+
+# Local modules read their configuration from the environment at import time
+from directory_snapshot import DirectorySnapshot
+from endpoint_capabilities import get_capabilities
+from hire_journal import get_journal, hire_key
+from hire_validation import preflight, supervisor_id
+from step_graph import run_graph
+
+# Logins go over HTTP first; Selenium (see selenium_api()) is only imported for the browser fallback
+from bamboo_http_login import http_login
+from run_logging import configure_logging, hire_context, in_context, lazy_json, lazy_body
+from run_metrics import RunMetrics, endpoint_label
+from metrics_exporter import start_metrics_server
 # ─── Configure Logging ─────────────────────────────────────────────────────────
 logging.basicConfig(
     level=logging.INFO,
@@ -75,18 +87,159 @@ SHEET_NAME   = os.getenv("SHEET_NAME", "Sheet1")  # Updated to match the actual
 SLACK_BOT_TOKEN  = os.getenv("SLACK_BOT_TOKEN")
 SLACK_CHANNEL    = os.getenv("SLACK_CHANNEL", "#hr-alerts")
 
+# Upstream base URLs (overridable so runs can target a local mock server)
+BAMBOO_API_BASE  = os.getenv("BAMBOOHR_API_BASE", "https://api.bamboohr.com/api/gateway.php")
+BAMBOO_WEB_BASE  = os.getenv("BAMBOOHR_WEB_BASE", f"https://{BAMBOO_SUB}.bamboohr.com")
+
+# Concurrency and per-service rate budgets (sustained calls/second, burst size)
+ONBOARD_WORKERS  = int(os.getenv("ONBOARD_WORKERS", "1"))
+ONBOARD_WATCH    = os.getenv("ONBOARD_WATCH", "0") != "0"  # keep polling the sheet (see onboard_watch.py)
+ONBOARD_STEP_WORKERS = int(os.getenv("ONBOARD_STEP_WORKERS", "0"))  # threads for a hire's parallel steps (0 = 4 per worker)
+BAMBOO_RATE      = float(os.getenv("BAMBOOHR_RATE", "5"))
+BAMBOO_BURST     = int(os.getenv("BAMBOOHR_BURST", "10"))
+BAMBOO_READ_RATE   = float(os.getenv("BAMBOOHR_READ_RATE", str(BAMBOO_RATE)))   # GET calls to the REST API
+BAMBOO_READ_BURST  = int(os.getenv("BAMBOOHR_READ_BURST", str(BAMBOO_BURST)))
+BAMBOO_WRITE_RATE  = float(os.getenv("BAMBOOHR_WRITE_RATE", str(BAMBOO_RATE)))  # POST/PUT calls to the REST API
+BAMBOO_WRITE_BURST = int(os.getenv("BAMBOOHR_WRITE_BURST", str(BAMBOO_BURST)))
+WEBWORK_RATE     = float(os.getenv("WEBWORK_RATE", "2"))
+WEBWORK_BURST    = int(os.getenv("WEBWORK_BURST", "5"))
+SHEETS_RATE      = float(os.getenv("SHEETS_RATE", "1"))  # Sheets quota is 60 requests/minute/user
+SHEETS_BURST     = int(os.getenv("SHEETS_BURST", "60"))
+
+# Retries for throttled upstream calls (429, and 503 to GETs), honouring Retry-After when sent
+HTTP_MAX_RETRIES   = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_BASE  = float(os.getenv("HTTP_BACKOFF_BASE", "1"))   # seconds, doubled per attempt
+HTTP_BACKOFF_MAX   = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+# Attempts per create/hire call; retries are reconciled against the directory first (see create_or_hire_once)
+CREATE_MAX_ATTEMPTS = int(os.getenv("BAMBOOHR_CREATE_ATTEMPTS", "4"))
+
+# Sheet write-backs are batched and flushed after this many rows or seconds
+SHEETS_FLUSH_ROWS    = int(os.getenv("SHEETS_FLUSH_ROWS", "25"))
+SHEETS_FLUSH_SECONDS = float(os.getenv("SHEETS_FLUSH_SECONDS", "10"))
+
+# Rows fetched per page when scanning the sheet for pending hires
+SHEETS_PAGE_ROWS = int(os.getenv("SHEETS_PAGE_ROWS", "500"))
+
+# Pooled HTTP sessions: connections kept per upstream host, request timeout in seconds
+HTTP_POOL_SIZE   = int(os.getenv("HTTP_POOL_SIZE", str(max(10, ONBOARD_WORKERS))))
+HTTP_TIMEOUT     = float(os.getenv("HTTP_TIMEOUT", "60"))
+HTTP_KEEP_ALIVE  = os.getenv("HTTP_KEEP_ALIVE", "1") != "0"
+
+# Web logins: "auto" tries the HTTP login and falls back to the browser; "http" or "browser" forces one
+LOGIN_METHOD         = os.getenv("BAMBOOHR_LOGIN_METHOD", "auto")
+# Seconds a failed login blocks further attempts, and the browser's wait for each login page
+LOGIN_RETRY_SECONDS  = float(os.getenv("BAMBOOHR_LOGIN_RETRY_SECONDS", "60"))
+LOGIN_PAGE_TIMEOUT   = float(os.getenv("BAMBOOHR_LOGIN_PAGE_TIMEOUT", "20"))
+# Web session lifetime: assumed when the cookies carry no expiry, and how long before expiry to refresh
+SESSION_TTL            = float(os.getenv("BAMBOOHR_SESSION_TTL", "28800"))
+SESSION_REFRESH_MARGIN = float(os.getenv("BAMBOOHR_SESSION_REFRESH_MARGIN", "900"))
+# The cookie whose expiry is the session's (others, like load-balancer cookies, can be much shorter),
+# and the least time between two refreshes, so a short-lived session is not refreshed back to back
+SESSION_COOKIE         = os.getenv("BAMBOOHR_SESSION_COOKIE", "PHPSESSID")
+SESSION_MIN_REFRESH    = float(os.getenv("BAMBOOHR_SESSION_MIN_REFRESH_SECONDS", "300"))
+# Saved web session: cookie headers, and when they were issued / expire
+BAMBOO_HEADERS_FILE = os.getenv("BAMBOOHR_HEADERS_FILE", "bamboo_headers.json")
+BAMBOO_SESSION_FILE = os.getenv("BAMBOOHR_SESSION_FILE", "bamboo_session.json")
+
 # Path to the service account JSON file
-SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SERVICE_ACCOUNT_FILE .json")
+SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "SERVICE_ACCOUNT_FILE .json"))
+# Trimmed Sheets discovery document, cached between runs (see sheets_discovery_document()); empty uses the full document
+SHEETS_DISCOVERY_CACHE = os.getenv("SHEETS_DISCOVERY_CACHE", os.path.join(script_dir, "sheets_discovery.json"))
+# Alternative Sheets API root, e.g. the local mock in mock_services.py
+SHEETS_API_ENDPOINT = os.getenv("SHEETS_API_ENDPOINT")
+
+# The only Sheets methods this script calls (all on spreadsheets.values)
+SHEETS_VALUES_METHODS = ("get", "batchGet", "batchUpdate", "update")
 
 # ─── Google Sheets Setup ─────────────────────────────────────────────────────
+def _trim_sheets_discovery(document):
+    """
+    Cut the Sheets discovery document down to spreadsheets.values and the
+    schemas it references. googleapiclient renders a docstring for every
+    method of a resource the first time it is touched, and spreadsheets.batchUpdate's
+    Request schema alone takes ~250 ms of that.
+    """
+    values = document["resources"]["spreadsheets"]["resources"]["values"]
+    methods = {name: method for name, method in values["methods"].items() if name in SHEETS_VALUES_METHODS}
+
+    def refs(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                yield node["$ref"]
+            for child in node.values():
+                yield from refs(child)
+        elif isinstance(node, list):
+            for child in node:
+                yield from refs(child)
+
+    keep, pending = set(), list(refs(methods))
+    while pending:
+        name = pending.pop()
+        if name not in keep and name in document["schemas"]:
+            keep.add(name)
+            pending.extend(refs(document["schemas"][name]))
+    return {**document,
+            "resources": {"spreadsheets": {"resources": {"values": {"methods": methods}}}},
+            "schemas": {name: document["schemas"][name] for name in keep}}
+
+def sheets_discovery_document():
+    """
+    The trimmed Sheets v4 discovery document, from SHEETS_DISCOVERY_CACHE when it
+    was written by the installed googleapiclient, otherwise built from the copy
+    bundled with googleapiclient and cached. Returns None if neither is available.
+    """
+    from googleapiclient.version import __version__ as library_version
+    try:
+        with open(SHEETS_DISCOVERY_CACHE, "r") as f:
+            cached = json.load(f)
+        if cached.get("library") == library_version:
+            return cached["document"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    from googleapiclient.discovery_cache import get_static_doc
+    bundled = get_static_doc("sheets", "v4")
+    if not bundled:
+        return None
+    document = _trim_sheets_discovery(json.loads(bundled))
+    # Write-then-rename so a crash never leaves a half-written cache behind
+    tmp_path = f"{SHEETS_DISCOVERY_CACHE}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"library": library_version, "document": document}, f)
+        os.replace(tmp_path, SHEETS_DISCOVERY_CACHE)
+    except OSError as e:
+        logger.warning(f"Failed to cache the Sheets discovery document: {e}")
+    return document
+
 def setup_google_sheets():
     """Initialize Google Sheets API client."""
+    # Imported here: the Google client libraries are the slowest imports after Selenium
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build, build_from_document
     try:
         SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=SCOPES
-        )
-        return build("sheets", "v4", credentials=creds).spreadsheets()
+        client = {"client_options": {"api_endpoint": SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None}
+        cassette = get_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            # Answered from the cassette: no credentials or token exchange
+            client["http"] = CassetteHttp(cassette, "sheets")
+        else:
+            creds = service_account.Credentials.from_service_account_file(
+                SERVICE_ACCOUNT_FILE, scopes=SCOPES
+            )
+            if cassette is None:
+                client["credentials"] = creds
+            else:
+                import httplib2
+                from google_auth_httplib2 import AuthorizedHttp
+                client["http"] = CassetteHttp(cassette, "sheets", AuthorizedHttp(creds, http=httplib2.Http()))
+        document = sheets_discovery_document() if SHEETS_DISCOVERY_CACHE else None
+        if document is None:
+            return build("sheets", "v4", **client).spreadsheets()
+        return build_from_document(document, **client).spreadsheets()
     except Exception as e:
         logger.error(f"Failed to setup Google Sheets API: {str(e)}")
         raise
@@ -94,127 +247,460 @@ def setup_google_sheets():
 # ─── Slack Client (for summary) ───────────────────────────────────────────────
 def setup_slack_client():
     """Initialize Slack client."""
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        return CassetteSlack(cassette)
     if not SLACK_BOT_TOKEN:
         logger.warning("SLACK_BOT_TOKEN not set. Slack notifications will be disabled.")
         return None
+    from slack_sdk import WebClient
+    if cassette is not None:
+        return CassetteSlack(cassette, WebClient(token=SLACK_BOT_TOKEN))
     return WebClient(token=SLACK_BOT_TOKEN)
 
-# ─── Helper Functions ─────────────────────────────────────────────────────────
+# ─── Rate Budgets & Outbound HTTP ─────────────────────────────────────────────
 
-def read_pending_rows(sheets):
-    """Fetch rows where Overall status column is blank."""
+class RateBudget:
+    """
+    Thread-safe token bucket pacing calls to one upstream service.
+    Replaces the fixed sleeps between steps: callers only wait when the
+    service's budget is actually exhausted. A rate of 0 disables pacing.
+
+    The rate adapts to what the upstream tells us: every throttled response
+    halves it (down to min_rate) and pauses the whole bucket for Retry-After,
+    and each successful call wins back 1% of the configured rate.
+    """
+    def __init__(self, name, rate, burst, min_rate=None):
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.burst = max(1, burst)
+        self.waited = 0.0
+        self.throttles = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it is available. Returns the time waited."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Reserve the token even if we have to wait for it, so concurrent
+                # callers queue up behind each other instead of all waking at once.
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            self.waited += wait
+        if wait > 0:
+            logger.debug(f"Rate budget '{self.name}' exhausted, waiting {wait:.2f}s")
+            time.sleep(wait)
+        return wait
+
+    def throttled(self, retry_after=None):
+        """Record a 429/503: slow down, and hold every caller back for retry_after seconds."""
+        with self._lock:
+            self.throttles += 1
+            if self.rate > 0:
+                self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        logger.warning(f"Rate budget '{self.name}' throttled upstream, now {self.rate:.2f} calls/s")
+
+    def succeeded(self):
+        """Record a successful call, creeping back up towards the configured rate."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+RATE_BUDGETS = {
+    "bamboohr_read": RateBudget("bamboohr_read", BAMBOO_READ_RATE, BAMBOO_READ_BURST),
+    "bamboohr_write": RateBudget("bamboohr_write", BAMBOO_WRITE_RATE, BAMBOO_WRITE_BURST),
+    "bamboohr_web": RateBudget("bamboohr_web", BAMBOO_RATE, BAMBOO_BURST),
+    "webwork": RateBudget("webwork", WEBWORK_RATE, WEBWORK_BURST),
+    "sheets": RateBudget("sheets", SHEETS_RATE, SHEETS_BURST),
+}
+
+# Latency, status, retry and byte counts for every outbound call and step of the current run
+RUN_METRICS = RunMetrics()
+
+def rate_budget_metrics():
+    """Rate limiter samples for the metrics endpoint (see metrics_exporter.render)."""
+    budgets = list(RATE_BUDGETS.values())
+    return [
+        ("onboard_rate_limiter_wait_seconds_total", "counter", "Time callers spent waiting for a rate budget",
+         [({"budget": b.name}, round(b.waited, 6)) for b in budgets]),
+        ("onboard_rate_limiter_throttles_total", "counter", "Throttled (429/503) responses per rate budget",
+         [({"budget": b.name}, b.throttles) for b in budgets]),
+        ("onboard_rate_limiter_rate", "gauge", "Current adaptive rate in calls per second (0 = unpaced)",
+         [({"budget": b.name}, b.rate) for b in budgets]),
+    ]
+
+# Responses that mean "slow down"; both feed the rate budget
+THROTTLE_STATUSES = {429, 503}
+# Methods that are safe to send twice. A 429 means the request was not processed, so it is
+# retried for any method; a 503 from a POST may hide a create that went through, so it is not
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+def is_retryable(method, status):
+    """Whether api_request() may resend a request that got this throttled status."""
+    return status == 429 or (status in THROTTLE_STATUSES and method.upper() in IDEMPOTENT_METHODS)
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header (delta-seconds or HTTP-date). Returns None if absent or invalid."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        import datetime
+        return max(0.0, (parsedate_to_datetime(value) - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, response=None):
+    """Seconds to wait before retry number `attempt` (0-based): Retry-After if sent, else jittered exponential."""
+    retry_after = retry_after_seconds(response)
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX)
+    return min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+def budget_for(service, method):
+    """BambooHR REST reads and writes are paced separately; other services have one budget."""
+    if service == "bamboohr":
+        return RATE_BUDGETS["bamboohr_read" if method.upper() in ("GET", "HEAD") else "bamboohr_write"]
+    return RATE_BUDGETS[service]
+
+HTTP_SESSIONS = {}
+_sessions_lock = threading.Lock()
+
+def get_session(service):
+    """
+    Return the pooled keep-alive Session for an upstream service, creating it on first use.
+    Sessions only carry connection pools (no cookies or auth), so one is safely
+    shared by all workers.
+    """
+    with _sessions_lock:
+        session = HTTP_SESSIONS.get(service)
+        if session is None:
+            session = requests.Session()
+            # Records to / replays from the cassette when ONBOARD_CASSETTE_MODE is set (see http_cassettes.py)
+            adapter = session_adapter(service, pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if not HTTP_KEEP_ALIVE:
+                session.headers["Connection"] = "close"
+            HTTP_SESSIONS[service] = session
+        return session
+
+def connection_stats():
+    """Per-service request and connection counts, read from the sessions' urllib3 pools."""
+    stats = {}
+    with _sessions_lock:
+        sessions = dict(HTTP_SESSIONS)
+    for service, session in sessions.items():
+        requests_sent, connections = 0, 0
+        for adapter in {id(a): a for a in session.adapters.values()}.values():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+        stats[service] = {"requests": requests_sent, "connections": connections,
+                          "reused": max(0, requests_sent - connections)}
+    return stats
+
+@functools.lru_cache(maxsize=None)
+def bamboo_auth(api_key):
+    """HTTP basic auth for the BambooHR REST API, built once per key."""
+    return HTTPBasicAuth(api_key, "x")
+
+def api_request(service, method, url, **kwargs):
+    """
+    Send an HTTP request on the service's pooled session once its rate budget allows it.
+    Throttled responses are retried up to HTTP_MAX_RETRIES times after Retry-After
+    or a jittered backoff: 429 for every method, 503 and connection errors only
+    for GET/HEAD, which are safe to repeat. A 503 to a POST is handed back to the
+    caller (the create may have landed; see create_or_hire_once). Any other
+    response is returned as-is.
+    """
+    budget = budget_for(service, method)
+    endpoint = endpoint_label(method, url, BAMBOO_SUB)
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        budget.acquire()
+        started = time.perf_counter()
+        try:
+            response = get_session(service).request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            RUN_METRICS.record_call(service, endpoint, time.perf_counter() - started,
+                                    error=type(e).__name__, retry=attempt > 0)
+            if method.upper() not in IDEMPOTENT_METHODS or attempt == HTTP_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{service} {method} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        body = response.request.body
+        RUN_METRICS.record_call(service, endpoint, time.perf_counter() - started, status=response.status_code,
+                                bytes_sent=len(body) if isinstance(body, (bytes, str)) else 0,
+                                bytes_received=len(response.content), retry=attempt > 0)
+
+        if response.status_code not in THROTTLE_STATUSES:
+            budget.succeeded()
+            return response
+        budget.throttled(retry_after_seconds(response))
+        if attempt == HTTP_MAX_RETRIES or not is_retryable(method, response.status_code):
+            return response
+        delay = backoff_delay(attempt, response)
+        logger.warning(f"{service} {method} throttled ({response.status_code}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+def sheets_execute(operation, request):
+    """Execute a Google Sheets API request once the sheets budget allows it, timing it for the run report."""
+    RATE_BUDGETS["sheets"].acquire()
+    started = time.perf_counter()
     try:
-        logger.info(f"Reading data from sheet: {SHEET_ID}, tab: {SHEET_NAME}")
-        resp = sheets.values().get(
+        response = request.execute()
+    except Exception as e:
+        status = getattr(getattr(e, "resp", None), "status", None)
+        RUN_METRICS.record_call("sheets", operation, time.perf_counter() - started,
+                                status=status, error=None if status else type(e).__name__)
+        raise
+    RUN_METRICS.record_call("sheets", operation, time.perf_counter() - started, status=200)
+    return response
+
+# ─── Helper Functions ─────────────────────────────────────────────────────────
+
+def column_letter(index):
+    """Convert a 0-based column index to A1 notation (0 -> A, 26 -> AA)."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def read_sheet_headers(sheets):
+    """Fetch the header row of the onboarding sheet."""
+    logger.info(f"Reading headers from sheet: {SHEET_ID}, tab: {SHEET_NAME}")
+    resp = sheets_execute("values.get", sheets.values().get(
+        spreadsheetId=SHEET_ID,
+        range=f"{SHEET_NAME}!1:1"
+    ))
+    return resp.get("values", [[]])[0]
+
+def _row_to_hire(headers, clean_headers, row):
+    """Build the hire dict for one pending sheet row."""
+    # Extend row to match headers length
+    row += [""] * (len(headers) - len(row))
+    
+    # Create dictionary with both original and cleaned headers
+    row_dict = dict(zip(headers, row))
+    clean_row_dict = dict(zip(clean_headers, row))
+    
+    # Merge the dictionaries, preferring original headers
+    # (dates, pay and supervisor are normalised by the pre-flight stage, see hire_validation.py)
+    return {**clean_row_dict, **row_dict}
+
+def iter_pending_pages(sheets, headers, page_size=SHEETS_PAGE_ROWS, first_row=2):
+    """
+    Yield the pending rows page by page: a list of (row_index, hire) for rows
+    whose Overall status is blank, per page_size rows fetched (possibly empty).
+    Rows are filtered on the raw status cell before any dict is built, so
+    completed history costs almost nothing and the first page is yielded as
+    soon as it is read. Rows above first_row are not read at all (watch mode
+    starts at the first row its poll found pending).
+    """
+    # Clean up header names by stripping whitespace
+    clean_headers = [h.strip() if isinstance(h, str) else h for h in headers]
+    status_col = clean_headers.index("Overall status") if "Overall status" in clean_headers else None
+    last_col = column_letter(max(len(headers), 1) - 1)
+
+    total, pending = 0, 0
+    while True:
+        last_row = first_row + page_size - 1
+        resp = sheets_execute("values.get", sheets.values().get(
             spreadsheetId=SHEET_ID,
-            range=f"{SHEET_NAME}!A1:P"  # Include all columns up to P
-        ).execute()
+            range=f"{SHEET_NAME}!A{first_row}:{last_col}{last_row}"
+        ))
         rows = resp.get("values", [])
-        
-        if not rows:
+        total += len(rows)
+
+        page = []
+        for i, row in enumerate(rows, start=first_row):
+            # Check if this row is pending (Overall status is empty)
+            if status_col is not None and status_col < len(row) and str(row[status_col]).strip():
+                continue
+            page.append((i, _row_to_hire(headers, clean_headers, row)))
+        pending += len(page)
+        yield page
+
+        # The API drops trailing empty rows, so a short page is the last one
+        if len(rows) < page_size:
+            break
+        first_row = last_row + 1
+
+    logger.info(f"Scanned {total} rows, found {pending} pending hires")
+
+def iter_pending_rows(sheets, headers, page_size=SHEETS_PAGE_ROWS, first_row=2):
+    """Yield (row_index, hire) for rows whose Overall status is blank (see iter_pending_pages())."""
+    for page in iter_pending_pages(sheets, headers, page_size, first_row):
+        yield from page
+
+def read_pending_rows(sheets):
+    """Fetch rows where Overall status column is blank. Returns (headers, [(row_index, hire), ...])."""
+    try:
+        headers = read_sheet_headers(sheets)
+        if not headers:
             logger.warning("No data found in the sheet.")
             return [], []
-            
-        headers = rows[0]
-        # Clean up header names by stripping whitespace
-        clean_headers = [h.strip() if isinstance(h, str) else h for h in headers]
-        
-        data = rows[1:]
-        pending = []
-        
-        logger.info(f"Found {len(data)} total rows, checking for pending hires...")
-        
-        for i, row in enumerate(data, start=2):
-            # Extend row to match headers length
-            row += [""] * (len(headers) - len(row))
-            
-            # Create dictionary with both original and cleaned headers
-            row_dict = dict(zip(headers, row))
-            clean_row_dict = dict(zip(clean_headers, row))
-            
-            # Merge the dictionaries, preferring original headers
-            merged_dict = {**clean_row_dict, **row_dict}
-            
-            # Check if this row is pending (Overall status is empty)
-            status_value = merged_dict.get("Overall status", "").strip()
-            if status_value == "":
-                # Convert date format if needed
-                if "Start Date" in merged_dict:
-                    date_str = merged_dict["Start Date"].strip()
-                    # Try to convert MM/DD/YY to YYYY-MM-DD
-                    try:
-                        from datetime import datetime
-                        dt = datetime.strptime(date_str, "%m/%d/%y")
-                        merged_dict["Start Date"] = dt.strftime("%Y-%m-%d")
-                    except:
-                        # If conversion fails, keep original
-                        pass
-                        
-                pending.append((i, merged_dict))
-                
-        logger.info(f"Found {len(pending)} pending hires to process")
-        return headers, pending
+        return headers, list(iter_pending_rows(sheets, headers))
     except Exception as e:
         logger.error(f"Error reading from Google Sheet: {str(e)}")
         raise
 
-def write_back(sheets, row_index, status, notes):
-    """Update Overall status & Notes for a specific row."""
-    try:
-        # Use ASCII alternatives instead of emojis to avoid encoding issues on Windows
-        if status == "❌":
-            status = "FAILED"
-        elif status == "✔️":
-            status = "SUCCESS"
-            
-        logger.info(f"Updating row {row_index} with status: {status}, notes: {notes}")
-        
-        # First, get the current headers to find the correct columns
-        resp = sheets.values().get(
-            spreadsheetId=SHEET_ID,
-            range=f"{SHEET_NAME}!A1:P1"  # Get header row
-        ).execute()
-        
-        headers = resp.get("values", [[]])[0]
-        
+class WriteBackBuffer:
+    """
+    Collects Overall status / Notes updates and writes them with a single
+    values.batchUpdate call. The two columns are resolved once per run.
+    Flushes once max_rows rows are waiting or the oldest has waited max_age
+    seconds: add() checks both, and a caller that may block for a while (waiting
+    on a slow hire) calls flush_if_due() every due_in() seconds. Call flush() at
+    the end of the run for the rest.
+    """
+    def __init__(self, sheets, headers=None, max_rows=SHEETS_FLUSH_ROWS, max_age=SHEETS_FLUSH_SECONDS):
+        self.sheets = sheets
+        self.max_rows = max(1, max_rows)
+        self.max_age = max_age
+        self.pending = []
+        self.first_added = None
+        self.status_col, self.notes_col = self._resolve_columns(headers)
+
+    def _resolve_columns(self, headers):
+        if headers is None:
+            resp = sheets_execute("values.get", self.sheets.values().get(
+                spreadsheetId=SHEET_ID,
+                range=f"{SHEET_NAME}!1:1"  # Get header row
+            ))
+            headers = resp.get("values", [[]])[0]
+
         # Find the column indices for "Overall status" and "Notes"
         status_col = None
         notes_col = None
-        
         for i, header in enumerate(headers):
             if header.strip() == "Overall status":
-                status_col = i
+                status_col = column_letter(i)
             if header.strip() == "Notes":
-                notes_col = i
-        
+                notes_col = column_letter(i)
+
         if status_col is None or notes_col is None:
             logger.error("Could not find 'Overall status' or 'Notes' columns in the sheet")
+        return status_col, notes_col
+
+    def add(self, row_index, status, notes):
+        """Queue the status and notes for a row, flushing if a threshold is reached."""
+        self._queue(row_index, status, notes)
+        self.flush_if_due()
+
+    def due_in(self):
+        """Seconds until the queued updates are due for a flush, or None if nothing is queued."""
+        if not self.pending:
+            return None
+        return max(0.0, self.first_added + self.max_age - time.monotonic())
+
+    def flush_if_due(self):
+        """Flush if max_rows rows are waiting or the oldest has waited max_age seconds."""
+        if self.pending and (len(self.pending) // 2 >= self.max_rows or self.due_in() == 0):
+            self.flush()
+
+    def add_all(self, updates):
+        """Queue (row_index, status, notes) for several rows and write them all in one call."""
+        for row_index, status, notes in updates:
+            self._queue(row_index, status, notes)
+        self.flush()
+
+    def _queue(self, row_index, status, notes):
+        # Use ASCII alternatives instead of emojis to avoid encoding issues on Windows
+        if status == "❌":
+            status = "FAILED"
+        elif status == "✔️":
+            status = "SUCCESS"
+
+        logger.info(f"Queueing update for row {row_index} with status: {status}, notes: {notes}")
+        if self.status_col is None or self.notes_col is None:
             return
-            
-        # Convert column indices to A1 notation
-        status_col_letter = chr(65 + status_col)  # A=65 in ASCII
-        notes_col_letter = chr(65 + notes_col)
-        
-        # Update status column
-        sheets.values().update(
-            spreadsheetId=SHEET_ID,
-            range=f"{SHEET_NAME}!{status_col_letter}{row_index}",
-            valueInputOption="RAW",
-            body={"values": [[status]]}
-        ).execute()
-        
-        # Update notes column
-        sheets.values().update(
-            spreadsheetId=SHEET_ID,
-            range=f"{SHEET_NAME}!{notes_col_letter}{row_index}",
-            valueInputOption="RAW",
-            body={"values": [[notes]]}
-        ).execute()
-        
-        logger.info(f"Row {row_index} updated successfully")
-    except Exception as e:
-        logger.error(f"Error updating Google Sheet: {str(e)}")
-        # Continue processing other rows even if one update fails
+
+        self.pending.append({"range": f"{SHEET_NAME}!{self.status_col}{row_index}", "values": [[status]]})
+        self.pending.append({"range": f"{SHEET_NAME}!{self.notes_col}{row_index}", "values": [[notes]]})
+        if self.first_added is None:
+            self.first_added = time.monotonic()
+
+    def flush(self):
+        """Write every queued update in one values.batchUpdate call."""
+        if not self.pending:
+            return
+        data, self.pending, self.first_added = self.pending, [], None
+        try:
+            sheets_execute("values.batchUpdate", self.sheets.values().batchUpdate(
+                spreadsheetId=SHEET_ID,
+                body={"valueInputOption": "RAW", "data": data}
+            ))
+            logger.info(f"Flushed {len(data) // 2} row update(s) to the sheet")
+        except Exception as e:
+            logger.error(f"Error updating Google Sheet: {str(e)}")
+            # Continue processing other rows even if one update fails
+
+def needs_compensation(hire):
+    """
+    Whether HireRun.step_compensation will write a compensation row for this hire:
+    not for an employee who already exists (journaled by an earlier run, or in the
+    directory), nor once the row was written. If the directory cannot be loaded
+    the answer is no, so a valid update-only row is never rejected for it.
+    """
+    done = get_journal().steps(hire_key(hire))
+    if "employee" in done:
+        return not done["employee"].get("existing") and "compensation" not in done
+    if "create_started" in done:
+        # This hire's own create was in flight when an earlier run died (see HireRun.step_employee)
+        return True
+    directory = get_employee_directory(BAMBOO_SUB, BAMBOO_KEY)
+    if directory.load():
+        return False
+    return directory.find_by_email(hire.get("Email")) is None
+
+def preflight_pending(rows, write_backs, seen=None):
+    """
+    Validate and normalise a page of pending rows before any of its hires
+    makes a BambooHR or WebWork call (see hire_validation.py). Pay Rate is only
+    required where a compensation row will be written, which takes the
+    directory (usually from the local snapshot). Pass the same seen dict for
+    every page of a run so duplicates of rows on earlier pages are caught.
+    Invalid rows are queued for write-back as FAILED with the reasons.
+    Returns (valid rows, rejected count).
+    """
+    valid, rejected = preflight(rows, needs_compensation, seen)
+    if rejected:
+        logger.warning(f"Pre-flight rejected {len(rejected)} of {len(rows)} pending row(s) on this page")
+        RUN_METRICS.incr("hires", amount=len(rejected), result="invalid")
+        if write_backs:
+            write_backs.add_all([(row_index, "FAILED", notes) for row_index, notes in rejected])
+    return valid, len(rejected)
+
+def write_back(sheets, row_index, status, notes):
+    """Update Overall status & Notes for a specific row immediately."""
+    buffer = WriteBackBuffer(sheets)
+    buffer.add(row_index, status, notes)
+    buffer.flush()
 
 def prepare_contract_data(employee):
     """
@@ -247,7 +733,7 @@ def prepare_contract_data(employee):
 
 def load_bamboo_headers():
     """Load saved authentication headers from bamboo_headers.json"""
-    headers_file = "bamboo_headers.json"
+    headers_file = BAMBOO_HEADERS_FILE
     try:
         with open(headers_file, "r") as f:
             headers = json.load(f)
@@ -274,11 +760,11 @@ def send_bamboo_signature_request(employee, auth_headers):
         
         # Construct URL with employee ID and template ID
         template_id = os.getenv("BAMBOOHR_TEMPLATE_ID", "319")  # Default to 319 if not set
-        url = f"https://ccdocs.bamboohr.com/ajax/files/send_signature_request.php?esignatureTemplateId={template_id}&employeeId={employee_id}"
+        url = f"{BAMBOO_WEB_BASE}/ajax/files/send_signature_request.php?esignatureTemplateId={template_id}&employeeId={employee_id}"
         logger.info(f"Request URL: {url}")
         
         # Make authenticated request
-        response = requests.get(url, headers=auth_headers)
+        response = api_request("bamboohr_web", "GET", url, headers=auth_headers)
         
         if response.status_code == 200:
             logger.info(f"BambooHR signature request sent successfully to {employee['Email']}")
@@ -291,21 +777,52 @@ def send_bamboo_signature_request(employee, auth_headers):
         logger.error(f"Error sending BambooHR signature request: {str(e)}")
         return 500, str(e)
 
+class WebWorkUsers:
+    """
+    Index of WebWork users keyed by lowercase email, shared by every lookup.
+    The user list is fetched once per run; users created during the run are
+    added from the create responses, so finding an id never needs a rescan.
+    """
+    def __init__(self):
+        self.by_email = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self, auth_headers, force=False):
+        """Fetch and index the user list unless already loaded. Raises on HTTP errors."""
+        with self._lock:
+            if self.loaded and not force:
+                return
+            resp = api_request("webwork", "GET", WEBWORK_URL, headers=auth_headers)
+            resp.raise_for_status()
+            self.by_email = {}
+            for user in resp.json():
+                if user.get("email"):
+                    self.by_email[user["email"].strip().lower()] = user
+            self.loaded = True
+            logger.info(f"Indexed {len(self.by_email)} WebWork users")
+
+    def add(self, user):
+        with self._lock:
+            self.by_email[user["email"].strip().lower()] = user
+
+    def find(self, email):
+        return self.by_email.get((email or "").strip().lower())
+
+WEBWORK_USERS = WebWorkUsers()
+
 def add_user_to_team(email, team_name, auth_headers):
     """Add an existing user to a team."""
     try:
         logger.info(f"Adding user {email} to team {team_name}")
         
         # Step 1: Find the user by email
-        resp = requests.get(f"https://www.webwork-tracker.com/rest-api/users", headers=auth_headers)
-        resp.raise_for_status()
-        
-        users = resp.json()
-        user = None
-        for u in users:
-            if u.get("email") == email:
-                user = u
-                break
+        WEBWORK_USERS.load(auth_headers)
+        user = WEBWORK_USERS.find(email)
+        if not user or user.get("id") is None:
+            # Created without an id in the response, or by someone else mid-run
+            WEBWORK_USERS.load(auth_headers, force=True)
+            user = WEBWORK_USERS.find(email)
         
         if not user:
             logger.error(f"User with email {email} not found")
@@ -321,7 +838,7 @@ def add_user_to_team(email, team_name, auth_headers):
             "team": team_name
         }
         
-        resp = requests.post(f"https://www.webwork-tracker.com/rest-api/users/teams", 
+        resp = api_request("webwork", "POST", f"{WEBWORK_URL}/teams", 
                             json=payload, headers=auth_headers)
         
         if resp.status_code == 200:
@@ -336,8 +853,45 @@ def add_user_to_team(email, team_name, auth_headers):
         logger.error(f"Error adding user to team: {str(e)}")
         return False
 
+def _webwork_create_user(employee, headers, **teams):
+    """
+    POST a new WebWork user with the given team field(s).
+    Returns (success, error_text). The WebWork API returns a 200 OK even for
+    failures, so success comes from the JSON response body.
+    """
+    payload = {
+        "email":      employee["Email"],
+        "firstname": employee["First Name"],
+        "lastname":  employee["Last Name"],
+        "position":   employee.get("Position", employee.get("Job Title", "")),
+        "role":       30,
+        **teams,
+        "project":    "Training"  # Assign Training project by default
+    }
+    
+    r = api_request("webwork", "POST", WEBWORK_URL, json=payload, headers=headers)
+    response_json = r.json()
+    
+    # Log the full response for debugging
+    logger.debug("WebWork API response: %s", lazy_json(response_json))
+    
+    if response_json.get("success") is False:
+        error_messages = response_json.get("message", ["Unknown WebWork error."])
+        if isinstance(error_messages, list):
+            return False, "; ".join(error_messages)
+        return False, str(error_messages)
+    
+    # Index the new user so later lookups don't need to fetch the user list
+    user = response_json.get("user") or response_json.get("data") or {}
+    WEBWORK_USERS.add({"id": user.get("id", response_json.get("id")), "email": employee["Email"]})
+    return True, None
+
 def invite_webwork(employee):
-    """Invite employee to WebWork time tracking system."""
+    """
+    Invite employee to WebWork time tracking system.
+    Tries the multi-team payload, then a single team plus add_user_to_team();
+    which payload this WebWork account accepts is remembered across runs.
+    """
     if not all([WEBWORK_URL, WEBWORK_USERNAME, WEBWORK_PASSWORD]):
         logger.error("Missing WebWork configuration. Check environment variables.")
         return 500, "Missing WebWork configuration"
@@ -346,71 +900,55 @@ def invite_webwork(employee):
         "Authorization": f"Basic {base64.b64encode(f'{WEBWORK_USERNAME}:{WEBWORK_PASSWORD}'.encode()).decode()}",
         "Content-Type": "application/json"
     }
+    capabilities = get_capabilities()
+    scope = f"webwork:{urlsplit(WEBWORK_URL).netloc}"
     
     try:
-        logger.info(f"Creating WebWork account for {employee['Email']}")
-        
-        # First try with teams array
-        payload = {
-            "email":      employee["Email"],
-            "firstname": employee["First Name"],
-            "lastname":  employee["Last Name"],
-            "position":   employee.get("Position", employee.get("Job Title", "")),
-            "role":       30,
-            "teams":      ["New Joiners - Onboarding Team", "AGENTS"],  # Try with array first
-            "project":    "Training"  # Assign Training project by default
-        }
-        
-        r = requests.post(WEBWORK_URL, json=payload, headers=headers)
-        
-        # The WebWork API returns a 200 OK even for failures,
-        # so we need to check the JSON response body.
-        response_json = r.json()
+        # Don't create a duplicate if the account already exists
+        try:
+            WEBWORK_USERS.load(headers)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Could not fetch WebWork users, creating without a duplicate check: {e}")
+        existing = WEBWORK_USERS.find(employee["Email"])
+        if existing:
+            logger.info(f"WebWork account already exists for {employee['Email']} (ID {existing.get('id')}), skipping creation")
+            return 200, "WebWork account already exists."
         
-        # Log the full response for debugging
-        logger.debug(f"WebWork API response: {json.dumps(response_json, indent=2)}")
+        logger.info(f"Creating WebWork account for {employee['Email']}")
         
-        if response_json.get("success") is False:
-            # If teams array failed, try with single team
-            logger.warning(f"Failed with teams array. Trying with single team.")
-            
-            payload = {
-                "email":      employee["Email"],
-                "firstname": employee["First Name"],
-                "lastname":  employee["Last Name"],
-                "position":   employee.get("Position", employee.get("Job Title", "")),
-                "role":       30,
-                "team":       "New Joiners - Onboarding Team",  # Primary team
-                "project":    "Training"  # Assign Training project by default
-            }
+        error_text, teams_array_failed = "Unknown WebWork error.", False
+        for variant in capabilities.order(scope, ["teams_array", "single_team"]):
+            if variant == "teams_array":
+                ok, error_text = _webwork_create_user(
+                    employee, headers, teams=["New Joiners - Onboarding Team", "AGENTS"]
+                )
+                if ok:
+                    capabilities.record(scope, variant, True)
+                    logger.info(f"WebWork account created successfully for {employee['Email']} with multiple teams")
+                    return 200, "WebWork account created successfully with multiple teams."
+                teams_array_failed = True
+                logger.warning(f"Failed with teams array. Trying with single team.")
+                continue
             
-            r = requests.post(WEBWORK_URL, json=payload, headers=headers)
-            response_json = r.json()
-            
-            # Log the full response for debugging
-            logger.debug(f"WebWork API single team response: {json.dumps(response_json, indent=2)}")
+            ok, error_text = _webwork_create_user(employee, headers, team="New Joiners - Onboarding Team")
+            if not ok:
+                break
+            capabilities.record(scope, variant, True)
+            if teams_array_failed:
+                # The same user was just accepted with one team, so it was the teams array that was rejected
+                capabilities.record(scope, "teams_array", False, unsupported=True)
             
-            if response_json.get("success") is False:
-                # It's still an error
-                error_messages = response_json.get("message", ["Unknown WebWork error."])
-                if isinstance(error_messages, list):
-                    error_text = "; ".join(error_messages)
-                else:
-                    error_text = str(error_messages)
-                logger.error(f"WebWork API error for {employee['Email']}: {error_text}")
-                return 500, error_text
+            # Success with single team, now add to second team
+            logger.info(f"WebWork account created successfully with primary team. Adding to second team.")
+            if add_user_to_team(employee["Email"], "AGENTS", headers):
+                logger.info(f"Successfully added user to AGENTS team")
+                return 200, "WebWork account created successfully and added to both teams."
             else:
-                # Success with single team, now add to second team
-                logger.info(f"WebWork account created successfully with primary team. Adding to second team.")
-                if add_user_to_team(employee["Email"], "AGENTS", headers):
-                    logger.info(f"Successfully added user to AGENTS team")
-                    return 200, "WebWork account created successfully and added to both teams."
-                else:
-                    logger.warning(f"Created account but failed to add to second team")
-                    return 200, "WebWork account created but failed to add to second team."
-        else:
-            logger.info(f"WebWork account created successfully for {employee['Email']} with multiple teams")
-            return 200, "WebWork account created successfully with multiple teams."
+                logger.warning(f"Created account but failed to add to second team")
+                return 200, "WebWork account created but failed to add to second team."
+        
+        logger.error(f"WebWork API error for {employee['Email']}: {error_text}")
+        return 500, error_text
             
     except Exception as e:
         logger.error(f"Error creating WebWork account: {str(e)}")
@@ -422,20 +960,116 @@ def send_slack_notification(slack, message):
         logger.warning("Slack notification skipped: client not configured")
         return False
         
+    from slack_sdk.errors import SlackApiError
+    started = time.perf_counter()
     try:
         logger.info(f"Sending Slack notification to {SLACK_CHANNEL}")
         response = slack.chat_postMessage(channel=SLACK_CHANNEL, text=message)
+        RUN_METRICS.record_call("slack", "chat.postMessage", time.perf_counter() - started, status="ok")
         logger.info("Slack notification sent successfully")
         return True
     except SlackApiError as e:
+        RUN_METRICS.record_call("slack", "chat.postMessage", time.perf_counter() - started, error=e.response['error'])
         logger.error(f"Error sending Slack notification: {e.response['error']}")
         return False
     except Exception as e:
+        RUN_METRICS.record_call("slack", "chat.postMessage", time.perf_counter() - started, error=type(e).__name__)
         logger.error(f"Unexpected error sending Slack notification: {str(e)}")
         return False
 
 # ─── Helpers for BambooHR REST API ──────────────────────────────────────────
 
+class EmployeeDirectory:
+    """
+    In-memory index of the BambooHR employee directory, shared by every lookup.
+    The directory is loaded once per run from the local DirectorySnapshot and
+    indexed by lowercase work email, id and displayName. Employees created
+    during the run are added to both as they appear.
+    """
+    def __init__(self, subdomain, api_key):
+        self.subdomain = subdomain
+        self.api_key = api_key
+        self.employees = []
+        self.by_email = {}
+        self.by_id = {}
+        self.by_name = {}
+        self.loaded = False
+        self.snapshot = DirectorySnapshot(
+            subdomain, api_key,
+            request=lambda method, url, **kwargs: api_request("bamboohr", method, url, **kwargs),
+        )
+        self._lock = threading.Lock()
+
+    def load(self, force=False):
+        """
+        Load and index the directory unless already loaded. It comes from the
+        on-disk snapshot, which syncs with BambooHR when stale (or when forced).
+        Returns None on success, or error text.
+        """
+        with self._lock:
+            if self.loaded and not force:
+                return None
+            try:
+                employees = self.snapshot.employees(force=force)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to fetch employee directory: {e}")
+                status = getattr(e.response, "status_code", None)
+                return f"API error: {status}" if status else str(e)
+
+            self.employees, self.by_email, self.by_id, self.by_name = [], {}, {}, {}
+            for employee in employees:
+                self._index(employee)
+            self.loaded = True
+            logger.info(f"Retrieved directory with {len(self.employees)} employees")
+            return None
+
+    def _index(self, employee):
+        self.employees.append(employee)
+        work_email = (employee.get('workEmail') or '').lower()
+        if work_email:
+            self.by_email[work_email] = employee
+        if employee.get('id'):
+            self.by_id[str(employee['id'])] = employee
+        if employee.get('displayName'):
+            self.by_name[employee['displayName'].lower()] = employee
+
+    def add(self, employee_id, person):
+        """Insert an employee created during this run, built from its sheet row."""
+        employee = {
+            "id": str(employee_id),
+            "displayName": f"{person.get('First Name', '').strip()} {person.get('Last Name', '').strip()}".strip(),
+            "firstName": person.get("First Name", "").strip(),
+            "lastName": person.get("Last Name", "").strip(),
+            "workEmail": person.get("Email", "").strip(),
+        }
+        with self._lock:
+            self._index(employee)
+        self.snapshot.add(employee)
+
+    def find_by_email(self, email):
+        return self.by_email.get((email or '').strip().lower())
+
+    def find_by_id(self, employee_id):
+        return self.by_id.get(str(employee_id))
+
+    def find_by_name(self, display_name):
+        return self.by_name.get((display_name or '').strip().lower())
+
+    def as_json(self):
+        """The directory in the shape returned by /v1/employees/directory."""
+        return {"employees": list(self.employees)}
+
+EMPLOYEE_DIRECTORIES = {}
+_directories_lock = threading.Lock()
+
+def get_employee_directory(subdomain, api_key):
+    """Return the shared EmployeeDirectory for a subdomain, creating it on first use."""
+    with _directories_lock:
+        directory = EMPLOYEE_DIRECTORIES.get(subdomain)
+        if directory is None:
+            directory = EMPLOYEE_DIRECTORIES[subdomain] = EmployeeDirectory(subdomain, api_key)
+        return directory
+
 def find_employee_by_email(subdomain, api_key, email):
     """
     Check if an employee already exists in BambooHR with the given email.
@@ -448,37 +1082,19 @@ def find_employee_by_email(subdomain, api_key, email):
     try:
         logger.info(f"Checking if employee with email {email} already exists in BambooHR")
         
-        # API endpoint for employee directory
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/directory"
+        directory = get_employee_directory(subdomain, api_key)
+        error = directory.load()
+        if error:
+            return None, error
         
-        # Make authenticated request
-        auth = HTTPBasicAuth(api_key, "x")
-        headers = {'Accept': 'application/json'}
-        response = requests.get(url, auth=auth, headers=headers)
+        employee = directory.find_by_email(email)
+        if employee:
+            employee_id = employee.get('id')
+            logger.info(f"Found existing employee with ID {employee_id} for email {email}")
+            return employee_id, None
         
-        if response.status_code == 200:
-            directory = response.json()
-            employees = directory.get('employees', [])
-            
-            # Log the number of employees found
-            logger.info(f"Retrieved directory with {len(employees)} employees")
-            
-            # Search for employee with matching email
-            for employee in employees:
-                # Get the work email safely, defaulting to empty string if not present
-                work_email = employee.get('workEmail', '') or ''
-                
-                # Compare emails case-insensitively
-                if work_email.lower() == email.lower():
-                    employee_id = employee.get('id')
-                    logger.info(f"Found existing employee with ID {employee_id} for email {email}")
-                    return employee_id, None
-            
-            logger.info(f"No existing employee found with email {email}")
-            return None, "Employee not found"
-        else:
-            logger.error(f"Error checking for existing employee: {response.status_code} - {response.text}")
-            return None, f"API error: {response.status_code}"
+        logger.info(f"No existing employee found with email {email}")
+        return None, "Employee not found"
             
     except Exception as e:
         logger.error(f"Exception while checking for existing employee: {str(e)}")
@@ -500,7 +1116,7 @@ def find_candidate_by_email(subdomain, api_key, email):
         logger.info(f"Searching for candidate with email: {email}")
         
         # API endpoint for applicant tracking system
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/applicant_tracking/applications"
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/applicant_tracking/applications"
         
         # Add query parameter for email search
         params = {
@@ -508,8 +1124,8 @@ def find_candidate_by_email(subdomain, api_key, email):
         }
         
         # Make authenticated request
-        auth = HTTPBasicAuth(api_key, "x")
-        response = requests.get(url, params=params, auth=auth)
+        auth = bamboo_auth(api_key)
+        response = api_request("bamboohr", "GET", url, params=params, auth=auth)
         
         if response.status_code == 200:
             applications = response.json()
@@ -537,12 +1153,93 @@ def find_candidate_by_email(subdomain, api_key, email):
             return None, f"API returned unexpected status code: {str(e)}"
         return None, str(e)
 
+# ─── Idempotent Create/Hire ───────────────────────────────────────────────────
+
+_create_locks = {}
+_create_locks_guard = threading.Lock()
+
+def _create_lock(key):
+    """One lock per hire key, so rows for the same hire never create concurrently."""
+    with _create_locks_guard:
+        return _create_locks.setdefault(key, threading.Lock())
+
+def find_created_employee(subdomain, api_key, person):
+    """
+    Check whether a create/hire call whose outcome we never saw actually landed,
+    by syncing the directory (changed-since feed) and looking the email up again.
+    Returns (employee_id or None, error); error is set if the check itself failed.
+    """
+    directory = get_employee_directory(subdomain, api_key)
+    error = directory.load(force=True)
+    if error:
+        return None, error
+    employee = directory.find_by_email(person.get("Email", ""))
+    return (employee.get("id") if employee else None), None
+
+def create_or_hire_once(subdomain, api_key, person, create, *args):
+    """
+    Run create(subdomain, api_key, *args), i.e. create_employee or hire_candidate,
+    at most once per hire (email, start date) across retries, concurrent rows and
+    restarts. An intent is journaled before every attempt and the employee id after
+    the call succeeds. A timeout, connection error or 5xx may still have created
+    the record, so it is looked for in a fresh directory sync before any retry.
+    Returns (employee_id, error).
+    """
+    key = hire_key(person)
+    journal = get_journal()
+    with _create_lock(key):
+        done = journal.steps(key)
+        if "created" in done:
+            logger.info(f"{person.get('Email')} was already created as employee {done['created']['bamboo_id']}")
+            return done["created"]["bamboo_id"], None
+
+        error = None
+        if "create_started" in done:
+            # An earlier run died mid-call: the record may exist already
+            employee_id, error = find_created_employee(subdomain, api_key, person)
+        else:
+            # Another row for the same hire may have created it earlier in this run
+            employee_id, _ = find_employee_by_email(subdomain, api_key, person.get("Email"))
+        if error:
+            return None, f"Could not check for an earlier create/hire: {error}"
+        if employee_id:
+            logger.info(f"Found employee {employee_id} for {person.get('Email')}, not creating another")
+            journal.record(key, "created", bamboo_id=employee_id)
+            return employee_id, None
+
+        for attempt in range(CREATE_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt - 1))
+            journal.record(key, "create_started", attempt=attempt + 1)
+            try:
+                employee_id, error = create(subdomain, api_key, *args)
+                if employee_id:
+                    journal.record(key, "created", bamboo_id=employee_id)
+                    return employee_id, None
+                # A definite rejection (4xx): nothing was created and retrying won't help
+                return None, error
+            except requests.exceptions.RequestException as e:
+                error = f"Exception: {str(e)}"
+                logger.warning(f"Create/hire attempt {attempt + 1} for {person.get('Email')} had an unknown outcome: {e}")
+
+            employee_id, check_error = find_created_employee(subdomain, api_key, person)
+            if employee_id:
+                logger.info(f"Attempt {attempt + 1} did create employee {employee_id} for {person.get('Email')}")
+                journal.record(key, "created", bamboo_id=employee_id)
+                return employee_id, None
+            if check_error:
+                # Can't prove the last attempt failed, so another one could duplicate the record
+                return None, f"{error} (could not verify outcome: {check_error})"
+        return None, error
+
 def create_employee(subdomain, api_key, person):
     """
     1. POST /employees/ to create the record.
     Returns the new employeeId on success, or None+error text on failure.
+    Connection errors, timeouts and 5xx responses are raised rather than returned,
+    since the record may have been created; create_or_hire_once() reconciles and retries.
     """
-    url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/"
+    url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/"
     
     # Create a minimal payload with only required fields
     # Based on BambooHR API documentation, only firstName, lastName, and status are truly required
@@ -560,9 +1257,10 @@ def create_employee(subdomain, api_key, person):
     if "Start Date" in person:
         minimal_payload["hireDate"] = person["Start Date"]
     
-    logger.info(f"Creating employee with minimal data: {json.dumps(minimal_payload, indent=2)}")
+    logger.info("Creating employee with minimal data")
+    logger.debug("Create payload: %s", lazy_json(minimal_payload))
     
-    auth = HTTPBasicAuth(api_key, "x")
+    auth = bamboo_auth(api_key)
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json"
@@ -571,13 +1269,15 @@ def create_employee(subdomain, api_key, person):
     try:
         # First attempt with minimal data
         logger.info("Sending create employee request to BambooHR API...")
-        r = requests.post(url, json=minimal_payload, auth=auth, headers=headers)
+        r = api_request("bamboohr", "POST", url, json=minimal_payload, auth=auth, headers=headers)
         
         if r.ok:
             # Success! Get the employee ID
             loc = r.headers.get("Location", "")
             eid = loc.rstrip("/").split("/")[-1]
             logger.info(f"Successfully created employee with ID: {eid}")
+            get_employee_directory(subdomain, api_key).add(eid, person)
+            COMPENSATION_TABLES.seed_empty(eid)
             
             # Now update with additional fields
             update_url = f"{url}{eid}"
@@ -599,22 +1299,24 @@ def create_employee(subdomain, api_key, person):
                 update_payload["location"] = person["Location"]
                 
             # Add manager reportsTo if present
-            if "Reports To" in person:
-                import re
-                m = re.search(r'\((\d+)\)$', person["Reports To"])
-                if m:
-                    update_payload["reportsTo"] = m.group(1)
+            if supervisor_id(person):
+                update_payload["reportsTo"] = supervisor_id(person)
             
             # Only update if we have additional fields
             if update_payload:
-                logger.info(f"Updating employee {eid} with additional data: {json.dumps(update_payload, indent=2)}")
-                update_r = requests.post(update_url, json=update_payload, auth=auth, headers=headers)
+                logger.info(f"Updating employee {eid} with additional data")
+                logger.debug("Update payload: %s", lazy_json(update_payload))
+                update_r = api_request("bamboohr", "POST", update_url, json=update_payload, auth=auth, headers=headers)
                 
                 if not update_r.ok:
                     logger.warning(f"Failed to update employee with additional data: {update_r.status_code} - {update_r.text}")
             
             return eid, None
         else:
+            if r.status_code >= 500:
+                logger.error(f"Create employee failed: {r.status_code} - {r.text}")
+                r.raise_for_status()
+
             # Try to parse the response as JSON
             try:
                 error_detail = r.json()
@@ -634,7 +1336,8 @@ def create_employee(subdomain, api_key, person):
                 # Check if this is a duplicate email error
                 if "Duplicate email" in r.text or "duplicate" in r.text.lower():
                     logger.error("DUPLICATE EMAIL DETECTED - Need to find and update existing employee instead")
-                    # Try to find the employee by email
+                    # The index did not know this email, so it is stale: refresh it before looking again
+                    get_employee_directory(subdomain, api_key).load(force=True)
                     existing_id, _ = find_employee_by_email(subdomain, api_key, person.get("Email", ""))
                     if existing_id:
                         logger.info(f"Found existing employee with ID {existing_id} for duplicate email")
@@ -652,11 +1355,13 @@ def create_employee(subdomain, api_key, person):
                     "Content-Type": "application/xml"
                 }
                 
-                r = requests.post(url, data=xml_payload, auth=auth, headers=xml_headers)
+                r = api_request("bamboohr", "POST", url, data=xml_payload, auth=auth, headers=xml_headers)
                 if r.ok:
                     loc = r.headers.get("Location", "")
                     eid = loc.rstrip("/").split("/")[-1]
                     logger.info(f"Successfully created employee with ID: {eid} using XML format")
+                    get_employee_directory(subdomain, api_key).add(eid, person)
+                    COMPENSATION_TABLES.seed_empty(eid)
                     return eid, None
                 else:
                     logger.error(f"XML attempt also failed: {r.status_code} - {r.text}")
@@ -669,6 +1374,8 @@ def create_employee(subdomain, api_key, person):
             
             return None, f"Create failed: Status {r.status_code}"
             
+    except requests.exceptions.RequestException:
+        raise
     except Exception as e:
         logger.error(f"Exception during employee creation: {str(e)}")
         # Print the full stack trace for debugging
@@ -676,6 +1383,75 @@ def create_employee(subdomain, api_key, person):
         logger.error(f"Stack trace: {traceback.format_exc()}")
         return None, f"Exception: {str(e)}"
 
+class CompensationTables:
+    """
+    Compensation rows per employee id, shared by every compensation check and
+    write in the run. Each employee's table is fetched at most once; employees
+    created by this run start with a known-empty table and are never fetched.
+    Writes update the cached rows, so a retried or resumed write needs no GET.
+    Also keeps the numbers the run report prints (calls made vs. the one GET per
+    check of the uncached flow, and per-hire latency of the compensation step).
+    """
+    def __init__(self):
+        self.rows = {}
+        self.gets = 0
+        self.gets_saved = 0
+        self.writes = 0
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def seed_empty(self, employee_id):
+        """Mark a just-created employee's table as empty."""
+        with self._lock:
+            self.rows.setdefault(str(employee_id), [])
+
+    def fetch(self, subdomain, api_key, employee_id):
+        """Return (rows, error) for an employee, from the cache when possible."""
+        employee_id = str(employee_id)
+        with self._lock:
+            if employee_id in self.rows:
+                self.gets_saved += 1
+                return list(self.rows[employee_id]), None
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}/tables/compensation/"
+        response = api_request("bamboohr", "GET", url, auth=bamboo_auth(api_key), headers={'Accept': 'application/json'})
+        with self._lock:
+            self.gets += 1
+        if response.status_code != 200:
+            return None, f"{response.status_code} - {response.text}"
+        try:
+            rows = response.json() or []
+        except ValueError as e:
+            return None, f"Could not parse compensation table: {e}"
+        with self._lock:
+            self.rows[employee_id] = rows
+        return list(rows), None
+
+    def record_write(self, employee_id, row, seconds):
+        """Fold a successful PUT/POST into the cached table and the stats."""
+        employee_id = str(employee_id)
+        with self._lock:
+            if row.get("id"):
+                rows = self.rows.setdefault(employee_id, [])
+                rows[:] = [r for r in rows if str(r.get("id")) != str(row["id"])] + [row]
+            else:
+                # Without the new row's id the cached table can't be trusted for a later PUT
+                self.rows.pop(employee_id, None)
+            self.writes += 1
+            self.latencies.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                "writes": self.writes,
+                "gets": self.gets,
+                "gets_saved": self.gets_saved,
+                "avg_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+            }
+
+COMPENSATION_TABLES = CompensationTables()
+
 def check_compensation_exists(subdomain, api_key, employee_id):
     """
     Check if an employee already has compensation records.
@@ -683,13 +1459,9 @@ def check_compensation_exists(subdomain, api_key, employee_id):
     """
     try:
         logger.info(f"Checking if employee {employee_id} already has compensation records")
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}/tables/compensation"
-        auth = HTTPBasicAuth(api_key, "x")
-        headers = {'Accept': 'application/json'}
-        response = requests.get(url, auth=auth, headers=headers)
+        records, error = COMPENSATION_TABLES.fetch(subdomain, api_key, employee_id)
         
-        if response.status_code == 200:
-            records = response.json()
+        if error is None:
             if records and len(records) > 0:
                 logger.info(f"Employee {employee_id} already has {len(records)} compensation records")
                 return True
@@ -697,7 +1469,7 @@ def check_compensation_exists(subdomain, api_key, employee_id):
                 logger.info(f"Employee {employee_id} has no existing compensation records")
                 return False
         else:
-            logger.warning(f"Failed to check compensation records: {response.status_code}")
+            logger.warning(f"Failed to check compensation records: {error}")
             # If we can't check, assume no records to be safe
             return False
     except Exception as e:
@@ -710,17 +1482,7 @@ def update_employee(subdomain, api_key, employee_id, person):
     Uses XML format which is more reliable with BambooHR's API.
     """
     # Use the correct API endpoint format
-    url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}"
-    
-    # Extract the supervisor ID from "Reports To" field if present
-    supervisor_id = None
-    reports_to = person.get("Reports To", "")
-    if reports_to:
-        # Extract ID from format like "Name (ID)"
-        import re
-        match = re.search(r'\((\d+)\)$', reports_to)
-        if match:
-            supervisor_id = match.group(1)
+    url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}"
     
     # Build payload with all job information fields
     payload = {
@@ -730,8 +1492,8 @@ def update_employee(subdomain, api_key, employee_id, person):
         "location"  : person.get("Location", "")
     }
     # Add manager field only if present (BambooHR field id is reportsTo)
-    if supervisor_id:
-        payload["reportsTo"] = supervisor_id
+    if supervisor_id(person):
+        payload["reportsTo"] = supervisor_id(person)
     
     logger.info(f"Updating employee {employee_id} with job information: {payload}")
     
@@ -743,7 +1505,7 @@ def update_employee(subdomain, api_key, employee_id, person):
     
     logger.info(f"XML payload: {xml_data}")
     
-    auth = HTTPBasicAuth(api_key, "x")
+    auth = bamboo_auth(api_key)
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/xml"
@@ -753,34 +1515,41 @@ def update_employee(subdomain, api_key, employee_id, person):
     for attempt in range(3):
         try:
             logger.info(f"Sending update employee request (attempt {attempt+1}/3)...")
-            r = requests.post(url, data=xml_data, auth=auth, headers=headers)
+            r = api_request("bamboohr", "POST", url, data=xml_data, auth=auth, headers=headers)
             if r.ok:
                 logger.info(f"Successfully updated employee {employee_id}")
                 return True, None
             else:
                 logger.error(f"Update employee attempt {attempt+1} failed: Status {r.status_code}")
                 logger.error(f"Response body: {r.text}")
+                # Client errors won't succeed on retry, and api_request already retried throttling
+                if r.status_code < 500:
+                    break
         except Exception as e:
             logger.error(f"Exception during update employee attempt {attempt+1}: {str(e)}")
             
         # Wait before retry
-        time.sleep(2 ** attempt)
+        if attempt < 2:
+            time.sleep(backoff_delay(attempt, r))
     
     # If we get here, all attempts failed
-    error_details = f"Status: {r.status_code}, Body: {r.text}" if r else "Request failed"
-    return False, f"Update failed after 3 attempts: {error_details}"
+    error_details = f"Status: {r.status_code}, Body: {r.text}" if r is not None else "Request failed"
+    return False, f"Update failed after {attempt+1} attempt(s): {error_details}"
 
 def add_compensation(subdomain, api_key, employee_id, person):
     """
     Add or update compensation for an employee using XML (BambooHR preferred).
     - Cleans pay rate
     - Checks for existing compensation for effectiveDate and updates if found
+      (rows come from COMPENSATION_TABLES, so most checks cost no GET)
     - Logs full error details
+    - Stores the row id it wrote in person["Compensation Row ID"]
     """
+    started = time.perf_counter()
     try:
         logger.info(f"Adding compensation for employee {employee_id}")
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}/tables/compensation/"
-        auth = HTTPBasicAuth(api_key, "x")
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}/tables/compensation/"
+        auth = bamboo_auth(api_key)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/xml"
@@ -821,36 +1590,38 @@ def add_compensation(subdomain, api_key, employee_id, person):
         logger.info(f"XML payload: {xml_data}")
 
         # Check for existing compensation for this effectiveDate
-        check_url = url
-        check_headers = {'Accept': 'application/json'}
-        check_resp = requests.get(check_url, auth=auth, headers=check_headers)
-        if check_resp.status_code == 200:
-            try:
-                records = check_resp.json()
-                for row in records:
-                    if row.get("effectiveDate") == payload["effectiveDate"]:
-                        row_id = row.get("id")
-                        if row_id:
-                            update_url = f"{url}{row_id}"
-                            logger.info(f"Existing compensation found for date. Updating row {row_id}")
-                            put_resp = requests.put(update_url, data=xml_data, auth=auth, headers=headers)
-                            if put_resp.ok:
-                                logger.info(f"✅ Updated compensation row {row_id} for employee {employee_id}")
-                                return True, None
-                            else:
-                                logger.error(f"❌ Update failed: {put_resp.status_code} - {put_resp.text}")
-                                logger.error(f"Headers: {put_resp.headers}")
-                                return False, f"Update failed: {put_resp.status_code} - {put_resp.text}"
-            except Exception as e:
-                logger.warning(f"Could not parse GET response as JSON: {e}")
+        records, check_error = COMPENSATION_TABLES.fetch(subdomain, api_key, employee_id)
+        if check_error is None:
+            for row in records:
+                if row.get("effectiveDate") == payload["effectiveDate"]:
+                    row_id = row.get("id")
+                    if row_id:
+                        update_url = f"{url}{row_id}"
+                        logger.info(f"Existing compensation found for date. Updating row {row_id}")
+                        put_resp = api_request("bamboohr", "PUT", update_url, data=xml_data, auth=auth, headers=headers)
+                        if put_resp.ok:
+                            logger.info(f"✅ Updated compensation row {row_id} for employee {employee_id}")
+                            person["Compensation Row ID"] = str(row_id)
+                            COMPENSATION_TABLES.record_write(employee_id, dict(row, **payload), time.perf_counter() - started)
+                            return True, None
+                        else:
+                            logger.error(f"❌ Update failed: {put_resp.status_code} - {put_resp.text}")
+                            logger.error(f"Headers: {put_resp.headers}")
+                            return False, f"Update failed: {put_resp.status_code} - {put_resp.text}"
         else:
-            logger.warning(f"Could not GET compensation table: {check_resp.status_code} - {check_resp.text}")
+            logger.warning(f"Could not GET compensation table: {check_error}")
 
         # POST new compensation row
         logger.info(f"No existing row found. Creating new compensation entry...")
-        post_resp = requests.post(url, data=xml_data, auth=auth, headers=headers)
+        post_resp = api_request("bamboohr", "POST", url, data=xml_data, auth=auth, headers=headers)
         if post_resp.ok:
             logger.info(f"✅ Created compensation for employee {employee_id}")
+            # BambooHR points the Location header at the new row
+            location = post_resp.headers.get("Location", "")
+            if location:
+                person["Compensation Row ID"] = location.rstrip("/").rsplit("/", 1)[-1]
+            COMPENSATION_TABLES.record_write(employee_id, dict(payload, id=person.get("Compensation Row ID")),
+                                             time.perf_counter() - started)
             return True, None
         else:
             logger.error(f"❌ POST failed: {post_resp.status_code} - {post_resp.text}")
@@ -866,56 +1637,19 @@ def provision_self_service(subdomain, api_key, employee_id, person):
     """
     Provision self-service access for the employee using multiple fallback methods.
     Tries /meta/users, onboarding trigger, welcome email, and access update.
-    Logs all attempts and errors.
+    The method that works for this subdomain, and any that hard-fail (404/403),
+    are remembered across runs, so later hires go straight to the working one.
     """
     logger.info(f"=== STARTING SELF-SERVICE PROVISION FOR EMPLOYEE {employee_id} ===")
     logger.info(f"Employee email: {person.get('Email', 'N/A')}")
     logger.info(f"Employee name: {person.get('First Name', '')} {person.get('Last Name', '')}")
 
-    # Method 1: Try the traditional /meta/users endpoint
-    logger.info("METHOD 1: Attempting traditional /meta/users endpoint")
-    success, message = _try_meta_users_endpoint(subdomain, api_key, employee_id, person)
-    if success:
-        logger.info("✅ Successfully provisioned using /meta/users endpoint")
-        return True, message
-    else:
-        logger.warning(f"⚠️ /meta/users endpoint failed: {message}")
-
-    # Method 2: Try using onboarding workflow trigger
-    logger.info("METHOD 2: Attempting onboarding workflow trigger")
-    success, message = _try_onboarding_trigger(subdomain, api_key, employee_id, person)
-    if success:
-        logger.info("✅ Successfully triggered onboarding workflow")
-        return True, message
-    else:
-        logger.warning(f"⚠️ Onboarding trigger failed: {message}")
-
-    # Method 3: Try using welcome email endpoint
-    logger.info("METHOD 3: Attempting welcome email endpoint")
-    success, message = _try_welcome_email(subdomain, api_key, employee_id, person)
-    if success:
-        logger.info("✅ Successfully sent welcome email")
-        return True, message
-    else:
-        logger.warning(f"⚠️ Welcome email failed: {message}")
-
-    # Method 4: Try updating employee with access fields
-    logger.info("METHOD 4: Attempting to update employee access permissions")
-    success, message = _try_update_access_permissions(subdomain, api_key, employee_id, person)
-    if success:
-        logger.info("✅ Successfully updated access permissions")
-        return True, message
-    else:
-        logger.warning(f"⚠️ Access permission update failed: {message}")
-
-    # Method 5: Try to activate employee with onboarding fields
-    logger.info("METHOD 5: Attempting to activate employee with onboarding status")
-    success, message = _try_activate_employee_onboarding(subdomain, api_key, employee_id, person)
+    success, message, _ = get_capabilities().run(
+        f"self_service:{subdomain}", SELF_SERVICE_STRATEGIES, subdomain, api_key, employee_id, person
+    )
     if success:
-        logger.info("✅ Successfully activated employee onboarding")
+        logger.info(f"✅ Self-service provisioned: {message}")
         return True, message
-    else:
-        logger.warning(f"⚠️ Employee onboarding activation failed: {message}")
 
     logger.error("❌ ALL SELF-SERVICE PROVISION METHODS FAILED")
     return False, "All self-service provision methods failed"
@@ -923,7 +1657,7 @@ def provision_self_service(subdomain, api_key, employee_id, person):
 def _try_activate_employee_onboarding(subdomain, api_key, employee_id, person):
     """Try to activate employee with onboarding-related fields that might trigger access."""
     try:
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}"
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}"
         
         # Try updating with onboarding and access-related fields
         xml_payload = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -939,29 +1673,29 @@ def _try_activate_employee_onboarding(subdomain, api_key, employee_id, person):
         logger.info(f"Trying employee onboarding activation at {url}")
         logger.info(f"XML payload: {xml_payload}")
         
-        auth = HTTPBasicAuth(api_key, "x")
+        auth = bamboo_auth(api_key)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/xml"
         }
         
-        response = requests.post(url, data=xml_payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", url, data=xml_payload, auth=auth, headers=headers)
         logger.info(f"Onboarding activation response status: {response.status_code}")
-        logger.info(f"Onboarding activation response body: {response.text}")
+        logger.debug("Onboarding activation response body: %s", lazy_body(response))
         
         if response.status_code == 200:
-            return True, "Successfully activated employee onboarding fields"
+            return True, "Successfully activated employee onboarding fields", response.status_code
         else:
-            return False, f"Onboarding activation failed: HTTP {response.status_code}"
+            return False, f"Onboarding activation failed: HTTP {response.status_code}", response.status_code
             
     except Exception as e:
         logger.error(f"Exception in _try_activate_employee_onboarding: {str(e)}")
-        return False, f"Exception: {str(e)}"
+        return False, f"Exception: {str(e)}", None
 
 def _try_meta_users_endpoint(subdomain, api_key, employee_id, person):
     """Try the traditional /meta/users endpoint (may be deprecated)."""
     try:
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/meta/users"
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/meta/users"
         
         # Try JSON payload first
         json_payload = {
@@ -971,21 +1705,21 @@ def _try_meta_users_endpoint(subdomain, api_key, employee_id, person):
         }
         
         logger.info(f"Trying JSON request to {url}")
-        logger.info(f"JSON payload: {json.dumps(json_payload, indent=2)}")
+        logger.debug("JSON payload: %s", lazy_json(json_payload))
         
-        auth = HTTPBasicAuth(api_key, "x")
+        auth = bamboo_auth(api_key)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/json"
         }
         
-        response = requests.post(url, json=json_payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", url, json=json_payload, auth=auth, headers=headers)
         logger.info(f"Response status: {response.status_code}")
         logger.info(f"Response headers: {dict(response.headers)}")
-        logger.info(f"Response body: {response.text}")
+        logger.debug("Response body: %s", lazy_body(response))
         
         if response.status_code == 200 or response.status_code == 201:
-            return True, "Successfully created user account via JSON"
+            return True, "Successfully created user account via JSON", response.status_code
         
         # If JSON fails, try XML format
         logger.info("JSON failed, trying XML format")
@@ -1001,32 +1735,32 @@ def _try_meta_users_endpoint(subdomain, api_key, employee_id, person):
         
         logger.info(f"XML payload: {xml_payload}")
         
-        response = requests.post(url, data=xml_payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", url, data=xml_payload, auth=auth, headers=headers)
         logger.info(f"XML Response status: {response.status_code}")
-        logger.info(f"XML Response body: {response.text}")
+        logger.debug("XML Response body: %s", lazy_body(response))
         
         if response.status_code == 200 or response.status_code == 201:
-            return True, "Successfully created user account via XML"
+            return True, "Successfully created user account via XML", response.status_code
         
         # Handle specific error cases
         if response.status_code == 404:
-            return False, "/meta/users endpoint not found (possibly deprecated)"
+            return False, "/meta/users endpoint not found (possibly deprecated)", response.status_code
         elif response.status_code == 403:
-            return False, "Insufficient permissions for /meta/users endpoint"
+            return False, "Insufficient permissions for /meta/users endpoint", response.status_code
         elif response.status_code == 400:
-            return False, f"Bad request to /meta/users: {response.text}"
+            return False, f"Bad request to /meta/users: {response.text}", response.status_code
         else:
-            return False, f"HTTP {response.status_code}: {response.text}"
+            return False, f"HTTP {response.status_code}: {response.text}", response.status_code
             
     except Exception as e:
         logger.error(f"Exception in _try_meta_users_endpoint: {str(e)}")
-        return False, f"Exception: {str(e)}"
+        return False, f"Exception: {str(e)}", None
 
 def _try_onboarding_trigger(subdomain, api_key, employee_id, person):
     """Try to trigger an onboarding workflow which may grant access."""
     try:
         # Try onboarding endpoint
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}/onboarding"
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}/onboarding"
         
         payload = {
             "sendWelcomeEmail": True,
@@ -1034,34 +1768,34 @@ def _try_onboarding_trigger(subdomain, api_key, employee_id, person):
         }
         
         logger.info(f"Trying onboarding trigger at {url}")
-        logger.info(f"Payload: {json.dumps(payload, indent=2)}")
+        logger.debug("Payload: %s", lazy_json(payload))
         
-        auth = HTTPBasicAuth(api_key, "x")
+        auth = bamboo_auth(api_key)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/json"
         }
         
-        response = requests.post(url, json=payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", url, json=payload, auth=auth, headers=headers)
         logger.info(f"Onboarding response status: {response.status_code}")
-        logger.info(f"Onboarding response body: {response.text}")
+        logger.debug("Onboarding response body: %s", lazy_body(response))
         
         if response.status_code == 200 or response.status_code == 201:
-            return True, "Successfully triggered onboarding workflow"
+            return True, "Successfully triggered onboarding workflow", response.status_code
         elif response.status_code == 404:
-            return False, "Onboarding endpoint not available"
+            return False, "Onboarding endpoint not available", response.status_code
         else:
-            return False, f"Onboarding failed: HTTP {response.status_code}"
+            return False, f"Onboarding failed: HTTP {response.status_code}", response.status_code
             
     except Exception as e:
         logger.error(f"Exception in _try_onboarding_trigger: {str(e)}")
-        return False, f"Exception: {str(e)}"
+        return False, f"Exception: {str(e)}", None
 
 def _try_welcome_email(subdomain, api_key, employee_id, person):
     """Try to send a welcome email which may include login instructions."""
     try:
         # Method 1: Try welcome email endpoint
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}/welcome"
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}/welcome"
         
         payload = {
             "email": person["Email"],
@@ -1069,40 +1803,40 @@ def _try_welcome_email(subdomain, api_key, employee_id, person):
         }
         
         logger.info(f"Trying welcome email at {url}")
-        logger.info(f"Payload: {json.dumps(payload, indent=2)}")
+        logger.debug("Payload: %s", lazy_json(payload))
         
-        auth = HTTPBasicAuth(api_key, "x")
+        auth = bamboo_auth(api_key)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/json"
         }
         
-        response = requests.post(url, json=payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", url, json=payload, auth=auth, headers=headers)
         logger.info(f"Welcome email response status: {response.status_code}")
-        logger.info(f"Welcome email response body: {response.text}")
+        logger.debug("Welcome email response body: %s", lazy_body(response))
         
         if response.status_code == 200 or response.status_code == 201:
-            return True, "Successfully sent welcome email"
+            return True, "Successfully sent welcome email", response.status_code
         
         # Method 2: Try notification endpoint for welcome
         logger.info("Welcome email endpoint failed, trying notification endpoint")
-        notify_url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}/notifications"
+        notify_url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}/notifications"
         
         notify_payload = {
             "type": "welcome_email",
             "recipient": person["Email"]
         }
         
-        response = requests.post(notify_url, json=notify_payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", notify_url, json=notify_payload, auth=auth, headers=headers)
         logger.info(f"Notification response status: {response.status_code}")
-        logger.info(f"Notification response body: {response.text}")
+        logger.debug("Notification response body: %s", lazy_body(response))
         
         if response.status_code == 200 or response.status_code == 201:
-            return True, "Successfully sent welcome notification"
+            return True, "Successfully sent welcome notification", response.status_code
         
         # Method 3: Try simple email trigger via employee update
         logger.info("Notification endpoint failed, trying email trigger via update")
-        update_url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}"
+        update_url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}"
         
         xml_payload = f"""<?xml version="1.0" encoding="UTF-8"?>
 <employee>
@@ -1115,26 +1849,26 @@ def _try_welcome_email(subdomain, api_key, employee_id, person):
             "Content-Type": "application/xml"
         }
         
-        response = requests.post(update_url, data=xml_payload, auth=auth, headers=xml_headers)
+        response = api_request("bamboohr", "POST", update_url, data=xml_payload, auth=auth, headers=xml_headers)
         logger.info(f"Email trigger response status: {response.status_code}")
-        logger.info(f"Email trigger response body: {response.text}")
+        logger.debug("Email trigger response body: %s", lazy_body(response))
         
         if response.status_code == 200:
-            return True, "Successfully triggered welcome email via employee update"
+            return True, "Successfully triggered welcome email via employee update", response.status_code
         
         if response.status_code == 404:
-            return False, "Welcome email endpoints not available"
+            return False, "Welcome email endpoints not available", response.status_code
         else:
-            return False, f"Welcome email failed: HTTP {response.status_code}"
+            return False, f"Welcome email failed: HTTP {response.status_code}", response.status_code
             
     except Exception as e:
         logger.error(f"Exception in _try_welcome_email: {str(e)}")
-        return False, f"Exception: {str(e)}"
+        return False, f"Exception: {str(e)}", None
 
 def _try_update_access_permissions(subdomain, api_key, employee_id, person):
     """Try to update employee record with access-related fields."""
     try:
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/employees/{employee_id}"
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/employees/{employee_id}"
         
         # Try updating with possible access-related fields
         xml_payload = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -1147,130 +1881,159 @@ def _try_update_access_permissions(subdomain, api_key, employee_id, person):
         logger.info(f"Trying access permission update at {url}")
         logger.info(f"XML payload: {xml_payload}")
         
-        auth = HTTPBasicAuth(api_key, "x")
+        auth = bamboo_auth(api_key)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/xml"
         }
         
-        response = requests.post(url, data=xml_payload, auth=auth, headers=headers)
+        response = api_request("bamboohr", "POST", url, data=xml_payload, auth=auth, headers=headers)
         logger.info(f"Access update response status: {response.status_code}")
-        logger.info(f"Access update response body: {response.text}")
+        logger.debug("Access update response body: %s", lazy_body(response))
         
         if response.status_code == 200 or response.status_code == 201:
-            return True, "Successfully updated employee access fields"
+            return True, "Successfully updated employee access fields", response.status_code
         else:
-            return False, f"Access update failed: HTTP {response.status_code}"
+            return False, f"Access update failed: HTTP {response.status_code}", response.status_code
             
     except Exception as e:
         logger.error(f"Exception in _try_update_access_permissions: {str(e)}")
-        return False, f"Exception: {str(e)}"
+        return False, f"Exception: {str(e)}", None
+
+# Self-service provisioning methods, in the order they are probed
+SELF_SERVICE_STRATEGIES = [
+    ("meta_users", _try_meta_users_endpoint),
+    ("onboarding_trigger", _try_onboarding_trigger),
+    ("welcome_email", _try_welcome_email),
+    ("update_access_permissions", _try_update_access_permissions),
+    ("activate_employee_onboarding", _try_activate_employee_onboarding),
+]
+
+def _packet_via_ajax(employee_id, auth_headers):
+    """Send the packet through the web app's AJAX onboarding endpoint."""
+    url = f"{BAMBOO_WEB_BASE}/ajax/onboarding/sendPacket"
+    
+    payload = {
+        "employeeId": employee_id,
+        "sendWelcomeEmail": True
+    }
+    
+    logger.info(f"AJAX URL: {url}")
+    logger.debug("AJAX payload: %s", lazy_json(payload))
+    logger.debug("Using headers: %s", lazy_json({k: v for k, v in auth_headers.items() if 'cookie' not in k.lower()}))
+    
+    response = api_request("bamboohr_web", "POST", url, json=payload, headers=auth_headers)
+    logger.info(f"AJAX response status: {response.status_code}")
+    logger.info(f"AJAX response headers: {dict(response.headers)}")
+    logger.debug("AJAX response body: %s...", lazy_body(response, 500))  # First 500 chars
+    
+    if response.status_code == 200:
+        return True, "New hire packet sent successfully via AJAX", response.status_code
+    return False, f"AJAX endpoint failed: HTTP {response.status_code}", response.status_code
+
+def _packet_rest_headers():
+    # Extract API key from auth headers if available
+    api_key = os.getenv("BAMBOOHR_API_KEY", "d15339ce41287e33908e18cb480115b0cc935d9b")
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json"
+    }
+    return bamboo_auth(api_key), headers
+
+def _packet_via_rest_onboarding(employee_id, auth_headers):
+    """Send the packet through the REST API onboarding endpoint."""
+    rest_url = f"{BAMBOO_API_BASE}/{BAMBOO_SUB}/v1/employees/{employee_id}/onboarding"
+    auth, rest_headers = _packet_rest_headers()
+    
+    rest_payload = {
+        "sendWelcomeEmail": True,
+        "sendOnboardingPacket": True
+    }
+    
+    logger.info(f"REST URL: {rest_url}")
+    logger.debug("REST payload: %s", lazy_json(rest_payload))
+    
+    response = api_request("bamboohr", "POST", rest_url, json=rest_payload, auth=auth, headers=rest_headers)
+    logger.info(f"REST response status: {response.status_code}")
+    logger.debug("REST response body: %s", lazy_body(response))
+    
+    if response.status_code == 200 or response.status_code == 201:
+        return True, "New hire packet sent successfully via REST API", response.status_code
+    return False, f"REST onboarding endpoint failed: HTTP {response.status_code}", response.status_code
+
+def _packet_via_notification(employee_id, auth_headers):
+    """Send a welcome notification instead of the packet."""
+    notify_url = f"{BAMBOO_API_BASE}/{BAMBOO_SUB}/v1/employees/{employee_id}/notify"
+    auth, rest_headers = _packet_rest_headers()
+    
+    notify_payload = {
+        "type": "welcome",
+        "sendEmail": True
+    }
+    
+    logger.info(f"Notify URL: {notify_url}")
+    logger.debug("Notify payload: %s", lazy_json(notify_payload))
+    
+    response = api_request("bamboohr", "POST", notify_url, json=notify_payload, auth=auth, headers=rest_headers)
+    logger.info(f"Notify response status: {response.status_code}")
+    logger.debug("Notify response body: %s", lazy_body(response))
+    
+    if response.status_code == 200 or response.status_code == 201:
+        return True, "Welcome notification sent successfully", response.status_code
+    return False, f"Notification endpoint failed: HTTP {response.status_code}", response.status_code
+
+def _packet_via_status_update(employee_id, auth_headers):
+    """Update the employee's status in the hope that it triggers the welcome email."""
+    update_url = f"{BAMBOO_API_BASE}/{BAMBOO_SUB}/v1/employees/{employee_id}"
+    auth, _ = _packet_rest_headers()
+    
+    # Update employee with a field that might trigger onboarding
+    update_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<employee>
+    <field id="status">Active</field>
+    <field id="sendWelcomeEmail">true</field>
+</employee>"""
+    
+    update_headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/xml"
+    }
+    
+    logger.info(f"Update URL: {update_url}")
+    logger.info(f"Update XML: {update_xml}")
+    
+    response = api_request("bamboohr", "POST", update_url, data=update_xml, auth=auth, headers=update_headers)
+    logger.info(f"Update response status: {response.status_code}")
+    logger.debug("Update response body: %s", lazy_body(response))
+    
+    if response.status_code == 200:
+        return True, "Employee status updated - welcome email may have been triggered", response.status_code
+    return False, f"{response.status_code} - {response.text}", response.status_code
+
+# New hire packet methods, in the order they are probed
+NEW_HIRE_PACKET_METHODS = [
+    ("ajax", _packet_via_ajax),
+    ("rest_onboarding", _packet_via_rest_onboarding),
+    ("notification", _packet_via_notification),
+    ("status_update", _packet_via_status_update),
+]
 
 def send_new_hire_packet(employee_id, auth_headers):
     """
     Send a new hire packet to the employee via BambooHR.
-    Enhanced with additional logging and alternative approaches.
+    Tries the AJAX endpoint, REST onboarding, notifications and a status update;
+    the method this account accepts is remembered across runs and tried first,
+    and methods that hard-fail (404/403) are skipped until they are re-probed.
     """
     logger.info(f"=== STARTING NEW HIRE PACKET SEND FOR EMPLOYEE {employee_id} ===")
     
     try:
-        # Method 1: Try the existing AJAX endpoint
-        logger.info("METHOD 1: Trying AJAX onboarding endpoint")
-        url = f"https://ccdocs.bamboohr.com/ajax/onboarding/sendPacket"
-        
-        payload = {
-            "employeeId": employee_id,
-            "sendWelcomeEmail": True
-        }
-        
-        logger.info(f"AJAX URL: {url}")
-        logger.info(f"AJAX payload: {json.dumps(payload, indent=2)}")
-        logger.info(f"Using headers: {json.dumps({k: v for k, v in auth_headers.items() if 'cookie' not in k.lower()}, indent=2)}")
-        
-        response = requests.post(url, json=payload, headers=auth_headers)
-        logger.info(f"AJAX response status: {response.status_code}")
-        logger.info(f"AJAX response headers: {dict(response.headers)}")
-        logger.info(f"AJAX response body: {response.text[:500]}...")  # First 500 chars
-        
-        if response.status_code == 200:
-            logger.info("✅ Successfully sent new hire packet via AJAX")
-            return 200, "New hire packet sent successfully via AJAX"
-        
-        # Method 2: Try REST API onboarding endpoint
-        logger.info("METHOD 2: Trying REST API onboarding endpoint")
-        rest_url = f"https://api.bamboohr.com/api/gateway.php/ccdocs/v1/employees/{employee_id}/onboarding"
-        
-        # Extract API key from auth headers if available
-        api_key = os.getenv("BAMBOOHR_API_KEY", "d15339ce41287e33908e18cb480115b0cc935d9b")
-        auth = HTTPBasicAuth(api_key, "x")
-        
-        rest_headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
-        
-        rest_payload = {
-            "sendWelcomeEmail": True,
-            "sendOnboardingPacket": True
-        }
-        
-        logger.info(f"REST URL: {rest_url}")
-        logger.info(f"REST payload: {json.dumps(rest_payload, indent=2)}")
-        
-        response = requests.post(rest_url, json=rest_payload, auth=auth, headers=rest_headers)
-        logger.info(f"REST response status: {response.status_code}")
-        logger.info(f"REST response body: {response.text}")
-        
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info("✅ Successfully sent new hire packet via REST API")
-            return 200, "New hire packet sent successfully via REST API"
-        
-        # Method 3: Try employee notification endpoint
-        logger.info("METHOD 3: Trying employee notification endpoint")
-        notify_url = f"https://api.bamboohr.com/api/gateway.php/ccdocs/v1/employees/{employee_id}/notify"
-        
-        notify_payload = {
-            "type": "welcome",
-            "sendEmail": True
-        }
-        
-        logger.info(f"Notify URL: {notify_url}")
-        logger.info(f"Notify payload: {json.dumps(notify_payload, indent=2)}")
-        
-        response = requests.post(notify_url, json=notify_payload, auth=auth, headers=rest_headers)
-        logger.info(f"Notify response status: {response.status_code}")
-        logger.info(f"Notify response body: {response.text}")
-        
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info("✅ Successfully sent welcome notification")
-            return 200, "Welcome notification sent successfully"
-        
-        # Method 4: Try updating employee status to trigger welcome email
-        logger.info("METHOD 4: Trying employee status update to trigger welcome")
-        update_url = f"https://api.bamboohr.com/api/gateway.php/ccdocs/v1/employees/{employee_id}"
-        
-        # Update employee with a field that might trigger onboarding
-        update_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<employee>
-    <field id="status">Active</field>
-    <field id="sendWelcomeEmail">true</field>
-</employee>"""
-        
-        update_headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/xml"
-        }
-        
-        logger.info(f"Update URL: {update_url}")
-        logger.info(f"Update XML: {update_xml}")
-        
-        response = requests.post(update_url, data=update_xml, auth=auth, headers=update_headers)
-        logger.info(f"Update response status: {response.status_code}")
-        logger.info(f"Update response body: {response.text}")
-        
-        if response.status_code == 200:
-            logger.info("✅ Successfully updated employee status")
-            return 200, "Employee status updated - welcome email may have been triggered"
+        success, message, status = get_capabilities().run(
+            f"new_hire_packet:{BAMBOO_SUB}", NEW_HIRE_PACKET_METHODS, employee_id, auth_headers
+        )
+        if success:
+            logger.info(f"✅ {message}")
+            return 200, message
         
         # If all methods fail but not critically
         logger.warning("⚠️ All new hire packet/welcome email methods failed")
@@ -1280,11 +2043,12 @@ def send_new_hire_packet(employee_id, auth_headers):
         logger.warning("3. Different authentication method needed")
         logger.warning("4. Welcome emails may be automatically sent by BambooHR")
         
-        if response.status_code == 404:
+        # No status means every method is already known to be unsupported
+        if status in (404, None):
             return 200, "New hire packet endpoints not available, may be sent automatically by BambooHR"
         else:
-            logger.error(f"❌ All new hire packet methods failed. Last error: {response.status_code} - {response.text}")
-            return 200, f"New hire packet failed but employee created successfully: {response.text}"
+            logger.error(f"❌ All new hire packet methods failed. Last error: {message}")
+            return 200, f"New hire packet failed but employee created successfully: {message}"
             
     except Exception as e:
         logger.error(f"❌ Exception during new hire packet send: {str(e)}")
@@ -1294,7 +2058,9 @@ def send_new_hire_packet(employee_id, auth_headers):
 
 def hire_candidate(subdomain, api_key, candidate_id, employee_data):
     """
-    Convert a candidate to an employee in BambooHR.
+    Convert a candidate to an employee in BambooHR. Returns (employee_id, error).
+    Connection errors, timeouts and 5xx responses are raised rather than returned,
+    since the hire may have happened; create_or_hire_once() reconciles and retries.
     """
     if not candidate_id:
         logger.error("Cannot hire candidate: candidate ID is missing")
@@ -1304,17 +2070,7 @@ def hire_candidate(subdomain, api_key, candidate_id, employee_data):
         logger.info(f"Hiring candidate with ID: {candidate_id}")
         
         # API endpoint for hiring a candidate
-        url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/applicant_tracking/applications/{candidate_id}/hire"
-        
-        # Extract supervisor ID from "Reports To" field if present
-        supervisor_id = None
-        reports_to = employee_data.get("Reports To", "")
-        if reports_to:
-            # Extract ID from format like "Name (ID)"
-            import re
-            match = re.search(r'\((\d+)\)$', reports_to)
-            if match:
-                supervisor_id = match.group(1)
+        url = f"{BAMBOO_API_BASE}/{subdomain}/v1/applicant_tracking/applications/{candidate_id}/hire"
         
         # Prepare payload with employee data
         payload = {
@@ -1330,45 +2086,108 @@ def hire_candidate(subdomain, api_key, candidate_id, employee_data):
         }
         
         # Add supervisor if found
-        if supervisor_id:
-            payload["supervisor"] = supervisor_id
+        if supervisor_id(employee_data):
+            payload["supervisor"] = supervisor_id(employee_data)
         
         # Remove any empty fields
         payload = {k: v for k, v in payload.items() if v}
         
         logger.info(f"Hiring candidate with data: {payload}")
         
-        # Make authenticated request
-        auth = HTTPBasicAuth(api_key, "x")
-        response = None
-        
-        # Try up to 3 times with exponential backoff
-        for attempt in range(3):
-            try:
-                response = requests.post(url, json=payload, auth=auth)
-                
-                if response.status_code == 200 or response.status_code == 201:
-                    result = response.json()
-                    employee_id = result.get("employeeId")
-                    logger.info(f"Successfully hired candidate {candidate_id} as employee {employee_id}")
-                    return employee_id, None
-                else:
-                    logger.error(f"Hire candidate attempt {attempt+1} failed: Status {response.status_code}")
-                    logger.error(f"Response body: {response.text}")
-            except Exception as e:
-                logger.error(f"Exception during hire candidate attempt {attempt+1}: {str(e)}")
-                
-            # Wait before retry
-            time.sleep(2 ** attempt)
-        
-        # If we get here, all attempts failed
-        error_details = f"Status: {response.status_code}, Body: {response.text}" if response else "Request failed"
-        return None, f"Hire candidate failed after 3 attempts: {error_details}"
-            
+        # Make authenticated request. A single attempt: create_or_hire_once() owns
+        # retries, because it can tell whether a failed attempt actually landed
+        auth = bamboo_auth(api_key)
+        response = api_request("bamboohr", "POST", url, json=payload, auth=auth)
+
+        if response.status_code == 200 or response.status_code == 201:
+            result = response.json()
+            employee_id = result.get("employeeId")
+            logger.info(f"Successfully hired candidate {candidate_id} as employee {employee_id}")
+            if employee_id:
+                get_employee_directory(subdomain, api_key).add(employee_id, employee_data)
+            return employee_id, None
+
+        logger.error(f"Hire candidate failed: Status {response.status_code}")
+        logger.error(f"Response body: {response.text}")
+        # Server errors may or may not have hired the candidate: let the caller reconcile and retry
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return None, f"Hire candidate failed: Status: {response.status_code}, Body: {response.text}"
+
+    except requests.exceptions.RequestException:
+        raise
     except Exception as e:
         logger.error(f"Exception while hiring candidate: {str(e)}")
         return None, str(e)
 
+# ─── BambooHR Browser Login ───────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=1)
+def selenium_api():
+    """
+    Selenium and webdriver_manager, imported on first use: only the browser
+    login fallback needs them and they add ~170 ms to start-up. Returns None
+    on slim installs without Selenium, which can still log in over HTTP.
+    """
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import WebDriverException
+    except ImportError:
+        return None
+    return types.SimpleNamespace(webdriver=webdriver, Options=Options, Service=Service,
+                                 ChromeDriverManager=ChromeDriverManager, By=By, WebDriverWait=WebDriverWait,
+                                 EC=EC, WebDriverException=WebDriverException)
+
+@functools.lru_cache(maxsize=1)
+def chromedriver_path():
+    """Resolve (and download if needed) the chromedriver binary once per process."""
+    return os.getenv("CHROMEDRIVER_PATH") or selenium_api().ChromeDriverManager().install()
+
+class LoginBrowser:
+    """
+    One headless Chrome kept warm between BambooHR logins. It is started on
+    first use and reused for every later refresh, keeping its trusted-browser
+    cookie, so a re-login costs a few page loads instead of a browser launch.
+    """
+    def __init__(self):
+        self.driver = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """The warm browser, (re)started if it is missing or has died."""
+        sel = selenium_api()
+        if self.driver is not None:
+            try:
+                self.driver.current_url
+                return self.driver
+            except sel.WebDriverException:
+                logger.warning("Login browser is gone, starting a new one")
+                self.discard()
+        opts = sel.Options()
+        opts.add_argument("--headless=new")  # Options.headless is a no-op in Selenium 4
+        opts.add_argument("--no-sandbox")
+        opts.add_argument("--disable-dev-shm-usage")
+        self.driver = sel.webdriver.Chrome(service=sel.Service(chromedriver_path()), options=opts)
+        return self.driver
+
+    def discard(self):
+        """Quit the browser; the next get() starts a fresh one."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+LOGIN_BROWSER = LoginBrowser()
+atexit.register(LOGIN_BROWSER.discard)
+
 # ─── Main Logic ────────────────────────────────────────────────────────────────
 
 class BambooHRManager:
@@ -1376,6 +2195,8 @@ class BambooHRManager:
     Manages BambooHR authentication, session, and API calls.
     Includes logic to automatically refresh the session and look up employees by email.
     """
+    SESSION_CHECK_SECONDS = 60
+
     def __init__(self, subdomain, api_key, username, password, totp_secret, template_id):
         self.subdomain = subdomain
         self.api_key = api_key
@@ -1383,9 +2204,15 @@ class BambooHRManager:
         self.password = password
         self.totp_secret = totp_secret
         self.template_id = template_id
-        self.headers_file = "bamboo_headers.json"
+        self.headers_file = BAMBOO_HEADERS_FILE
+        self.session_file = BAMBOO_SESSION_FILE
         self.headers = self._load_headers_from_file()
-        self.directory_cache = None
+        self.session_issued_at, self.session_expires_at = self._load_session_times()
+        # Session refreshes are single-flight: see refresh_session()
+        self._session_lock = threading.Lock()
+        self._login_failed_at = None
+        self._keeper = None
+        self._keeper_stop = threading.Event()
 
     def _load_headers_from_file(self):
         """Loads session headers from the JSON file."""
@@ -1406,28 +2233,109 @@ class BambooHRManager:
         except Exception as e:
             logger.error(f"Failed to save session headers: {e}")
 
-    def _get_employee_directory(self):
+    # ── session lifetime ──────────────────────────────────────────────────────
+    def _load_session_times(self):
+        """(issued_at, expires_at) of the saved session; headers without a record count as issued at the file's mtime."""
+        if not self.headers:
+            return None, 0
+        try:
+            with open(self.session_file, "r") as f:
+                times = json.load(f)
+            return times["issued_at"], times["expires_at"]
+        except Exception:
+            issued_at = os.path.getmtime(self.headers_file)
+            return issued_at, issued_at + SESSION_TTL
+
+    def _set_session(self, headers, expires_at=None):
+        """Install new session headers and remember when they were issued and when they expire."""
+        now = time.time()
+        self.headers = headers
+        self.session_issued_at = now
+        self.session_expires_at = min(expires_at or now + SESSION_TTL, now + SESSION_TTL)
+        self._save_headers_to_file()
+        try:
+            with open(self.session_file, "w") as f:
+                json.dump({"issued_at": self.session_issued_at, "expires_at": self.session_expires_at}, f)
+        except Exception as e:
+            logger.error(f"Failed to save session lifetime: {e}")
+        logger.info(f"BambooHR session valid for {(self.session_expires_at - now) / 60:.0f} more minute(s)")
+
+    def probe_session(self):
         """
-        Fetches the full employee directory using the BambooHR API
-        and caches it for the duration of the script run.
+        Cheap check that the saved cookies are still logged in: the home page
+        answers 200 to a live session and redirects to the login page otherwise.
+        A probe that sees a new SESSION_COOKIE expiry moves the tracked expiry with it.
+        Returns True/False, or None if BambooHR could not be reached.
         """
-        if self.directory_cache:
-            return self.directory_cache
-        
-        logger.info("Fetching employee directory from BambooHR API...")
-        url = f"https://api.bamboohr.com/api/gateway.php/{self.subdomain}/v1/employees/directory"
-        headers = {'Accept': 'application/json'}
-        auth = (self.api_key, 'x')
-        
+        if not self.headers:
+            return False
         try:
-            response = requests.get(url, headers=headers, auth=auth)
-            response.raise_for_status() # Raises an exception for bad responses (4xx or 5xx)
-            self.directory_cache = response.json()
-            logger.info(f"Successfully fetched directory with {len(self.directory_cache.get('employees', []))} employees.")
-            return self.directory_cache
+            response = api_request("bamboohr_web", "GET", f"{BAMBOO_WEB_BASE}/home",
+                                   headers=self.headers, allow_redirects=False)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch employee directory: {e}")
+            logger.warning(f"BambooHR session probe failed: {e}")
             return None
+        if response.status_code != 200:
+            return False
+        expiries = [c.expires for c in response.cookies if c.name == SESSION_COOKIE and c.expires]
+        if expiries:
+            self.session_expires_at = min(max(expiries), time.time() + SESSION_TTL)
+        return True
+
+    def ensure_session(self):
+        """
+        Hot-path check before a web request: True if the session is usable.
+        Only logs in synchronously when there is no session or it has already
+        expired; the session keeper normally refreshes well before that.
+        """
+        if self.headers and time.time() < self.session_expires_at:
+            return True
+        return self.refresh_session(self.headers)
+
+    def session_headers(self):
+        """Current session headers, refreshed first if they have expired."""
+        self.ensure_session()
+        return self.headers
+
+    def start_session_keeper(self):
+        """
+        Validate the saved session with a probe, logging in now if it is dead,
+        then refresh it in the background SESSION_REFRESH_MARGIN seconds before
+        it expires, so no hire waits for a login.
+        """
+        if self.probe_session() is False:
+            logger.info("Saved BambooHR session is not valid, logging in before processing hires")
+            self.refresh_session(self.headers)
+        if self._keeper is None:
+            self._keeper = threading.Thread(target=self._keep_session, name="bamboo-session", daemon=True)
+            self._keeper.start()
+
+    def stop_session_keeper(self):
+        self._keeper_stop.set()
+
+    def _seconds_until_refresh(self):
+        if not self.headers:
+            return 0.0
+        refresh_at = self.session_expires_at - SESSION_REFRESH_MARGIN
+        if self.session_issued_at:
+            refresh_at = max(refresh_at, self.session_issued_at + SESSION_MIN_REFRESH)
+        return max(0.0, refresh_at - time.time())
+
+    def _keep_session(self):
+        # Wake at least every SESSION_CHECK_SECONDS: a hot-path login or a probe can move the expiry
+        while not self._keeper_stop.wait(min(self._seconds_until_refresh(), self.SESSION_CHECK_SECONDS)):
+            if self._seconds_until_refresh() > 0:
+                continue
+            logger.info("Refreshing BambooHR session ahead of expiry")
+            if not self.refresh_session(self.headers) and self._keeper_stop.wait(LOGIN_RETRY_SECONDS):
+                return
+
+    def _get_employee_directory(self):
+        """Returns the shared employee directory index, loading it on first use."""
+        directory = get_employee_directory(self.subdomain, self.api_key)
+        if directory.load():
+            return None
+        return directory
 
     def get_employee_id_by_email(self, email):
         """Looks up an employee's ID by their email address."""
@@ -1435,15 +2343,13 @@ class BambooHRManager:
             return None, "Email address is missing."
         
         directory = self._get_employee_directory()
-        if not directory or 'employees' not in directory:
+        if not directory:
             return None, "Could not retrieve employee directory."
         
-        target = email.lower()
-        for emp in directory['employees']:
-            work_email = (emp.get('workEmail') or '').lower()
-            if work_email == target:
-                logger.info(f"Found employee ID {emp['id']} for email {email}.")
-                return emp['id'], "ID found."
+        emp = directory.find_by_email(email)
+        if emp:
+            logger.info(f"Found employee ID {emp['id']} for email {email}.")
+            return emp['id'], "ID found."
 
         logger.warning(f"Could not find an employee with email: {email}")
         return None, f"Employee with email {email} not found in BambooHR."
@@ -1457,8 +2363,8 @@ class BambooHRManager:
             return False, "Cannot update record without an employee ID."
 
         logger.info(f"Updating BambooHR profile for employee ID: {employee_id}")
-        url = f"https://api.bamboohr.com/api/gateway.php/{self.subdomain}/v1/employees/{employee_id}"
-        auth = (self.api_key, 'x')
+        url = f"{BAMBOO_API_BASE}/{self.subdomain}/v1/employees/{employee_id}"
+        auth = bamboo_auth(self.api_key)
         headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
 
         # Map Google Sheet columns to BambooHR API field names
@@ -1480,7 +2386,7 @@ class BambooHRManager:
             return True, "No data to update."
 
         try:
-            response = requests.post(url, headers=headers, auth=auth, json=update_payload)
+            response = api_request("bamboohr", "POST", url, headers=headers, auth=auth, json=update_payload)
             response.raise_for_status()
             logger.info(f"Successfully updated profile for employee ID: {employee_id}")
             return True, "Employee profile updated."
@@ -1490,51 +2396,116 @@ class BambooHRManager:
                 logger.error(f"Response Body: {e.response.text}")
             return False, f"Failed to update profile: {e}"
 
+    def refresh_session(self, stale_headers=None):
+        """
+        Make sure there are working session headers, logging in only if needed.
+        Pass the headers a request just failed with: if another thread has
+        replaced them in the meantime its login is reused instead of starting
+        another one. Only one login runs at a time and everyone else waits for
+        its result; after a failed login, callers get False without retrying
+        for LOGIN_RETRY_SECONDS. Returns True if usable headers are in place.
+        """
+        with self._session_lock:
+            if self.headers and self.headers != stale_headers:
+                return True
+            if self._login_failed_at and time.monotonic() - self._login_failed_at < LOGIN_RETRY_SECONDS:
+                logger.warning("Skipping BambooHR login: the last attempt failed moments ago.")
+                RUN_METRICS.incr("session_refreshes", result="skipped")
+                return False
+            if self._create_new_session():
+                self._login_failed_at = None
+                RUN_METRICS.incr("session_refreshes", result="ok")
+                return True
+            self._login_failed_at = time.monotonic()
+            RUN_METRICS.incr("session_refreshes", result="failed")
+            return False
+
     def _create_new_session(self):
         """
-        Performs a full browser-based login to get new session headers.
+        Logs in to get new session headers: over plain HTTP first, then with the
+        browser if the HTTP flow fails (per BAMBOOHR_LOGIN_METHOD).
+        Call through refresh_session().
         """
-        logger.info("Creating a new BambooHR session via automated browser...")
-        # (The full Selenium logic remains here, unchanged from the previous version)
         if not all([self.username, self.password, self.totp_secret]):
             logger.error("Missing BambooHR credentials for new session.")
             return False
-        opts = Options()
-        opts.headless = True
-        opts.add_argument("--no-sandbox")
-        opts.add_argument("--disable-dev-shm-usage")
-        try:
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opts)
-            driver.get(f"https://{self.subdomain}.bamboohr.com/")
-            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "lemail"))).send_keys(self.username)
-            driver.find_element(By.ID, "password").send_keys(self.password)
-            driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
-            time.sleep(3)
-            if "multi_factor_authentication" in driver.current_url:
-                totp = pyotp.TOTP(self.totp_secret)
-                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "oneTimeCode"))).send_keys(totp.now())
-                WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//button[normalize-space()='Continue']"))).click()
-                time.sleep(3)
-            if "trusted_browser" in driver.current_url:
-                WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//button[normalize-space()='Yes, Trust this Browser']"))).click()
-                WebDriverWait(driver, 15).until(EC.url_contains("home"))
-            cookies = driver.get_cookies()
-            cookie_str = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
-            self.headers = {
-                "Cookie": cookie_str, "X-Requested-With": "XMLHttpRequest",
-                "Referer": f"https://{self.subdomain}.bamboohr.com/files/", "Accept": "application/json, text/plain, */*",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-            }
-            self._save_headers_to_file()
-            logger.info("New BambooHR session created successfully.")
-            return True
-        except Exception as e:
-            logger.error(f"An error occurred during automated login: {e}")
-            driver.save_screenshot("bamboo_error.png")
+        if LOGIN_METHOD != "browser":
+            logger.info("Creating a new BambooHR session via HTTP login...")
+            headers, expires_at, error = http_login(BAMBOO_WEB_BASE, self.username, self.password,
+                                                    self.totp_secret, timeout=HTTP_TIMEOUT,
+                                                    session=cassette_session("bamboohr_login"),
+                                                    session_cookie=SESSION_COOKIE)
+            if headers:
+                self._set_session(headers, expires_at)
+                logger.info("New BambooHR session created successfully.")
+                return True
+            logger.warning(f"HTTP login failed: {error}")
+            if LOGIN_METHOD == "http":
+                return False
+        cassette = get_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            logger.error("Browser login cannot be replayed from a cassette.")
             return False
-        finally:
-            if 'driver' in locals():
-                driver.quit()
+        if selenium_api() is None:
+            logger.error("Browser login unavailable: Selenium is not installed.")
+            return False
+        return self._browser_login()
+
+    def _browser_login(self):
+        """
+        Performs a full browser-based login to get new session headers.
+        Uses the warm LOGIN_BROWSER.
+        """
+        logger.info("Creating a new BambooHR session via automated browser...")
+        with LOGIN_BROWSER.lock:
+            driver = None
+            try:
+                import pyotp
+                sel = selenium_api()
+                By, EC = sel.By, sel.EC
+                started = time.perf_counter()
+                driver = LOGIN_BROWSER.get()
+                driver.get(f"{BAMBOO_WEB_BASE}/")
+                wait = sel.WebDriverWait(driver, LOGIN_PAGE_TIMEOUT)
+                # A warm browser may still be logged in; only fill the form if it shows
+                wait.until(lambda d: d.find_elements(By.ID, "lemail") or "home" in d.current_url)
+                if driver.find_elements(By.ID, "lemail"):
+                    login_url = driver.current_url
+                    email_field = driver.find_element(By.ID, "lemail")
+                    email_field.clear()
+                    email_field.send_keys(self.username)
+                    driver.find_element(By.ID, "password").send_keys(self.password)
+                    driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
+                    wait.until(EC.url_changes(login_url))
+                if "multi_factor_authentication" in driver.current_url:
+                    mfa_url = driver.current_url
+                    totp = pyotp.TOTP(self.totp_secret)
+                    wait.until(EC.presence_of_element_located((By.NAME, "oneTimeCode"))).send_keys(totp.now())
+                    wait.until(EC.element_to_be_clickable((By.XPATH, "//button[normalize-space()='Continue']"))).click()
+                    wait.until(EC.url_changes(mfa_url))
+                if "trusted_browser" in driver.current_url:
+                    wait.until(EC.element_to_be_clickable((By.XPATH, "//button[normalize-space()='Yes, Trust this Browser']"))).click()
+                    wait.until(EC.url_contains("home"))
+                cookies = driver.get_cookies()
+                cookie_str = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+                expiries = [c["expiry"] for c in cookies if c["name"] == SESSION_COOKIE and c.get("expiry")]
+                self._set_session({
+                    "Cookie": cookie_str, "X-Requested-With": "XMLHttpRequest",
+                    "Referer": f"https://{self.subdomain}.bamboohr.com/files/", "Accept": "application/json, text/plain, */*",
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+                }, max(expiries) if expiries else None)
+                logger.info(f"New BambooHR session created successfully in {time.perf_counter() - started:.1f}s.")
+                return True
+            except Exception as e:
+                logger.error(f"An error occurred during automated login: {e}")
+                if driver is not None:
+                    try:
+                        driver.save_screenshot("bamboo_error.png")
+                    except Exception:
+                        pass
+                # Don't reuse a browser left on an unknown page
+                LOGIN_BROWSER.discard()
+                return False
 
     def send_signature_request(self, employee):
         """
@@ -1560,12 +2531,11 @@ class BambooHRManager:
         logger.info(f"Using contract data: {contract_data}")
 
         # Now, proceed with sending the signature request
-        if not self.headers:
-            if not self._create_new_session():
-                return 500, "Failed to create an initial BambooHR session."
+        if not self.ensure_session():
+            return 500, "Failed to create an initial BambooHR session."
 
         # Construct base URL for signature request
-        base_url = f"https://{self.subdomain}.bamboohr.com/ajax/files/send_signature_request.php"
+        base_url = f"{BAMBOO_WEB_BASE}/ajax/files/send_signature_request.php"
         
         # Add required parameters
         params = {
@@ -1582,13 +2552,14 @@ class BambooHRManager:
         logger.info(f"Sending signature request with mapped fields to employee ID {employee_id}...")
         
         # Make the request
-        response = requests.get(url, headers=self.headers)
+        sent_headers = self.headers
+        response = api_request("bamboohr_web", "GET", url, headers=sent_headers)
         
         if response.status_code in [401, 403]:
             logger.warning("BambooHR session expired. Re-authenticating...")
-            if not self._create_new_session():
+            if not self.refresh_session(sent_headers):
                 return 500, "Failed to re-authenticate."
-            response = requests.get(url, headers=self.headers)
+            response = api_request("bamboohr_web", "GET", url, headers=self.headers)
             
         if response.status_code == 200:
             logger.info(f"Successfully sent signature request for employee ID {employee_id}")
@@ -1596,30 +2567,390 @@ class BambooHRManager:
         else:
             return response.status_code, response.text.strip()
 
+# ─── Per-Hire Step Graph ──────────────────────────────────────────────────────
+
+class HireRun:
+    """
+    One hire's pass through the onboarding steps, as a graph of steps with
+    declared dependencies (see step_graph.py). WebWork only needs sheet fields,
+    so it starts straight away; compensation only needs the employee id; the
+    self-service, signature and packet steps wait for the details update that
+    fills in the work email they send to. Each step returns True on success,
+    journals what it completed and is skipped if an earlier run completed it.
+    """
+    # name -> (dependencies, method)
+    STEPS = {
+        "employee":     ((),              "step_employee"),
+        "updated":      (("employee",),   "step_update"),
+        "compensation": (("employee",),   "step_compensation"),
+        "self_service": (("updated",),    "step_self_service"),
+        "signature":    (("updated",),    "step_signature"),
+        "packet":       (("updated",),    "step_packet"),
+        "webwork":      ((),              "step_webwork"),
+    }
+    # Order the sheet notes are listed in
+    NOTE_ORDER = ("employee", "updated", "compensation", "self_service", "signature", "webwork", "packet")
+
+    def __init__(self, emp, bamboo_manager):
+        self.emp = emp
+        self.bamboo_manager = bamboo_manager
+        self.journal = get_journal()
+        self.key = hire_key(emp)
+        self.done = self.journal.steps(self.key)
+        self.errors = {}
+        self.eid, self.existing = None, False
+        if "employee" in self.done:
+            self.eid, self.existing = self.done["employee"]["bamboo_id"], self.done["employee"]["existing"]
+            emp["ID"] = self.eid
+            logger.info(f"Journal: re-using BambooHR employee {self.eid} for {emp['Email']}")
+
+    def finished(self):
+        """True if an earlier run already finished this hire successfully."""
+        return "finished" in self.done
+
+    def steps(self):
+        """The graph as {name: (dependencies, func)}, each func guarded against crashes."""
+        return {name: (deps, functools.partial(self._guard, name, getattr(self, method)))
+                for name, (deps, method) in self.STEPS.items()}
+
+    def _guard(self, name, step):
+        if name in self.done:
+            return True
+        started = time.perf_counter()
+        ok = False
+        try:
+            ok = step()
+            return ok
+        except Exception as e:
+            # Catch any unexpected exceptions during processing
+            logger.error(f"Unexpected error processing employee {self.emp.get('First Name', '')} {self.emp.get('Last Name', '')}: {str(e)}")
+            import traceback
+            logger.error(f"Stack trace: {traceback.format_exc()}")
+            self.errors[name] = f"Unexpected error: {str(e)}"
+            return False
+        finally:
+            RUN_METRICS.record_step(name, time.perf_counter() - started, ok)
+
+    # ── steps ─────────────────────────────────────────────────────────────────
+    def step_employee(self):
+        emp = self.emp
+        # ── First check if employee already exists in BambooHR by email ──────────
+        logger.info("=== STEP 1: CHECKING FOR EXISTING EMPLOYEE ===")
+        if "create_started" in self.done:
+            # An earlier run died mid-create: an employee with this email is most likely the one
+            # it created, not a pre-existing one, so let create_or_hire_once() claim it (and
+            # compensation still be written) instead of treating it as an existing employee
+            existing_id = None
+        else:
+            existing_id, existing_err = find_employee_by_email(BAMBOO_SUB, BAMBOO_KEY, emp.get("Email"))
+
+        if existing_id:
+            # Employee already exists, use the existing ID
+            logger.info(f"Found existing employee with ID {existing_id} for {emp['Email']}")
+            eid = existing_id
+        else:
+            # ── Check if candidate exists in BambooHR ────────────────────────────
+            logger.info("=== STEP 2: CHECKING FOR EXISTING CANDIDATE ===")
+            logger.info(f"No existing employee found, checking for candidate")
+            candidate_id, candidate_err = find_candidate_by_email(BAMBOO_SUB, BAMBOO_KEY, emp.get("Email"))
+
+            if candidate_id:
+                # Candidate exists, hire them directly
+                logger.info(f"Found existing candidate with ID {candidate_id} for {emp['Email']}")
+                logger.info("=== STEP 3: HIRING EXISTING CANDIDATE ===")
+                eid, err = create_or_hire_once(BAMBOO_SUB, BAMBOO_KEY, emp, hire_candidate, candidate_id, emp)
+            else:
+                # No candidate found, create a new employee directly
+                logger.info(f"No existing candidate found for {emp['Email']}, creating new employee")
+                logger.info("=== STEP 3: CREATING NEW EMPLOYEE ===")
+                eid, err = create_or_hire_once(BAMBOO_SUB, BAMBOO_KEY, emp, create_employee, emp)
+
+            if err:
+                self.errors["employee"] = f"Create/Hire Error: {err}"
+                logger.error(f"Failed to create/hire employee: {self.errors['employee']}")
+                return False
+
+        # Update the emp dictionary with the ID
+        self.eid, self.existing = eid, bool(existing_id)
+        emp["ID"] = eid
+        logger.info(f"Working with employee ID: {eid}")
+        self.journal.record(self.key, "employee", bamboo_id=eid, existing=self.existing)
+        return True
+
+    def step_update(self):
+        # Update the existing employee with new information, or fill in the new one
+        logger.info("=== STEP 4: UPDATING EMPLOYEE DETAILS ===")
+        ok, err = update_employee(BAMBOO_SUB, BAMBOO_KEY, self.eid, self.emp)
+        if not ok:
+            self.errors["updated"] = f"Update Error: {err}"
+            logger.error(f"Failed to update employee: {self.errors['updated']}")
+            return False
+        self.journal.record(self.key, "updated")
+        return True
+
+    def step_compensation(self):
+        # Only add compensation for newly created employees
+        if self.existing:
+            return True
+        logger.info("=== STEP 5: ADDING COMPENSATION ===")
+        ok, err = add_compensation(BAMBOO_SUB, BAMBOO_KEY, self.eid, self.emp)
+        if not ok:
+            self.errors["compensation"] = f"Comp Error: {err}"
+            logger.error(f"Failed to add compensation: {self.errors['compensation']}")
+            return False
+        self.journal.record(self.key, "compensation", row_id=self.emp.get("Compensation Row ID"))
+        return True
+
+    def step_self_service(self):
+        logger.info("=== STEP 6: PROVISIONING SELF-SERVICE ACCESS ===")
+        ok, err = provision_self_service(BAMBOO_SUB, BAMBOO_KEY, self.eid, self.emp)
+        if ok:
+            self.journal.record(self.key, "self_service")
+            return True
+        if self.existing:
+            # Don't fail the entire process for existing employees if self-service fails
+            # Just log a warning since the employee already exists
+            logger.warning(f"Self-service provision warning for existing employee: {err}")
+            return True
+        self.errors["self_service"] = f"Provision Error: {err}"
+        logger.error(f"Failed to provision self-service: {self.errors['self_service']}")
+        return False
+
+    def step_signature(self):
+        logger.info("=== STEP 7: SENDING SIGNATURE REQUEST ===")
+        b_code, b_resp = self.bamboo_manager.send_signature_request(self.emp)
+        if b_code != 200:
+            self.errors["signature"] = f"BambooHR error: {b_resp}"
+            return False
+        self.journal.record(self.key, "signature")
+        return True
+
+    def step_packet(self):
+        # Send new hire packet by default for all employees
+        logger.info("=== STEP 8: SENDING NEW HIRE PACKET ===")
+        logger.info(f"Sending new hire packet for {self.emp['First Name']} {self.emp['Last Name']}")
+        packet_code, packet_resp = send_new_hire_packet(self.eid, self.bamboo_manager.session_headers())
+        if packet_code != 200:
+            logger.warning(f"Failed to send new hire packet: {packet_resp}")
+            self.errors["packet"] = f"New hire packet error: {packet_resp}"
+            return False
+        self.journal.record(self.key, "packet")
+        return True
+
+    def step_webwork(self):
+        logger.info("=== STEP 9: CREATING WEBWORK ACCOUNT ===")
+        w_code, w_resp = invite_webwork(self.emp)
+        if w_code != 200:
+            self.errors["webwork"] = f"WebWork error: {w_resp}"
+            return False
+        webwork_user = WEBWORK_USERS.find(self.emp.get("Email")) or {}
+        self.journal.record(self.key, "webwork", webwork_id=webwork_user.get("id"))
+        return True
+
+    # ── outcome ───────────────────────────────────────────────────────────────
+    def result(self):
+        """(status, notes) for the sheet, once the graph has run."""
+        emp = self.emp
+        if self.finished():
+            RUN_METRICS.incr("hires", result="succeeded")
+            return "SUCCESS", self.done["finished"].get("notes", "OK")
+        notes = [self.errors[name] for name in self.NOTE_ORDER if name in self.errors]
+
+        status = "SUCCESS" if not notes else "FAILED"  # Use text instead of emoji
+        RUN_METRICS.incr("hires", result="succeeded" if status == "SUCCESS" else "failed")
+        if status == "SUCCESS":
+            self.journal.record(self.key, "finished", notes="OK")
+            logger.info(f"Successfully processed {emp['First Name']} {emp['Last Name']}")
+        else:
+            logger.warning(f"Failed to process {emp['First Name']} {emp['Last Name']}: {'; '.join(notes)}")
+        return status, "; ".join(notes) or "OK"
+
+def process_hire(emp, bamboo_manager, step_pool=None):
+    """
+    Run STEP 1-9 for a single hire and return (status, notes) for the sheet.
+    Independent steps run in parallel on step_pool (one at a time without it).
+    Safe to run concurrently: it never touches the Sheets client, so write-backs
+    can be applied by the caller in row order.
+    Each completed step is recorded in the hire journal; a hire that was
+    interrupted on an earlier run resumes at its first incomplete step.
+    """
+    with hire_context(hire_key(emp)):
+        logger.info(f"Processing hire: {emp['First Name']} {emp['Last Name']}")
+        logger.debug("Employee data: %s", lazy_json(emp))
+
+        hire = HireRun(emp, bamboo_manager)
+        if hire.finished():
+            logger.info(f"Journal: {emp['Email']} already finished on an earlier run, re-using its result")
+            return hire.result()
+        if hire.done:
+            logger.info(f"Journal: resuming {emp['Email']} after {', '.join(hire.done)}")
+
+        # in_context() carries the hire's correlation id onto the step pool threads
+        run_graph({name: (deps, in_context(func)) for name, (deps, func) in hire.steps().items()}, step_pool)
+        return hire.result()
+
+def reset_run_caches():
+    """
+    Forget the per-run caches before another run in the same process (watch
+    mode). Directories re-read their snapshot, which syncs with BambooHR once
+    older than BAMBOOHR_DIRECTORY_TTL; WebWork users and compensation tables
+    are fetched again on first use.
+    """
+    global WEBWORK_USERS, COMPENSATION_TABLES
+    with _directories_lock:
+        for directory in EMPLOYEE_DIRECTORIES.values():
+            directory.loaded = False
+    WEBWORK_USERS = WebWorkUsers()
+    COMPENSATION_TABLES = CompensationTables()
+
+def run_onboarding(sheets, slack, bamboo_manager, workers=1, first_row=2):
+    """
+    Read the pending hires from the sheet a page at a time, reject each page's
+    invalid rows up front (see preflight_pending()) and run the remaining hires'
+    step graphs on a bounded worker pool while the next page is read. Results are queued for write-back strictly in row order as
+    soon as every earlier row has finished, so the sheet and the Slack summary
+    look the same for any worker count. The Sheets client is only used from
+    this thread. Returns (successes, failures).
+    """
+    RUN_METRICS.start()
+    # Read the header row from Google Sheet
+    try:
+        logger.info("Reading pending rows from Google Sheet...")
+        headers = read_sheet_headers(sheets)
+        if not headers:
+            logger.warning("No data found in the sheet.")
+    except Exception as e:
+        logger.critical(f"Failed to read pending rows: {str(e)}")
+        if slack:
+            send_slack_notification(slack, f"Onboarding automation failed: {str(e)}")
+        return 0, 0
+
+    workers = max(1, workers)
+    logger.info(f"Processing pending hires with {workers} worker(s)")
+
+    # Process each pending hire
+    successes, failures = 0, 0
+    in_flight = deque()
+    read_error = None
+
+    write_backs = WriteBackBuffer(sheets, headers) if headers else None
+
+    def wait_for(future):
+        # A slow hire at the head of the queue must not hold back updates that are already queued
+        while not future.done():
+            wait([future], timeout=write_backs.due_in() if write_backs else None)
+            if write_backs:
+                write_backs.flush_if_due()
+
+    def record(row_index, future):
+        nonlocal successes, failures
+        status, notes = future.result()
+        write_backs.add(row_index, status, notes)
+        RUN_METRICS.set_gauge("queue_depth", len(in_flight), queue="hires_in_flight")
+        RUN_METRICS.set_gauge("queue_depth", len(write_backs.pending) // 2, queue="write_backs")
+
+        # Track statistics
+        if status == "SUCCESS":
+            successes += 1
+        else:
+            failures += 1
+
+    try:
+        # Hire threads mostly wait on their step graph; the steps themselves run on step_pool
+        step_workers = ONBOARD_STEP_WORKERS or 4 * workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hire") as pool, \
+             ThreadPoolExecutor(max_workers=step_workers, thread_name_prefix="step") as step_pool:
+            pages = iter_pending_pages(sheets, headers, SHEETS_PAGE_ROWS, first_row) if headers else iter(())
+            seen = {}  # hire key -> row index, for duplicates across pages
+            while True:
+                try:
+                    page = next(pages, None)
+                except Exception as e:
+                    # Rows read before the error are still processed and written back
+                    read_error = e
+                    logger.critical(f"Failed to read pending rows: {str(e)}")
+                    break
+                if page is None:
+                    break
+                # Each page's hires start while the next page is read
+                valid, rejected = preflight_pending(page, write_backs, seen)
+                failures += rejected
+                for row_index, emp in valid:
+                    in_flight.append((row_index, pool.submit(process_hire, emp, bamboo_manager, step_pool)))
+                    RUN_METRICS.set_gauge("queue_depth", len(in_flight), queue="hires_in_flight")
+                    # Record finished rows as long as every earlier row is done too
+                    while in_flight and in_flight[0][1].done():
+                        record(*in_flight.popleft())
+            while in_flight:
+                wait_for(in_flight[0][1])
+                record(*in_flight.popleft())
+    finally:
+        # Don't lose finished rows if the run is interrupted
+        if write_backs:
+            write_backs.flush()
+        RUN_METRICS.set_gauge("queue_depth", 0, queue="write_backs")
+
+    return report_run(slack, successes, failures, read_error)
+
+def write_run_report(successes, failures, read_error=None):
+    """Write the machine-readable run report (ONBOARD_REPORT) from RUN_METRICS."""
+    try:
+        report_path = RUN_METRICS.write_report(
+            hires={"succeeded": successes, "failed": failures},
+            read_error=str(read_error) if read_error else None,
+            rate_budgets={name: {"waited_s": round(budget.waited, 3), "throttles": budget.throttles}
+                          for name, budget in RATE_BUDGETS.items()},
+        )
+        if report_path:
+            logger.info(f"Run report written to {report_path}")
+    except OSError as e:
+        logger.warning(f"Failed to write run report: {e}")
+
+def report_run(slack, successes, failures, read_error=None):
+    """Log the end-of-run summary and post it to Slack. Returns (successes, failures)."""
+    if read_error and slack:
+        send_slack_notification(slack, f"Onboarding automation failed: {str(read_error)}")
+    if not successes and not failures:
+        if not read_error:
+            message = "No new hires to process."
+            logger.info(message)
+            if slack:
+                send_slack_notification(slack, message)
+        write_run_report(0, 0, read_error)
+        return 0, 0
+
+    for service, stats in connection_stats().items():
+        logger.info(f"HTTP {service}: {stats['requests']} requests over {stats['connections']} "
+                    f"connection(s), {stats['reused']} reused")
+    comp = COMPENSATION_TABLES.stats()
+    if comp["writes"]:
+        logger.info(f"Compensation: {comp['writes']} row(s) written with {comp['gets']} table GET(s), "
+                    f"{comp['gets_saved']} GET(s) saved vs. checking every write; "
+                    f"{comp['avg_ms']:.0f} ms average / {comp['max_ms']:.0f} ms max per hire")
+
+    for step, stats in RUN_METRICS.steps.items():
+        latency = stats.latency
+        logger.info(f"Step {step}: {latency.count} run(s), {latency.sum / latency.count:.2f}s average, "
+                    f"{latency.quantile(0.95):.2f}s p95, {latency.max:.2f}s max")
+
+    # Send summary notification
+    summary = f"Onboarding run complete: {successes} succeeded, {failures} failed."
+    logger.info(summary)
+    logger.info("See detailed log file for complete information")
+    send_slack_notification(slack, f"{summary}\n{RUN_METRICS.summary()}")
+    write_run_report(successes, failures, read_error)
+    return successes, failures
+
 def main():
     """
     Main execution function.
     Always processes all pending hires from the sheet (no test mode).
     """
+    # One queued console + rotating file pipeline on the root logger (replaces basicConfig's handler)
+    log_file = configure_logging()
     logger.info("--- SCRIPT START ---")
-    
-    # Configure a file handler to capture detailed logs
-    import datetime
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_handler = logging.FileHandler(f"onboarding_log_{timestamp}.txt", encoding='utf-8')  # Add UTF-8 encoding
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-    
-    # Also add a console handler for more visible terminal output
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
-    logger.info("Detailed logging enabled - check log file for complete information")
+    if log_file:
+        logger.info(f"Detailed logging enabled - check {log_file} for complete information")
     
     # Log environment variables (without sensitive values)
     logger.info(f"BambooHR Subdomain: {BAMBOO_SUB}")
@@ -1628,6 +2959,7 @@ def main():
     logger.info(f"WebWork Username: {'Set' if WEBWORK_USERNAME else 'Not set'}")
     logger.info(f"Google Sheet ID: {SHEET_ID}")
     logger.info(f"Google Sheet Name: {SHEET_NAME}")
+    start_metrics_server(RUN_METRICS, collectors=[rate_budget_metrics])
     
     bamboo_manager = BambooHRManager(
         subdomain=os.getenv("BAMBOOHR_SUBDOMAIN", "ccdocs"),
@@ -1651,163 +2983,19 @@ def main():
         return
     
     logger.info("--- RUNNING IN PRODUCTION MODE ---")
-    # Read pending rows from Google Sheet
+    # Check the web session up front and keep it fresh, so no hire waits for a login
+    bamboo_manager.start_session_keeper()
     try:
-        logger.info("Reading pending rows from Google Sheet...")
-        headers, pending = read_pending_rows(sheets)
-        if not pending:
-            message = "No new hires to process."
-            logger.info(message)
-            if slack:
-                send_slack_notification(slack, message)
-            return
-    except Exception as e:
-        logger.critical(f"Failed to read pending rows: {str(e)}")
-        if slack:
-            send_slack_notification(slack, f"Onboarding automation failed: {str(e)}")
-        return
-
-    # Process each pending hire
-    successes, failures = 0, 0
-
-    for row_index, emp in pending:
-        logger.info(f"Processing hire: {emp['First Name']} {emp['Last Name']}")
-        logger.info(f"Employee data: {json.dumps(emp, indent=2)}")
-        
-        try:
-            # ── First check if employee already exists in BambooHR by email ──────────
-            logger.info("=== STEP 1: CHECKING FOR EXISTING EMPLOYEE ===")
-            existing_id, existing_err = find_employee_by_email(BAMBOO_SUB, BAMBOO_KEY, emp.get("Email"))
-            
-            if existing_id:
-                # Employee already exists, use the existing ID
-                logger.info(f"Found existing employee with ID {existing_id} for {emp['Email']}")
-                eid = existing_id
-                
-                # Update the existing employee with new information
-                logger.info(f"Updating existing employee with ID {eid}")
-                ok, err = update_employee(BAMBOO_SUB, BAMBOO_KEY, eid, emp)
-                if not ok:
-                    notes = f"Update Error: {err}"
-                    logger.error(f"Failed to update existing employee: {notes}")
-                    write_back(sheets, row_index, "FAILED", notes)
-                    failures += 1
-                    continue
-                
-                # Provision self-service access for existing employee too
-                logger.info("=== STEP 6: PROVISIONING SELF-SERVICE ACCESS (EXISTING EMPLOYEE) ===")
-                ok, err = provision_self_service(BAMBOO_SUB, BAMBOO_KEY, eid, emp)
-                if not ok:
-                    logger.warning(f"Self-service provision warning for existing employee: {err}")
-                    # Don't fail the entire process for existing employees if self-service fails
-                    # Just log a warning since the employee already exists
-            else:
-                # ── Check if candidate exists in BambooHR ────────────────────────
-                logger.info("=== STEP 2: CHECKING FOR EXISTING CANDIDATE ===")
-                logger.info(f"No existing employee found, checking for candidate")
-                candidate_id, candidate_err = find_candidate_by_email(BAMBOO_SUB, BAMBOO_KEY, emp.get("Email"))
-                
-                if candidate_id:
-                    # Candidate exists, hire them directly
-                    logger.info(f"Found existing candidate with ID {candidate_id} for {emp['Email']}")
-                    logger.info("=== STEP 3: HIRING EXISTING CANDIDATE ===")
-                    eid, err = hire_candidate(BAMBOO_SUB, BAMBOO_KEY, candidate_id, emp)
-                else:
-                    # No candidate found, create a new employee directly
-                    logger.info(f"No existing candidate found for {emp['Email']}, creating new employee")
-                    logger.info("=== STEP 3: CREATING NEW EMPLOYEE ===")
-                    eid, err = create_employee(BAMBOO_SUB, BAMBOO_KEY, emp)
-                    
-                if err:
-                    notes = f"Create/Hire Error: {err}"
-                    logger.error(f"Failed to create/hire employee: {notes}")
-                    write_back(sheets, row_index, "FAILED", notes)
-                    failures += 1
-                    continue
-
-                # Only update and add compensation for newly created employees
-                logger.info("=== STEP 4: UPDATING EMPLOYEE DETAILS ===")
-                ok, err = update_employee(BAMBOO_SUB, BAMBOO_KEY, eid, emp)
-                if not ok:
-                    notes = f"Update Error: {err}"
-                    logger.error(f"Failed to update employee: {notes}")
-                    write_back(sheets, row_index, "FAILED", notes)
-                    failures += 1
-                    continue
-
-                logger.info("=== STEP 5: ADDING COMPENSATION ===")
-                ok, err = add_compensation(BAMBOO_SUB, BAMBOO_KEY, eid, emp)
-                if not ok:
-                    notes = f"Comp Error: {err}"
-                    logger.error(f"Failed to add compensation: {notes}")
-                    write_back(sheets, row_index, "FAILED", notes)
-                    failures += 1
-                    continue
-
-                logger.info("=== STEP 6: PROVISIONING SELF-SERVICE ACCESS ===")
-                ok, err = provision_self_service(BAMBOO_SUB, BAMBOO_KEY, eid, emp)
-                if not ok:
-                    notes = f"Provision Error: {err}"
-                    logger.error(f"Failed to provision self-service: {notes}")
-                    write_back(sheets, row_index, "FAILED", notes)
-                    failures += 1
-                    continue
-                
-            # Update the emp dictionary with the ID
-            emp["ID"] = eid
-            logger.info(f"Working with employee ID: {eid}")
-
-            # ── Existing signature + WebWork steps ───────────────────────────────────
-            logger.info("=== STEP 7: SENDING SIGNATURE REQUEST ===")
-            b_code, b_resp = bamboo_manager.send_signature_request(emp)
-            
-            # Throttle API calls
-            time.sleep(1)
-            
-            # Send new hire packet by default for all employees
-            logger.info("=== STEP 8: SENDING NEW HIRE PACKET ===")
-            logger.info(f"Sending new hire packet for {emp['First Name']} {emp['Last Name']}")
-            packet_code, packet_resp = send_new_hire_packet(eid, bamboo_manager.headers)
-            if packet_code != 200:
-                logger.warning(f"Failed to send new hire packet: {packet_resp}")
-            
-            # Create WebWork account
-            logger.info("=== STEP 9: CREATING WEBWORK ACCOUNT ===")
-            w_code, w_resp = invite_webwork(emp)
-
-            # Update status and notes
-            notes = []
-            if b_code != 200: notes.append(f"BambooHR error: {b_resp}")
-            if w_code != 200: notes.append(f"WebWork error: {w_resp}")
-            if packet_code != 200: notes.append(f"New hire packet error: {packet_resp}")
-            
-            status = "SUCCESS" if not notes else "FAILED"  # Use text instead of emoji
-            write_back(sheets, row_index, status, "; ".join(notes) or "OK")
-
-            # Track statistics
-            if status == "SUCCESS":
-                successes += 1
-                logger.info(f"Successfully processed {emp['First Name']} {emp['Last Name']}")
-            else:
-                failures += 1
-                logger.warning(f"Failed to process {emp['First Name']} {emp['Last Name']}: {'; '.join(notes)}")
-        
-        except Exception as e:
-            # Catch any unexpected exceptions during processing
-            logger.error(f"Unexpected error processing employee {emp.get('First Name', '')} {emp.get('Last Name', '')}: {str(e)}")
-            import traceback
-            logger.error(f"Stack trace: {traceback.format_exc()}")
-            write_back(sheets, row_index, "FAILED", f"Unexpected error: {str(e)}")
-            failures += 1
-
-        # Throttle before next hire
-        time.sleep(1)
-
-    # Send summary notification
-    summary = f"Onboarding run complete: {successes} succeeded, {failures} failed."
-    logger.info(summary)
-    logger.info("See detailed log file for complete information")
-    send_slack_notification(slack, summary)
+        if ONBOARD_WATCH:
+            # Run as a script this module is __main__: make onboard_watch's `import onboard` find it
+            # rather than load a second copy with its own metrics, rate budgets, journal and sessions
+            sys.modules["onboard"] = sys.modules[__name__]
+            from onboard_watch import watch
+            watch(sheets, slack, bamboo_manager)
+        else:
+            run_onboarding(sheets, slack, bamboo_manager, workers=ONBOARD_WORKERS)
+    finally:
+        bamboo_manager.stop_session_keeper()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Watch Mode
+
+Keeps onboard.py running and picks up new hires as they are entered in the
+sheet, instead of a cron job paying interpreter start-up, imports, the Sheets
+discovery build and a full sheet read on every invocation.
+
+The Sheets, Slack and BambooHR clients, pooled HTTP sessions, the web session
+(kept fresh by the session keeper) and the directory snapshot stay warm
+between passes. Each poll is a single values.batchGet of the header row, the
+Email column and the Overall status column; only when that shows a pending
+row (an email with a blank status) does a pass run, starting at the first
+pending row rather than re-reading the whole sheet.
+
+Polls start ONBOARD_WATCH_INTERVAL seconds apart and back off (doubling) to
+ONBOARD_WATCH_MAX_INTERVAL while the sheet is idle; any new pending row drops
+the interval back to the minimum. SIGINT / SIGTERM stop the loop after the
+pass in progress.
+
+Usage:
+    ONBOARD_WATCH=1 python onboard.py
+
+Environment Variables (optional):
+- ONBOARD_WATCH: Set to 1 to run in watch mode (default: 0, one pass and exit)
+- ONBOARD_WATCH_INTERVAL: Seconds between polls while hires are coming in (default: 5)
+- ONBOARD_WATCH_MAX_INTERVAL: Longest wait between polls of an idle sheet (default: 60)
+"""
+
+import os
+import signal
+import threading
+
+import onboard
+from onboard import logger, RUN_METRICS
+
+WATCH_INTERVAL     = float(os.getenv("ONBOARD_WATCH_INTERVAL", "5"))
+WATCH_MAX_INTERVAL = float(os.getenv("ONBOARD_WATCH_MAX_INTERVAL", "60"))
+
+class SheetPoller:
+    """Cheap check for pending rows: one batchGet of the header row and two columns."""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.headers = None
+        self.key_col = None
+        self.status_col = None
+
+    def _resolve_columns(self, headers):
+        clean = [str(h).strip() for h in headers]
+        self.headers = headers
+        # Rows are keyed on email; fall back to the first column if the sheet has none
+        self.key_col = onboard.column_letter(clean.index("Email") if "Email" in clean else 0)
+        self.status_col = onboard.column_letter(clean.index("Overall status")) if "Overall status" in clean else None
+
+    def _fetch(self):
+        ranges = [f"{onboard.SHEET_NAME}!1:1"]
+        if self.headers is not None:
+            ranges.append(f"{onboard.SHEET_NAME}!{self.key_col}2:{self.key_col}")
+            if self.status_col:
+                ranges.append(f"{onboard.SHEET_NAME}!{self.status_col}2:{self.status_col}")
+        resp = onboard.sheets_execute("values.batchGet", self.sheets.values().batchGet(
+            spreadsheetId=onboard.SHEET_ID, ranges=ranges, majorDimension="COLUMNS"))
+        columns = [(vr.get("values") or [[]]) for vr in resp.get("valueRanges", [])]
+        # The header row comes back as one value per column when read column-major
+        headers = [col[0] if col else "" for col in columns[0]] if columns else []
+        return headers, columns[1:]
+
+    def pending_rows(self):
+        """Sheet row numbers (1-based) with an email and a blank Overall status."""
+        headers, columns = self._fetch()
+        if headers != self.headers:
+            # First poll, or columns were moved: re-resolve and read the right ones
+            self._resolve_columns(headers)
+            headers, columns = self._fetch()
+        if not headers:
+            return []
+        keys = columns[0][0] if columns else []
+        statuses = columns[1][0] if len(columns) > 1 else []
+        return [row for row, key in enumerate(keys, start=2)
+                if str(key).strip() and not (str(statuses[row - 2]).strip() if row - 2 < len(statuses) else "")]
+
+def run_pass(sheets, slack, bamboo_manager, first_row):
+    """One onboarding run on the worker pool, starting at first_row."""
+    onboard.reset_run_caches()
+    return onboard.run_onboarding(sheets, slack, bamboo_manager, workers=onboard.ONBOARD_WORKERS,
+                                  first_row=first_row)
+
+def watch(sheets, slack, bamboo_manager, interval=WATCH_INTERVAL, max_interval=WATCH_MAX_INTERVAL, stop=None):
+    """
+    Poll the sheet and run a pass whenever it has pending rows, until stop is
+    set (SIGINT / SIGTERM set it when called from the main thread).
+    """
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        def request_stop(signum, frame):
+            logger.info(f"Received signal {signum}, stopping after the current pass")
+            stop.set()
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+    poller = SheetPoller(sheets)
+    delay = interval
+    last_pending = None
+    logger.info(f"Watching the sheet for new hires (every {interval:g}s, backing off to {max_interval:g}s when idle)")
+    while not stop.is_set():
+        try:
+            pending = poller.pending_rows()
+        except Exception as e:
+            logger.error(f"Polling the sheet failed: {e}")
+            RUN_METRICS.incr("watch_polls", result="error")
+            pending = None
+
+        # Rows still pending after their own pass (e.g. the write-back failed) are
+        # not re-run in a tight loop: they wait until the backoff reaches its maximum
+        if pending and (pending != last_pending or delay >= max_interval):
+            RUN_METRICS.incr("watch_polls", result="pending")
+            logger.info(f"{len(pending)} pending row(s) from row {pending[0]}, starting a pass")
+            try:
+                run_pass(sheets, slack, bamboo_manager, pending[0])
+            except Exception as e:
+                logger.error(f"Onboarding pass failed: {e}")
+            last_pending = pending
+            delay = interval
+        else:
+            if pending == []:
+                RUN_METRICS.incr("watch_polls", result="idle")
+                last_pending = None
+            delay = min(max_interval, delay * 2)
+        RUN_METRICS.set_gauge("watch_poll_interval_seconds", delay)
+        stop.wait(delay)
+    logger.info("Watch mode stopped")
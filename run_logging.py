@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Onboarding Run Logging
+
+One logging pipeline for onboard.py runs, installed once by main():
+
+- Worker threads only put records on a queue (QueueHandler); a single listener
+  thread formats them and writes the console and the log file, so a slow disk
+  or terminal never holds up a hire and lines from concurrent workers never
+  interleave mid-line.
+- Every record carries the correlation id of the hire it belongs to ("-"
+  outside a hire). The id is derived from the hire's journal key, so it is the
+  same across restarts and can be grepped for in the log and matched to the journal.
+- ONBOARD_LOG_FORMAT=json writes one JSON object per line instead of text:
+      {"ts": "2024-06-03T09:12:01.123", "level": "INFO", "logger": "onboard", "hire": "h-1f3a9c02", "msg": "..."}
+  with the traceback under "exc" for records logged with exc_info
+- The log file rotates by size and rotated files are gzip-compressed.
+- Payload dumps (employee rows, request bodies, response bodies) are logged at
+  DEBUG through lazy_json()/lazy_body(), which only serialise when a DEBUG
+  record is actually emitted. With the default INFO level they cost one level check.
+
+Environment Variables (optional):
+- ONBOARD_LOG_FORMAT: text or json (default: text)
+- ONBOARD_LOG_LEVEL: Level written to the log file (default: INFO; DEBUG adds payloads and response bodies)
+- ONBOARD_LOG_FILE: Log file path (default: onboarding_log.txt, or onboarding_log.jsonl for json; empty disables the file)
+- ONBOARD_LOG_MAX_BYTES: Size at which the log file rotates (default: 10485760)
+- ONBOARD_LOG_BACKUPS: Rotated, compressed files to keep (default: 10)
+"""
+
+import os
+import copy
+import json
+import gzip
+import queue
+import shutil
+import atexit
+import hashlib
+import logging
+import datetime
+import contextlib
+import contextvars
+import logging.handlers
+
+LOG_FORMAT    = os.getenv("ONBOARD_LOG_FORMAT", "text").lower()
+LOG_LEVEL     = os.getenv("ONBOARD_LOG_LEVEL", "INFO").upper()
+LOG_FILE      = os.getenv("ONBOARD_LOG_FILE", "onboarding_log.jsonl" if LOG_FORMAT == "json" else "onboarding_log.txt")
+LOG_MAX_BYTES = int(os.getenv("ONBOARD_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS   = int(os.getenv("ONBOARD_LOG_BACKUPS", "10"))
+
+# Correlation id of the hire the current thread / task is working on
+current_hire = contextvars.ContextVar("current_hire", default="-")
+
+_listener = None
+
+def hire_correlation_id(key):
+    """Short, stable id for a hire journal key (keeps the email itself out of every log line)."""
+    return "h-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+
+@contextlib.contextmanager
+def hire_context(key):
+    """Tag every record logged inside the block with the hire's correlation id."""
+    token = current_hire.set(hire_correlation_id(key))
+    try:
+        yield
+    finally:
+        current_hire.reset(token)
+
+def in_context(func):
+    """
+    Bind func to the caller's context (and so its hire id) for running on
+    another thread; executor threads do not inherit context variables.
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(func, *args, **kwargs)
+
+class _Lazy:
+    """Defers building an expensive log argument until a handler formats the record."""
+
+    def __init__(self, render):
+        self._render = render
+
+    def __str__(self):
+        try:
+            return self._render()
+        except Exception as e:
+            return f"<unprintable: {e}>"
+
+def lazy_json(obj):
+    """Log argument that pretty-prints obj as JSON only if the record is emitted."""
+    return _Lazy(lambda: json.dumps(obj, indent=2, default=str))
+
+def lazy_body(response, limit=None):
+    """Log argument for a response body, decoded (and optionally truncated) only if emitted."""
+    return _Lazy(lambda: response.text[:limit] if limit else response.text)
+
+class _HireFilter(logging.Filter):
+    # Runs on the thread that logged the record, where its hire context is visible
+    def filter(self, record):
+        record.hire = current_hire.get()
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() folds the traceback into msg and drops exc_info, so the
+    listener's formatters never see it. Here the message is rendered and the
+    traceback formatted on the logging thread, and kept in exc_text for them.
+    """
+    _formatter = logging.Formatter()
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = self._formatter.formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; extra={...} fields are included as top-level keys."""
+
+    _standard = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "hire"}
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "hire": getattr(record, "hire", "-"),
+            "msg": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in self._standard})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def configure_logging(log_format=LOG_FORMAT, level=LOG_LEVEL, log_file=LOG_FILE):
+    """
+    Replace the root logger's handlers with the queued console + rotating file
+    pipeline. Safe to call more than once; the previous listener is stopped first.
+    Returns the log file path (None when file logging is disabled).
+    """
+    global _listener
+    stop_logging()
+
+    file_level = getattr(logging, level, logging.INFO)
+    if log_format == "json":
+        console_formatter = file_formatter = JsonFormatter()
+    else:
+        console_formatter = logging.Formatter('%(levelname)s - %(message)s')
+        file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(hire)s] %(message)s',
+                                           datefmt='%Y-%m-%d %H:%M:%S')
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(console_formatter)
+    sinks = [console_handler]
+
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES,
+                                                            backupCount=LOG_BACKUPS, encoding="utf-8")
+        file_handler.namer = lambda name: f"{name}.gz"
+        file_handler.rotator = _gzip_rotator
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(file_formatter)
+        sinks.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_HireFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # Records below every sink's level are dropped before anything is formatted
+    root.setLevel(min(file_level, logging.INFO) if log_file else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    return log_file or None
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+
+Counts and times everything an onboarding run does, so a slow run can be
+explained from its report instead of by grepping log timestamps:
+
+- every outbound call (BambooHR REST and web/AJAX, WebWork, Sheets, Slack),
+  keyed by service and endpoint ("GET /v1/employees/{id}"): a latency
+  histogram, status-code counts, retries, and bytes sent / received
+- every pipeline step of every hire: a latency histogram and ok / failed counts
+
+- named counters and gauges (hires processed, session refreshes, queue depth)
+
+At the end of the run onboard.report_run() writes the machine-readable report
+(JSON, see RunMetrics.report()) and appends RunMetrics.summary() to the Slack
+message. Starting a new run folds the previous one into process-lifetime
+totals, which snapshot() returns for the metrics endpoint (metrics_exporter.py)
+of a long-running worker.
+
+Numeric path segments and the BambooHR subdomain are folded into "{id}" /
+"{sub}" so that each endpoint is one series, not one per employee.
+
+Environment Variables (optional):
+- ONBOARD_REPORT: Path of the JSON run report (default: onboarding_report.json; empty disables it)
+"""
+
+import os
+import re
+import json
+import time
+import bisect
+import threading
+from urllib.parse import urlsplit
+
+REPORT_PATH = os.getenv("ONBOARD_REPORT", "onboarding_report.json")
+
+# Histogram bucket upper bounds in seconds (the same as the Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{16,}|[0-9a-f-]{36})$", re.IGNORECASE)
+
+def endpoint_label(method, url, subdomain=None):
+    """Series label for a request, e.g. GET /api/gateway.php/{sub}/v1/employees/{id} (ids folded, query dropped)."""
+    segments = []
+    for segment in urlsplit(url).path.split("/"):
+        if subdomain and segment == subdomain:
+            segment = "{sub}"
+        elif _ID_SEGMENT.match(segment):
+            segment = "{id}"
+        segments.append(segment)
+    return f"{method.upper()} {'/'.join(segments) or '/'}"
+
+class Histogram:
+    """Fixed-bucket latency histogram with count, sum and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the open-ended bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 4),
+            "avg_s": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50_s": round(self.quantile(0.5), 4),
+            "p95_s": round(self.quantile(0.95), 4),
+            "max_s": round(self.max, 4),
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+class _CallStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.status = {}
+        self.retries = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        for status, count in other.status.items():
+            self.status[status] = self.status.get(status, 0) + count
+        self.retries += other.retries
+        self.errors += other.errors
+        self.bytes_sent += other.bytes_sent
+        self.bytes_received += other.bytes_received
+
+    def to_dict(self):
+        return {"latency": self.latency.to_dict(), "status": dict(self.status), "retries": self.retries,
+                "errors": self.errors, "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received}
+
+class _StepStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.outcomes = {}
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+
+    def to_dict(self):
+        return {"latency": self.latency.to_dict(), **self.outcomes}
+
+def _merged(factory, *sources):
+    merged = {}
+    for source in sources:
+        for key, stats in source.items():
+            if key not in merged:
+                merged[key] = factory()
+            merged[key].merge(stats)
+    return merged
+
+def _series_name(name, labels):
+    return f"{name}{{{','.join(f'{k}={v}' for k, v in labels)}}}" if labels else name
+
+class RunMetrics:
+    """Thread-safe call and step metrics for one onboarding run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Totals of the runs before the current one, for the lifetime view
+        self._past_calls = {}
+        self._past_steps = {}
+        self._past_counters = {}
+        self.started_at = time.time()
+        self.calls = {}
+        self.steps = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def start(self):
+        """Start a new run: fold the current run into the lifetime totals and reset it."""
+        with self._lock:
+            for service, endpoints in self.calls.items():
+                self._past_calls[service] = _merged(_CallStats, self._past_calls.get(service, {}), endpoints)
+            self._past_steps = _merged(_StepStats, self._past_steps, self.steps)
+            for key, value in self.counters.items():
+                self._past_counters[key] = self._past_counters.get(key, 0) + value
+            self.started_at = time.time()
+            self.calls = {}
+            self.steps = {}
+            self.counters = {("runs", ()): 1}
+
+    def incr(self, name, amount=1, **labels):
+        """Add to a named counter, e.g. incr("hires", result="succeeded")."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        """Set a named gauge (a current value such as a queue depth; not reset between runs)."""
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def record_call(self, service, endpoint, seconds, status=None, error=None,
+                    bytes_sent=0, bytes_received=0, retry=False):
+        """
+        Record one attempt of an outbound call. status is the HTTP status (or a
+        service-specific result such as "ok"); error is the exception name when
+        the attempt raised. retry=True marks attempts after the first.
+        """
+        key = str(status) if error is None else error
+        with self._lock:
+            stats = self.calls.setdefault(service, {}).get(endpoint)
+            if stats is None:
+                stats = self.calls[service][endpoint] = _CallStats()
+            stats.latency.observe(seconds)
+            stats.status[key] = stats.status.get(key, 0) + 1
+            stats.retries += bool(retry)
+            stats.errors += error is not None or (isinstance(status, int) and status >= 400)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    def record_step(self, step, seconds, ok):
+        """Record one run of a pipeline step."""
+        outcome = "ok" if ok else "failed"
+        with self._lock:
+            stats = self.steps.get(step)
+            if stats is None:
+                stats = self.steps[step] = _StepStats()
+            stats.latency.observe(seconds)
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+
+    def service_totals(self):
+        """{service: {"calls", "retries", "errors", "bytes_sent", "bytes_received", "seconds"}}."""
+        totals = {}
+        with self._lock:
+            for service, endpoints in self.calls.items():
+                total = totals[service] = {"calls": 0, "retries": 0, "errors": 0,
+                                           "bytes_sent": 0, "bytes_received": 0, "seconds": 0.0}
+                for stats in endpoints.values():
+                    total["calls"] += stats.latency.count
+                    total["retries"] += stats.retries
+                    total["errors"] += stats.errors
+                    total["bytes_sent"] += stats.bytes_sent
+                    total["bytes_received"] += stats.bytes_received
+                    total["seconds"] += stats.latency.sum
+        return totals
+
+    def report(self, **extra):
+        """The full run report as a JSON-serialisable dict; extra keys are added at the top level."""
+        finished_at = time.time()
+        services = self.service_totals()
+        with self._lock:
+            report = {
+                "started_at": self.started_at,
+                "finished_at": finished_at,
+                "duration_s": round(finished_at - self.started_at, 3),
+                **extra,
+                "services": services,
+                "calls": {service: {endpoint: stats.to_dict() for endpoint, stats in sorted(endpoints.items())}
+                          for service, endpoints in self.calls.items()},
+                "steps": {step: stats.to_dict() for step, stats in self.steps.items()},
+                "counters": {_series_name(name, labels): value for (name, labels), value in self.counters.items()},
+            }
+        return report
+
+    def snapshot(self):
+        """
+        Process-lifetime view (every run so far plus the current one) as
+        (calls, steps, counters, gauges), with copies of the stats objects.
+        """
+        with self._lock:
+            calls = {service: _merged(_CallStats, self._past_calls.get(service, {}), self.calls.get(service, {}))
+                     for service in set(self._past_calls) | set(self.calls)}
+            steps = _merged(_StepStats, self._past_steps, self.steps)
+            counters = dict(self._past_counters)
+            for key, value in self.counters.items():
+                counters[key] = counters.get(key, 0) + value
+            return calls, steps, counters, dict(self.gauges)
+
+    def summary(self, slowest=3):
+        """A few lines for the Slack message: duration, calls per service, slowest steps."""
+        duration = time.time() - self.started_at
+        services = self.service_totals()
+        calls = sum(s["calls"] for s in services.values())
+        retries = sum(s["retries"] for s in services.values())
+        errors = sum(s["errors"] for s in services.values())
+        per_service = ", ".join(f"{name} {totals['calls']}" for name, totals in sorted(services.items()))
+        lines = [f"Run took {int(duration // 60)}m{int(duration % 60):02d}s: {calls} calls ({per_service}), "
+                 f"{retries} retries, {errors} errors"]
+        with self._lock:
+            p95 = sorted(((stats.latency.quantile(0.95), step) for step, stats in self.steps.items()), reverse=True)
+        if p95:
+            lines.append("Slowest steps (p95): " + ", ".join(f"{step} {seconds:.1f}s" for seconds, step in p95[:slowest]))
+        return "\n".join(lines)
+
+    def write_report(self, path=REPORT_PATH, **extra):
+        """Write report() to path (write-then-rename). Returns the path, or None when disabled."""
+        if not path:
+            return None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.report(**extra), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
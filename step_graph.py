@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Step Graph Scheduler
+
+Runs a set of steps with declared dependencies, starting each step as soon as
+everything it depends on has succeeded, so independent branches run side by
+side and a whole graph takes as long as its critical path.
+
+A graph is a dict of
+    name -> (dependencies, func)
+where func() returns True on success and False on failure. A step whose
+dependency failed (or was itself skipped) is skipped. run_graph() returns
+{name: "ok" | "failed" | "skipped"}.
+
+run_graph() runs the funcs on a concurrent.futures executor (or one at a time
+in dependency order when no executor is given).
+"""
+
+import logging
+import traceback
+from concurrent.futures import wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+OK, FAILED, SKIPPED = "ok", "failed", "skipped"
+
+def check_graph(steps):
+    """Raise ValueError if a step depends on an unknown step or the graph has a cycle."""
+    for name, (deps, _) in steps.items():
+        unknown = [d for d in deps if d not in steps]
+        if unknown:
+            raise ValueError(f"Step {name} depends on unknown step(s): {', '.join(unknown)}")
+    visiting, visited = set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Step graph has a cycle through {name}")
+        visiting.add(name)
+        for dep in steps[name][0]:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in steps:
+        visit(name)
+
+def _outcome(func_result):
+    return OK if func_result else FAILED
+
+def _log_crash(name, e):
+    logger.error(f"Step {name} raised {type(e).__name__}: {e}")
+    logger.error(traceback.format_exc())
+
+def run_graph(steps, executor=None):
+    """Run a step graph on an executor. Blocks until every step is done or skipped."""
+    check_graph(steps)
+    states = {}
+    pending = dict(steps)
+    running = {}
+
+    def start_ready():
+        # Repeat until nothing changes, so skips cascade down the graph in one call
+        changed = True
+        while changed:
+            changed = False
+            for name, (deps, func) in list(pending.items()):
+                if any(states.get(d) in (FAILED, SKIPPED) for d in deps):
+                    states[name] = SKIPPED
+                elif all(states.get(d) == OK for d in deps):
+                    if executor is None:
+                        try:
+                            states[name] = _outcome(func())
+                        except Exception as e:
+                            _log_crash(name, e)
+                            states[name] = FAILED
+                    else:
+                        running[executor.submit(func)] = name
+                else:
+                    continue
+                del pending[name]
+                changed = True
+
+    start_ready()
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                states[name] = _outcome(future.result())
+            except Exception as e:
+                _log_crash(name, e)
+                states[name] = FAILED
+        start_ready()
+    return states
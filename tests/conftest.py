@@ -0,0 +1,135 @@
+"""
+Shared fixtures: one in-process mock of BambooHR, WebWork and Google Sheets
+(mock_services.py) for the whole session, with onboard.py pointed at it.
+
+onboard.py and its modules read their endpoints and state-file paths from the
+environment at import time, so the mock is started and the environment set
+here, before any test module imports them. Every test starts from a fresh
+mock data set and fresh run state (journal, directory snapshot, capability
+cache, rate budgets, pooled sessions).
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_services import MockState, SHEET_HEADERS, start_mock_server
+
+MOCK_SERVER, MOCK_URL = start_mock_server(MockState(employees=0, hires=0))
+STATE_DIR = tempfile.mkdtemp(prefix="onboard_tests_")
+
+STATE_FILES = {
+    "ONBOARD_JOURNAL": "onboarding_journal.jsonl",
+    "BAMBOOHR_DIRECTORY_SNAPSHOT": "bamboo_directory.sqlite3",
+    "ENDPOINT_CAPABILITIES_FILE": "endpoint_capabilities.json",
+    "BAMBOOHR_HEADERS_FILE": "bamboo_headers.json",
+    "BAMBOOHR_SESSION_FILE": "bamboo_session.json",
+}
+
+os.environ.update({
+    "BAMBOOHR_API_BASE": f"{MOCK_URL}/api/gateway.php",
+    "BAMBOOHR_WEB_BASE": MOCK_URL,
+    "BAMBOOHR_SUBDOMAIN": "mock",
+    "BAMBOOHR_API_KEY": "mock",
+    "WEBWORK_URL": f"{MOCK_URL}/rest-api/users",
+    "WEBWORK_USERNAME": "mock",
+    "WEBWORK_PASSWORD": "mock",
+    "SHEET_ID": "mock-sheet",
+    "SHEET_NAME": "Sheet1",
+    "ONBOARD_CASSETTE_MODE": "off",
+    "ONBOARD_REPORT": "",
+    "ONBOARD_LOG_FILE": "",
+    # Unpaced, with short backoffs; HTTP_BACKOFF_MAX stays above the mock's Retry-After of 1s
+    "BAMBOOHR_RATE": "0",
+    "WEBWORK_RATE": "0",
+    "SHEETS_RATE": "0",
+    "HTTP_BACKOFF_BASE": "0.01",
+    "HTTP_BACKOFF_MAX": "2",
+    **{var: os.path.join(STATE_DIR, name) for var, name in STATE_FILES.items()},
+})
+
+import onboard
+import hire_journal
+import endpoint_capabilities
+import http_cassettes
+
+class Mock:
+    """Handle on the running mock: reset its data set, add sheet rows, read its state and call counters."""
+
+    url = MOCK_URL
+
+    def reset(self, **options):
+        """Replace the data set, e.g. reset(employees=5, hires=2, lost_creates=1); see MockState."""
+        requests.post(f"{MOCK_URL}/__mock/reset", json=options).raise_for_status()
+
+    @property
+    def state(self):
+        return MOCK_SERVER.RequestHandlerClass.state
+
+    def calls(self, key):
+        """Calls counted under key, e.g. "bamboohr POST employees/" (ids folded to {id})."""
+        with self.state.lock:
+            return self.state.calls[key]
+
+    def add_row(self, email, **fields):
+        """Append a pending sheet row; fields override the defaults by header, e.g. add_row(..., **{"Pay Rate": ""})."""
+        row = self.state._sheet_row(email, "", "")
+        for header, value in fields.items():
+            row[SHEET_HEADERS.index(header)] = value
+        with self.state.lock:
+            self.state.sheet.append(row)
+
+    def rows(self):
+        """The sheet's data rows as dicts keyed by header."""
+        with self.state.lock:
+            return [dict(zip(SHEET_HEADERS, row)) for row in self.state.sheet[1:]]
+
+    def employees_with_email(self, email):
+        with self.state.lock:
+            return [e for e in self.state.employees.values() if (e.get("workEmail") or "").lower() == email.lower()]
+
+def reset_run_state():
+    """Forget everything a previous test's run left behind, on disk and in onboard.py."""
+    for name in STATE_FILES.values():
+        path = os.path.join(STATE_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+    onboard.EMPLOYEE_DIRECTORIES.clear()
+    onboard.reset_run_caches()
+    for session in onboard.HTTP_SESSIONS.values():
+        session.close()
+    onboard.HTTP_SESSIONS.clear()
+    for name, budget in list(onboard.RATE_BUDGETS.items()):
+        onboard.RATE_BUDGETS[name] = onboard.RateBudget(name, budget.max_rate, budget.burst)
+    hire_journal._shared = None
+    endpoint_capabilities._shared = None
+    http_cassettes._shared = None
+
+@pytest.fixture
+def mock():
+    """A fresh mock data set (five existing employees, no pending rows) and fresh run state."""
+    handle = Mock()
+    handle.reset(employees=5, hires=0)
+    reset_run_state()
+    yield handle
+    reset_run_state()
+
+@pytest.fixture
+def run_onboarding():
+    """Run onboard.run_onboarding() against the mock with a logged-in web session. Returns (successes, failures)."""
+    from benchmark_onboard import build_mock_sheets
+
+    def run(workers=1):
+        manager = onboard.BambooHRManager(subdomain=onboard.BAMBOO_SUB, api_key=onboard.BAMBOO_KEY, username=None,
+                                          password=None, totp_secret=None, template_id="319")
+        manager.headers = {"Cookie": "PHPSESSID=mock-session"}
+        manager.session_expires_at = time.time() + 3600
+        return onboard.run_onboarding(build_mock_sheets(MOCK_URL), None, manager, workers=workers)
+    return run
@@ -0,0 +1,54 @@
+import os
+
+import requests
+
+from conftest import STATE_DIR
+from directory_snapshot import DirectorySnapshot
+from mock_services import utc_now
+
+def snapshot(ttl=900):
+    return DirectorySnapshot("mock", "mock", path=os.path.join(STATE_DIR, "bamboo_directory.sqlite3"),
+                             ttl=ttl, request=requests.request)
+
+def test_first_load_fetches_the_full_directory_once(mock):
+    assert len(snapshot().employees()) == 5
+    # A second instance (the next run, or a helper script) reads the fresh snapshot from disk
+    assert len(snapshot().employees()) == 5
+    assert mock.calls("bamboohr GET employees/directory") == 1
+
+def test_stale_snapshot_syncs_through_the_changed_feed(mock):
+    snapshot().employees()
+    with mock.state.lock:
+        mock.state.employees["2000"] = {"id": "2000", "displayName": "Late Hire", "workEmail": "late@example.com"}
+        mock.state.changed["2000"] = (utc_now(), "Inserted")
+
+    employees = snapshot(ttl=0).employees()
+
+    assert "late@example.com" in {e.get("workEmail") for e in employees}
+    assert mock.calls("bamboohr GET employees/directory") == 1
+    assert mock.calls("bamboohr GET employees/{id}") == 1
+
+def test_deleted_employees_leave_the_snapshot(mock):
+    snapshot().employees()
+    with mock.state.lock:
+        mock.state.changed["1001"] = (utc_now(), "Deleted")
+
+    ids = {e["id"] for e in snapshot().employees(force=True)}
+
+    assert "1001" not in ids and len(ids) == 4
+
+def test_hires_added_during_a_run_are_refetched_in_full(mock):
+    snapshot().employees()
+    with mock.state.lock:
+        mock.state.employees["2000"] = {"id": "2000", "displayName": "New Hire", "workEmail": "new@example.com",
+                                        "jobTitle": "Agent", "location": "Remote"}
+    # What onboard.py knows of the hire it just created: no jobTitle or location
+    snapshot().add({"id": "2000", "displayName": "New Hire", "workEmail": "new@example.com"})
+
+    # Not in the changed feed (it was created before the feed's cut-off), but refetched anyway
+    employees = {e["id"]: e for e in snapshot(ttl=0).employees()}
+    assert (employees["2000"]["jobTitle"], employees["2000"]["location"]) == ("Agent", "Remote")
+
+    # Once complete it is no longer refetched
+    snapshot(ttl=0).employees()
+    assert mock.calls("bamboohr GET employees/{id}") == 1
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+
+import pytest
+
+from conftest import STATE_DIR
+from endpoint_capabilities import EndpointCapabilities
+
+SCOPE = "self_service:mock"
+VARIANTS = ["meta_users", "employee_access", "legacy"]
+
+@pytest.fixture
+def path():
+    path = os.path.join(STATE_DIR, "capabilities_test.json")
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+def test_untested_variants_keep_their_order(path):
+    assert EndpointCapabilities(path).order(SCOPE, VARIANTS) == VARIANTS
+
+def test_working_variant_goes_first_and_hard_failures_are_skipped(path):
+    capabilities = EndpointCapabilities(path)
+    capabilities.record(SCOPE, "meta_users", False, status=404)
+    capabilities.record(SCOPE, "legacy", True, status=200)
+
+    assert capabilities.order(SCOPE, VARIANTS) == ["legacy", "employee_access"]
+
+def test_a_hard_failure_demotes_a_working_variant(path):
+    capabilities = EndpointCapabilities(path)
+    capabilities.record(SCOPE, "legacy", True, status=200)
+    # A transient failure is not held against it
+    capabilities.record(SCOPE, "legacy", False, status=503)
+    assert capabilities.order(SCOPE, VARIANTS)[0] == "legacy"
+
+    capabilities.record(SCOPE, "legacy", False, status=403)
+    assert capabilities.order(SCOPE, VARIANTS) == ["meta_users", "employee_access"]
+
+def test_order_survives_a_reload(path):
+    capabilities = EndpointCapabilities(path)
+    capabilities.record(SCOPE, "meta_users", False, status=404)
+    capabilities.record(SCOPE, "employee_access", True, status=201)
+
+    assert EndpointCapabilities(path).order(SCOPE, VARIANTS) == ["employee_access", "legacy"]
+
+def test_stale_hard_failures_are_probed_again(path):
+    with open(path, "w") as f:
+        json.dump({SCOPE: {"meta_users": {"state": "unsupported", "status": 404, "checked_at": time.time() - 7200}}}, f)
+
+    assert EndpointCapabilities(path, reprobe_seconds=3600).order(SCOPE, VARIANTS) == VARIANTS
+    assert EndpointCapabilities(path, reprobe_seconds=86400).order(SCOPE, VARIANTS) == VARIANTS[1:]
+
+@pytest.mark.parametrize("content", [
+    '{"self_service:mock": {"legacy": {"state": "ok"',
+    '["not", "an", "object"]',
+    '{"self_service:mock": ["legacy"], "other": {"x": {"state": "ok", "checked_at": "yesterday"}}}',
+])
+def test_corrupt_files_start_from_scratch(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+    capabilities = EndpointCapabilities(path)
+    assert capabilities.order(SCOPE, VARIANTS) == VARIANTS
+    assert capabilities.order("other", ["x"]) == ["x"]
+    # The next verdict rewrites the file in our shape
+    capabilities.record(SCOPE, "legacy", True, status=200)
+    assert EndpointCapabilities(path).order(SCOPE, VARIANTS)[0] == "legacy"
+
+def test_run_tries_variants_until_one_works(path):
+    capabilities = EndpointCapabilities(path)
+    calls = []
+    def variant(name, result):
+        def call():
+            calls.append(name)
+            return result
+        return name, call
+    variants = [variant("meta_users", (False, "not found", 404)), variant("employee_access", (True, "ok", 200)),
+                variant("legacy", (True, "ok", 200))]
+
+    assert capabilities.run(SCOPE, variants) == (True, "ok", 200)
+    assert capabilities.run(SCOPE, variants) == (True, "ok", 200)
+    assert calls == ["meta_users", "employee_access", "employee_access"]
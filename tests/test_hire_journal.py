@@ -0,0 +1,80 @@
+import os
+
+from conftest import STATE_DIR
+from hire_journal import HireJournal, get_journal, hire_key
+from mock_services import utc_now
+
+# Pending rows from the mock start on 07/01/25; the journal keys on the normalised date
+HIRE = {"Email": "hire0@example.com", "Start Date": "2025-07-01"}
+
+def create_in_bamboohr(mock, employee_id, email):
+    """An employee the crashed run created before it died."""
+    with mock.state.lock:
+        mock.state.employees[employee_id] = {"id": employee_id, "displayName": "Hire0 Mock", "workEmail": email}
+        mock.state.changed[employee_id] = (utc_now(), "Inserted")
+
+def test_journal_survives_a_torn_last_line():
+    path = os.path.join(STATE_DIR, "torn_journal.jsonl")
+    journal = HireJournal(path)
+    journal.record("a|2025-07-01", "employee", bamboo_id="7", existing=False)
+    with open(path, "a") as f:
+        f.write('{"hire": "a|2025-07-01", "st')
+
+    assert HireJournal(path).steps("a|2025-07-01")["employee"]["bamboo_id"] == "7"
+    os.remove(path)
+
+def test_create_in_flight_at_a_crash_is_found_not_repeated(mock, run_onboarding):
+    mock.reset(employees=5, hires=1)
+    create_in_bamboohr(mock, "2000", HIRE["Email"])
+    get_journal().record(hire_key(HIRE), "create_started", attempt=1)
+
+    assert run_onboarding() == (1, 0)
+    assert mock.calls("bamboohr POST employees/") == 0
+    assert get_journal().steps(hire_key(HIRE))["created"]["bamboo_id"] == "2000"
+    # It is still this run's new hire, not an existing employee, so it gets its compensation row
+    assert mock.calls("bamboohr POST employees/{id}/tables/compensation/") == 1
+    assert mock.rows()[0]["Overall status"] == "SUCCESS"
+
+def test_resumed_hire_skips_its_completed_steps(mock, run_onboarding):
+    mock.reset(employees=5, hires=1)
+    create_in_bamboohr(mock, "2000", HIRE["Email"])
+    journal = get_journal()
+    journal.record(hire_key(HIRE), "employee", bamboo_id="2000", existing=False)
+    journal.record(hire_key(HIRE), "compensation", row_id="1")
+
+    assert run_onboarding() == (1, 0)
+    assert mock.calls("bamboohr POST employees/") == 0
+    assert mock.calls("bamboohr POST employees/{id}/tables/compensation/") == 0
+    # The steps after the crash still ran
+    assert mock.calls("bamboohr POST employees/{id}") >= 1
+    assert set(journal.steps(hire_key(HIRE))) >= {"updated", "webwork", "finished"}
+
+def test_finished_hire_is_written_back_without_any_upstream_call(mock, run_onboarding):
+    # The crash came after the hire finished but before its status reached the sheet
+    mock.reset(employees=5, hires=1)
+    get_journal().record(hire_key(HIRE), "employee", bamboo_id="2000", existing=False)
+    get_journal().record(hire_key(HIRE), "finished", notes="OK")
+
+    assert run_onboarding() == (1, 0)
+    assert mock.calls("bamboohr") == 0 and mock.calls("webwork") == 0
+    assert mock.rows()[0]["Overall status"] == "SUCCESS"
+
+def test_old_hires_are_pruned_finished_or_not():
+    path = os.path.join(STATE_DIR, "old_journal.jsonl")
+    journal = HireJournal(path, retention_days=14)
+    journal.record("finished|2025-07-01", "employee", bamboo_id="1")
+    journal.record("finished|2025-07-01", "finished", notes="OK")
+    journal.record("failed|2025-07-01", "employee", bamboo_id="2")
+    journal.record("recent|2025-07-01", "employee", bamboo_id="3")
+    # Age everything but the recent hire past the retention period
+    for key in ("finished|2025-07-01", "failed|2025-07-01"):
+        for data in journal._hires[key].values():
+            data["at"] -= 15 * 86400
+    journal._rewrite()
+
+    reopened = HireJournal(path, retention_days=14)
+
+    assert set(reopened._hires) == {"recent|2025-07-01"}
+    # The pruned hires are gone from the file too, not just from memory
+    assert "failed|" not in open(path).read()
+    os.remove(path)
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+import onboard
+from hire_validation import normalize_hire, preflight, supervisor_id
+
+def row(**fields):
+    hire = {"First Name": "Jo", "Last Name": "Doe", "Email": "jo@example.com", "Start Date": "07/01/25",
+            "Pay Rate": "$45,000.00", "Pay Type": "salaried", "Pay Schedule": "bi-weekly",
+            "Reports To": "Jane Roe (1000)"}
+    hire.update(fields)
+    return hire
+
+def test_valid_row_is_normalised():
+    hire, error = normalize_hire(row())
+    assert error is None
+    assert hire["Start Date"] == "2025-07-01"
+    assert hire["Pay Rate"] == "45000.00"
+    assert (hire["Pay Type"], hire["Pay Schedule"]) == ("Salary", "Biweekly")
+    assert hire["Supervisor ID"] == "1000" == supervisor_id(hire)
+
+@pytest.mark.parametrize("fields, problem", [
+    ({"Start Date": "next monday"}, "Start Date 'next monday' is not a date"),
+    ({"Pay Rate": "-5"}, "Pay Rate '-5' is not a positive number"),
+    ({"Pay Rate": "", "Salary": "lots"}, "Pay Rate 'lots' is not a positive number"),
+    ({"Email": "jo.example.com"}, "is not an email address"),
+    ({"Pay Schedule": "fortnightly"}, "Pay Schedule 'fortnightly' is not one of"),
+    ({"Reports To": "Jane Roe"}, "has no employee id"),
+    ({"Last Name": " "}, "Last Name is missing"),
+])
+def test_invalid_fields_are_reported(fields, problem):
+    _, error = normalize_hire(row(**fields))
+    assert problem in error
+
+def test_every_problem_is_reported_at_once():
+    _, error = normalize_hire(row(**{"Start Date": "", "Pay Rate": "abc"}))
+    assert error == "Start Date is missing; Pay Rate 'abc' is not a positive number"
+
+def test_pay_rate_is_only_required_where_compensation_is_written():
+    hire = row(**{"Pay Rate": ""})
+    assert normalize_hire(hire)[1] == "Pay Rate is missing"
+    assert normalize_hire(hire, needs_compensation=lambda h: True)[1] == "Pay Rate is missing"
+    assert normalize_hire(hire, needs_compensation=lambda h: False)[1] is None
+    # A rate that is filled in must still be valid
+    assert "not a positive number" in normalize_hire(row(**{"Pay Rate": "0"}), lambda h: False)[1]
+
+def test_needs_compensation_sees_the_normalised_hire():
+    seen = []
+    normalize_hire(row(**{"Pay Rate": ""}), needs_compensation=lambda h: seen.append(h["Start Date"]))
+    assert seen == ["2025-07-01"]
+
+def test_duplicates_are_rejected_after_normalisation():
+    valid, rejected = preflight([
+        (2, row()),
+        (3, row(Email="JO@example.com ", **{"Start Date": "2025-07-01"})),
+        (4, row(**{"Start Date": "08/01/25"})),
+    ])
+    assert [index for index, _ in valid] == [2, 4]
+    assert rejected == [(3, "Invalid row: Duplicate of row 2 (same Email and Start Date)")]
+
+def test_duplicates_are_caught_across_pages():
+    seen = {}
+    assert preflight([(2, row())], seen=seen)[1] == []
+    valid, rejected = preflight([(3, row(Email="jo@example.com"))], seen=seen)
+    assert valid == [] and rejected == [(3, "Invalid row: Duplicate of row 2 (same Email and Start Date)")]
+
+def test_hires_start_before_the_next_page_is_read(mock, run_onboarding, monkeypatch):
+    mock.reset(employees=5, hires=3)
+    mock.add_row("hire0@example.com")  # duplicate of the first row, on the second page
+    monkeypatch.setattr(onboard, "SHEETS_PAGE_ROWS", 2)
+    creates_at_read = []
+    sheets_execute = onboard.sheets_execute
+    def read(name, request):
+        if name == "values.get":
+            # From the second page on, give the first page's hires a moment: they only use it if already submitted
+            deadline = time.monotonic() + 5
+            while len(creates_at_read) >= 2 and not mock.calls("bamboohr POST employees/") \
+                    and time.monotonic() < deadline:
+                time.sleep(0.01)
+            creates_at_read.append(mock.calls("bamboohr POST employees/"))
+        return sheets_execute(name, request)
+    monkeypatch.setattr(onboard, "sheets_execute", read)
+
+    assert run_onboarding() == (3, 1)
+    # Reads: the header row, then pages of two rows
+    header, first_page, second_page = creates_at_read[:3]
+    assert (header, first_page) == (0, 0) and second_page >= 1
+    assert mock.rows()[3]["Notes"] == "Invalid row: Duplicate of row 2 (same Email and Start Date)"
+
+def test_update_only_rows_pass_preflight_in_a_run(mock, run_onboarding):
+    mock.reset(employees=5, hires=0)
+    # existing1001 is already in BambooHR: its row only updates the record
+    mock.add_row("existing1001@example.com", **{"Pay Rate": ""})
+    mock.add_row("new@example.com", **{"Pay Rate": ""})
+    mock.add_row("paid@example.com")
+
+    assert run_onboarding() == (2, 1)
+
+    rows = {r["Email"]: r for r in mock.rows()}
+    assert rows["existing1001@example.com"]["Overall status"] == "SUCCESS"
+    assert rows["new@example.com"]["Notes"] == "Invalid row: Pay Rate is missing"
+    assert rows["paid@example.com"]["Overall status"] == "SUCCESS"
+    # Only the valid new hire was created; the existing employee got no compensation row
+    assert mock.calls("bamboohr POST employees/") == 1
+    assert mock.calls("bamboohr POST employees/{id}/tables/compensation/") == 1
@@ -0,0 +1,80 @@
+import os
+import json
+
+import pytest
+import requests
+
+import onboard
+import http_cassettes
+from conftest import STATE_DIR, reset_run_state
+from http_cassettes import Cassette, CassetteAdapter, CassetteMiss
+
+def session_on(cassette, service="bamboohr"):
+    session = requests.Session()
+    session.mount("http://", CassetteAdapter(cassette, service))
+    return session
+
+@pytest.fixture
+def cassette_path():
+    path = os.path.join(STATE_DIR, "cassette.jsonl")
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+def test_replay_answers_without_the_upstream(mock, cassette_path):
+    url = f"{mock.url}/api/gateway.php/mock/v1/employees/1001"
+    recorded = session_on(Cassette(cassette_path, mode="record")).get(url, auth=("secret-key", "x"))
+
+    replayed = session_on(Cassette(cassette_path, mode="replay", latency=0)).get(url, auth=("secret-key", "x"))
+
+    assert replayed.status_code == recorded.status_code == 200
+    assert replayed.json() == recorded.json()
+    assert mock.calls("bamboohr GET employees/{id}") == 1
+    # An id that was never recorded falls back to the same endpoint
+    other = session_on(Cassette(cassette_path, mode="replay", latency=0)).get(url.replace("1001", "1002"))
+    assert other.json()["id"] == "1001"
+
+def test_secrets_never_reach_the_cassette(mock, cassette_path):
+    session = session_on(Cassette(cassette_path, mode="record"), "bamboohr_web")
+    session.post(f"{mock.url}/login.php", data={"username": "me", "password": "hunter2", "CSRFToken": "t"},
+                 headers={"Cookie": "PHPSESSID=abc"}, allow_redirects=False)
+
+    text = open(cassette_path).read()
+    assert "hunter2" not in text and "PHPSESSID=abc" not in text
+    assert json.loads(text.splitlines()[0])["body"] == "username=me&password=%3Cscrubbed%3E&CSRFToken=%3Cscrubbed%3E"
+
+def test_unrecorded_requests_miss(mock, cassette_path):
+    session_on(Cassette(cassette_path, mode="record")).get(f"{mock.url}/api/gateway.php/mock/v1/employees/directory")
+    with pytest.raises(CassetteMiss):
+        session_on(Cassette(cassette_path, mode="replay", latency=0)).get(f"{mock.url}/rest-api/users")
+
+def test_injected_failures_repeat_for_the_same_seed(mock, cassette_path):
+    url = f"{mock.url}/api/gateway.php/mock/v1/employees/1001"
+    session_on(Cassette(cassette_path, mode="record")).get(url)
+
+    def statuses(seed):
+        session = session_on(Cassette(cassette_path, mode="replay", latency=0, error_rate=0.5,
+                                      errors=["503", "429"], seed=seed))
+        return [session.get(url).status_code for _ in range(20)]
+
+    assert statuses("a") == statuses("a")
+    assert {200, 503, 429} <= set(statuses("a") + statuses("b"))
+
+def test_a_recorded_run_replays_to_the_same_result(mock, run_onboarding, cassette_path, monkeypatch):
+    mock.reset(employees=5, hires=3)
+    monkeypatch.setattr(http_cassettes, "CASSETTE_MODE", "record")
+    http_cassettes._shared = Cassette(cassette_path, mode="record")
+    assert run_onboarding() == (3, 0)
+    recorded_posts = mock.calls("bamboohr POST employees/")
+
+    # Same starting point, but nothing may reach the mock this time
+    mock.reset(employees=5, hires=3)
+    reset_run_state()
+    monkeypatch.setattr(http_cassettes, "CASSETTE_MODE", "replay")
+    http_cassettes._shared = Cassette(cassette_path, mode="replay", latency=0)
+
+    assert run_onboarding() == (3, 0)
+    assert recorded_posts == 3
+    assert sum(n for key, n in mock.state.calls.items() if " " not in key) == 0
+    assert onboard.RUN_METRICS.service_totals()["bamboohr"]["calls"] > 0
+    assert http_cassettes._shared.stats() == {"misses": 0, "injected": 0}
@@ -0,0 +1,87 @@
+import re
+
+import pytest
+import requests
+
+import onboard
+from bamboo_http_login import http_login
+from mock_services import MOCK_CSRF
+
+TOTP_SECRET = "JBSWY3DPEHPK3PXP"
+
+def recording_session(sent):
+    """A session that remembers every request it sent, redirects included."""
+    session = requests.Session()
+    session.hooks["response"].append(lambda response, *args, **kwargs: sent.append(response.request))
+    return session
+
+def test_login_fills_in_every_form_with_its_csrf_token(mock):
+    sent = []
+    headers, expires_at, error = http_login(mock.url, "me@example.com", "secret", TOTP_SECRET,
+                                            session=recording_session(sent))
+
+    assert error is None and expires_at is not None
+    assert "PHPSESSID=mock-" in headers["Cookie"]
+    posts = {re.sub(r".*/", "/", r.url): r.body for r in sent if r.method == "POST"}
+    assert list(posts) == ["/login.php", "/multi_factor_authentication.php", "/trusted_browser.php"]
+    assert all(f"CSRFToken={MOCK_CSRF}" in body for body in posts.values())
+    assert "username=me%40example.com" in posts["/login.php"] and "password=secret" in posts["/login.php"]
+    assert re.search(r"oneTimeCode=\d{6}", posts["/multi_factor_authentication.php"])
+    # The "trust this browser" button, not "don't trust"
+    assert "trust=yes" in posts["/trusted_browser.php"]
+
+def test_login_follows_the_mfa_redirect_with_its_cookie(mock):
+    sent = []
+    headers, _, error = http_login(mock.url, "me", "secret", TOTP_SECRET, session=recording_session(sent))
+
+    assert error is None
+    mfa_page = next(r for r in sent if r.method == "GET" and r.url.endswith("/multi_factor_authentication.php"))
+    assert "mfa_pending=1" in mfa_page.headers["Cookie"]
+    assert mock.calls("bamboohr_web GET /home") == 1
+    assert "mfa_pending=1" in headers["Cookie"]
+
+def test_rejected_form_stops_the_login(mock):
+    class StaleTokenSession(requests.Session):
+        def request(self, method, url, data=None, **kwargs):
+            return super().request(method, url, data=data and {**data, "CSRFToken": "stale"}, **kwargs)
+
+    headers, expires_at, error = http_login(mock.url, "me", "secret", TOTP_SECRET, session=StaleTokenSession())
+
+    assert (headers, expires_at) == (None, None)
+    assert error == f"Login rejected at {mock.url}/login.php"
+
+def test_missing_credentials_make_no_request(mock):
+    assert http_login(mock.url, "me", "", TOTP_SECRET) == (None, None, "Missing BambooHR credentials")
+    assert mock.calls("bamboohr_web") == 0
+
+@pytest.fixture
+def browser_logins(mock, monkeypatch):
+    """BambooHRManager whose HTTP login lands on a page it does not know; records browser logins instead of running Chrome."""
+    logins = []
+    monkeypatch.setattr(onboard, "BAMBOO_WEB_BASE", f"{mock.url}/ajax")
+    monkeypatch.setattr(onboard, "selenium_api", lambda: object())
+    monkeypatch.setattr(onboard.BambooHRManager, "_browser_login", lambda self: logins.append(self) or True)
+    manager = onboard.BambooHRManager(subdomain=onboard.BAMBOO_SUB, api_key=onboard.BAMBOO_KEY, username="me",
+                                      password="secret", totp_secret=TOTP_SECRET, template_id="319")
+    return manager, logins
+
+def test_unrecognised_login_page_falls_back_to_the_browser(browser_logins, mock):
+    manager, logins = browser_logins
+
+    assert manager.refresh_session()
+    assert logins == [manager]
+    assert mock.calls("bamboohr_web GET /ajax/login.php") == 1
+
+def test_http_only_login_does_not_fall_back(browser_logins, monkeypatch):
+    manager, logins = browser_logins
+    monkeypatch.setattr(onboard, "LOGIN_METHOD", "http")
+
+    assert manager.refresh_session() is False
+    assert logins == []
+
+def test_no_fallback_without_selenium(browser_logins, monkeypatch):
+    manager, logins = browser_logins
+    monkeypatch.setattr(onboard, "selenium_api", lambda: None)
+
+    assert manager.refresh_session() is False
+    assert logins == []
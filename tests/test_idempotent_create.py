@@ -0,0 +1,42 @@
+import pytest
+
+from hire_journal import get_journal, hire_key
+
+HIRE = {"Email": "hire0@example.com", "Start Date": "2025-07-01"}
+
+@pytest.mark.parametrize("status", [502, 503])
+def test_lost_create_is_found_in_the_directory_not_posted_twice(mock, run_onboarding, status):
+    # BambooHR creates the employee but the response is lost behind a 502 / 503
+    mock.reset(employees=5, hires=1, lost_creates=1, lost_create_status=status)
+
+    assert run_onboarding() == (1, 0)
+
+    assert mock.calls("bamboohr lost create") == 1
+    assert mock.calls("bamboohr POST employees/") == 1
+    employees = mock.employees_with_email(HIRE["Email"])
+    assert len(employees) == 1
+    assert get_journal().steps(hire_key(HIRE))["created"]["bamboo_id"] == employees[0]["id"]
+    assert mock.rows()[0]["Overall status"] == "SUCCESS"
+
+def test_rows_for_the_same_hire_create_one_employee(mock, run_onboarding):
+    mock.reset(employees=5, hires=0)
+    mock.add_row("twice@example.com")
+    mock.add_row("TWICE@example.com ")
+
+    successes, failures = run_onboarding(workers=2)
+
+    # Pre-flight rejects the second row as a duplicate; either way BambooHR sees one create
+    assert (successes, failures) == (1, 1)
+    assert mock.calls("bamboohr POST employees/") == 1
+    assert "Duplicate of row 2" in mock.rows()[1]["Notes"]
+
+def test_rerun_after_success_does_not_create_again(mock, run_onboarding):
+    mock.reset(employees=5, hires=1)
+    assert run_onboarding() == (1, 0)
+    # The status never reached the sheet (say, the write-back failed)
+    with mock.state.lock:
+        mock.state.sheet[1][14] = ""
+
+    assert run_onboarding() == (1, 0)
+    assert mock.calls("bamboohr POST employees/") == 1
+    assert len(mock.employees_with_email(HIRE["Email"])) == 1
@@ -0,0 +1,86 @@
+from metrics_exporter import render
+from run_metrics import RunMetrics, LATENCY_BUCKETS
+
+def samples(text):
+    """{series: value} for every sample line of an exposition."""
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+def populated():
+    metrics = RunMetrics()
+    metrics.start()
+    metrics.incr("hires", result="succeeded")
+    metrics.incr("hires", result="failed")
+    metrics.incr("watch_polls", result="idle")
+    metrics.set_gauge("queue_depth", 3, queue="write_backs")
+    metrics.record_step("employee", 0.02, True)
+    metrics.record_step("employee", 3.0, False)
+    metrics.record_call("bamboohr", "GET employees/{id}", 0.007, status=200, bytes_received=512)
+    metrics.record_call("bamboohr", "GET employees/{id}", 0.3, status=503, retry=True)
+    return metrics
+
+def test_names_and_types():
+    text = render(populated())
+
+    assert "# TYPE onboard_hires_total counter" in text
+    assert "# TYPE onboard_step_duration_seconds histogram" in text
+    # Counters without a registered name get one derived from theirs; gauges get no _total
+    assert "# TYPE onboard_watch_polls_total counter" in text
+    assert "# TYPE onboard_queue_depth gauge" in text
+    values = samples(text)
+    assert values['onboard_hires_total{result="succeeded"}'] == "1"
+    assert values['onboard_queue_depth{queue="write_backs"}'] == "3"
+    assert values['onboard_upstream_requests_total{service="bamboohr",endpoint="GET employees/{id}",status="503"}'] == "1"
+    assert values['onboard_upstream_retries_total{service="bamboohr",endpoint="GET employees/{id}"}'] == "1"
+    assert values['onboard_upstream_errors_total{service="bamboohr",endpoint="GET employees/{id}"}'] == "1"
+    assert values['onboard_upstream_bytes_received_total{service="bamboohr"}'] == "512"
+    # Every family is declared once
+    type_lines = [line for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(type_lines) == len(set(type_lines))
+
+def test_label_values_are_escaped():
+    metrics = RunMetrics()
+    metrics.record_call("webwork", 'POST say "hi"\\\n', 0.01, error="ConnectionError")
+
+    text = render(metrics)
+
+    assert 'endpoint="POST say \\"hi\\"\\\\\\n",status="ConnectionError"} 1' in text
+    assert all(line.count("{") <= 1 for line in text.splitlines())
+
+def test_histogram_buckets_are_cumulative_up_to_inf():
+    values = samples(render(populated()))
+    series = lambda le: values[f'onboard_step_duration_seconds_bucket{{step="employee",le="{le}"}}']
+
+    bounds = ["+Inf" if bound == float("inf") else repr(bound) for bound in LATENCY_BUCKETS]
+    counts = [int(series(le)) for le in bounds]
+    assert counts == sorted(counts)
+    assert (series("0.01"), series("0.025"), series("2.5"), series("5.0"), series("+Inf")) == ("0", "1", "1", "2", "2")
+    assert values['onboard_step_duration_seconds_count{step="employee"}'] == "2"
+    assert float(values['onboard_step_duration_seconds_sum{step="employee"}']) == 3.02
+
+def test_totals_cover_the_whole_process_not_just_the_current_run():
+    metrics = populated()
+    metrics.start()
+    metrics.incr("hires", result="succeeded")
+    metrics.record_step("employee", 0.02, True)
+
+    values = samples(render(metrics))
+
+    assert values["onboard_runs_total"] == "2"
+    assert values['onboard_hires_total{result="succeeded"}'] == "2"
+    assert values['onboard_hires_total{result="failed"}'] == "1"
+    assert values['onboard_step_duration_seconds_bucket{step="employee",le="+Inf"}'] == "3"
+    assert values['onboard_steps_total{step="employee",outcome="ok"}'] == "2"
+    assert values['onboard_upstream_requests_total{service="bamboohr",endpoint="GET employees/{id}",status="200"}'] == "1"
+    # The run report still covers the current run only
+    assert metrics.report()["counters"] == {"runs": 1, "hires{result=succeeded}": 1}
+
+def test_a_failing_collector_does_not_break_the_scrape():
+    def broken():
+        raise RuntimeError("boom")
+    def budgets():
+        return [("onboard_rate_limiter_wait_seconds_total", "counter", "Time spent waiting",
+                 [({"budget": "sheets"}, 0.5)])]
+
+    values = samples(render(populated(), collectors=[broken, budgets]))
+
+    assert values['onboard_rate_limiter_wait_seconds_total{budget="sheets"}'] == "0.5"
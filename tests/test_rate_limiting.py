@@ -0,0 +1,75 @@
+import time
+import email.utils
+
+import pytest
+import requests
+
+import onboard
+
+def employees_url(path=""):
+    return f"{onboard.BAMBOO_API_BASE}/{onboard.BAMBOO_SUB}/v1/employees/{path}"
+
+def start_of_next_second():
+    # The mock's limit counts calls per wall-clock second
+    time.sleep(1.02 - time.time() % 1)
+
+class Response:
+    def __init__(self, retry_after):
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+def test_retry_after_seconds_parses_both_forms():
+    assert onboard.retry_after_seconds(Response("3")) == 3.0
+    in_five = email.utils.formatdate(time.time() + 5, usegmt=True)
+    assert 3.5 < onboard.retry_after_seconds(Response(in_five)) <= 5.0
+    assert onboard.retry_after_seconds(Response("soon")) is None
+    assert onboard.retry_after_seconds(Response(None)) is None
+
+def test_throttles_halve_the_rate_and_successes_win_it_back():
+    budget = onboard.RateBudget("test", rate=10, burst=1, min_rate=2)
+    budget.throttled()
+    budget.throttled()
+    assert budget.rate == 2.5
+    budget.throttled()
+    assert budget.rate == 2
+    for _ in range(100):
+        budget.succeeded()
+    assert budget.rate == 10
+
+def test_retry_after_holds_back_every_caller():
+    budget = onboard.RateBudget("test", rate=0, burst=1)
+    budget.throttled(retry_after=0.3)
+    assert budget.acquire() == pytest.approx(0.3, abs=0.05)
+    assert budget.acquire() == 0
+
+@pytest.mark.parametrize("method, path", [("GET", "1000"), ("POST", "1000")])
+def test_429_is_retried_after_retry_after_for_any_method(mock, method, path):
+    mock.reset(employees=5, hires=0, bamboo_limit=1)
+    auth = onboard.bamboo_auth("mock")
+    start_of_next_second()
+    assert onboard.api_request("bamboohr", "GET", employees_url("1001"), auth=auth).status_code == 200
+
+    started = time.monotonic()
+    response = onboard.api_request("bamboohr", method, employees_url(path), auth=auth)
+
+    assert response.status_code == 200
+    assert mock.calls("bamboohr 429") == 1
+    # Retry-After: 1 was honoured, not the 10 ms backoff the tests configure
+    assert time.monotonic() - started >= 0.9
+    assert onboard.budget_for("bamboohr", method).throttles == 1
+
+def test_503_to_a_post_is_handed_back_not_resent(mock):
+    mock.reset(employees=5, hires=0, lost_creates=1, lost_create_status=503)
+
+    response = onboard.api_request("bamboohr", "POST", employees_url(), auth=onboard.bamboo_auth("mock"),
+                                   json={"firstName": "Jo", "lastName": "Doe", "workEmail": "jo@example.com"})
+
+    assert response.status_code == 503
+    assert mock.calls("bamboohr POST employees/") == 1
+
+def test_only_idempotent_methods_resend_a_503():
+    assert onboard.is_retryable("GET", 503)
+    assert onboard.is_retryable("head", 503)
+    assert not onboard.is_retryable("POST", 503)
+    assert not onboard.is_retryable("PUT", 503)
+    assert onboard.is_retryable("POST", 429)
+    assert not onboard.is_retryable("GET", 500)
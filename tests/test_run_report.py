@@ -0,0 +1,18 @@
+import json
+import functools
+
+import onboard
+from run_metrics import RunMetrics
+
+def test_partial_read_error_reaches_the_report(mock, tmp_path, monkeypatch):
+    path = tmp_path / "report.json"
+    monkeypatch.setattr(onboard.RUN_METRICS, "write_report",
+                        functools.partial(RunMetrics.write_report, onboard.RUN_METRICS, str(path)))
+    onboard.RUN_METRICS.start()
+
+    # Some rows were processed before the sheet read failed
+    assert onboard.report_run(None, 2, 1, RuntimeError("sheet read failed")) == (2, 1)
+
+    report = json.loads(path.read_text())
+    assert report["hires"] == {"succeeded": 2, "failed": 1}
+    assert report["read_error"] == "sheet read failed"
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+import onboard
+
+LOGINS = "bamboohr_web POST /trusted_browser.php"
+
+@pytest.fixture
+def manager(mock):
+    return onboard.BambooHRManager(subdomain=onboard.BAMBOO_SUB, api_key=onboard.BAMBOO_KEY, username="me",
+                                   password="secret", totp_secret="JBSWY3DPEHPK3PXP", template_id="319")
+
+def test_expiry_comes_from_the_session_cookie_only(manager, mock):
+    assert manager.refresh_session()
+
+    # The mock's session cookie lives an hour; its load-balancer cookie only a minute
+    assert "lb_affinity=" in manager.headers["Cookie"]
+    assert manager.session_expires_at - time.time() > 3500
+    assert mock.calls(LOGINS) == 1
+
+def test_probe_ignores_other_cookies(manager, mock):
+    manager.headers = {"Cookie": "PHPSESSID=mock-session"}
+    manager.session_expires_at = expires_at = time.time() + 3600
+
+    # The probe answers with a fresh load-balancer cookie but leaves the session cookie alone
+    assert manager.probe_session() is True
+    assert manager.session_expires_at == expires_at
+
+def test_short_session_is_not_refreshed_back_to_back(manager, mock, monkeypatch):
+    # A session shorter than the refresh margin is due for a refresh the moment it is issued
+    monkeypatch.setattr(onboard, "SESSION_REFRESH_MARGIN", 7200)
+    monkeypatch.setattr(onboard, "SESSION_MIN_REFRESH", 300)
+    manager.SESSION_CHECK_SECONDS = 0.01
+    assert manager.refresh_session()
+    assert manager._seconds_until_refresh() > 290
+
+    manager.start_session_keeper()
+    time.sleep(0.3)
+    manager.stop_session_keeper()
+    manager._keeper.join(timeout=2)
+
+    assert mock.calls(LOGINS) == 1
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from step_graph import run_graph, check_graph, OK, FAILED, SKIPPED
+
+def step(log, name, result=True):
+    def run():
+        log.append(name)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return run
+
+def test_steps_run_in_dependency_order():
+    log = []
+    states = run_graph({
+        "packet": (("updated",), step(log, "packet")),
+        "updated": (("employee",), step(log, "updated")),
+        "employee": ((), step(log, "employee")),
+    })
+    assert log == ["employee", "updated", "packet"]
+    assert states == {"employee": OK, "updated": OK, "packet": OK}
+
+def test_failure_skips_only_its_dependents():
+    log = []
+    states = run_graph({
+        "employee": ((), step(log, "employee", False)),
+        "updated": (("employee",), step(log, "updated")),
+        "packet": (("updated",), step(log, "packet")),
+        "webwork": ((), step(log, "webwork")),
+    })
+    assert states == {"employee": FAILED, "updated": SKIPPED, "packet": SKIPPED, "webwork": OK}
+    assert sorted(log) == ["employee", "webwork"]
+
+def test_a_crashing_step_counts_as_failed():
+    states = run_graph({"a": ((), step([], "a", RuntimeError("boom"))), "b": (("a",), step([], "b"))},
+                       ThreadPoolExecutor(2))
+    assert states == {"a": FAILED, "b": SKIPPED}
+
+def test_independent_steps_run_side_by_side():
+    # Each of the two waits for the other, so they only finish if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    def meet():
+        barrier.wait()
+        return True
+    with ThreadPoolExecutor(2) as executor:
+        states = run_graph({"compensation": ((), meet), "webwork": ((), meet)}, executor)
+    assert states == {"compensation": OK, "webwork": OK}
+
+@pytest.mark.parametrize("steps", [
+    {"a": (("missing",), None)},
+    {"a": (("b",), None), "b": (("a",), None)},
+])
+def test_bad_graphs_are_rejected(steps):
+    with pytest.raises(ValueError):
+        check_graph(steps)
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import socket
+import signal
+import threading
+import subprocess
+
+import requests
+
+import onboard_watch
+from benchmark_onboard import build_mock_sheets
+from conftest import ROOT, STATE_DIR, MOCK_URL
+from onboard_watch import SheetPoller, watch
+
+STATUS = 14  # "Overall status" in the mock's sheet
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_watch_mode_through_main_runs_on_one_module(mock):
+    from benchmark_startup import write_service_account
+    mock.reset(employees=5, hires=2)
+    key_file = os.path.join(STATE_DIR, "service_account.json")
+    write_service_account(key_file, MOCK_URL)
+    port = free_port()
+    env = dict(os.environ, ONBOARD_WATCH="1", ONBOARD_WATCH_INTERVAL="0.1", ONBOARD_WATCH_MAX_INTERVAL="0.2",
+               ONBOARD_METRICS_PORT=str(port), GOOGLE_SERVICE_ACCOUNT_FILE=key_file,
+               SHEETS_API_ENDPOINT=f"{MOCK_URL}/", SHEETS_DISCOVERY_CACHE="",
+               BAMBOOHR_USERNAME="me", BAMBOOHR_PASSWORD="secret", BAMBOOHR_TOTP_SECRET="JBSWY3DPEHPK3PXP")
+
+    # `python onboard.py`, exactly as a deployment starts it
+    proc = subprocess.Popen([sys.executable, "onboard.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and not all(r["Overall status"] for r in mock.rows()):
+            time.sleep(0.1)
+        scraped = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=5).text
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        output = proc.communicate(timeout=30)[0]
+
+    assert [r["Overall status"] for r in mock.rows()] == ["SUCCESS", "SUCCESS"], output
+    # The endpoint serves main()'s RUN_METRICS: it only sees the pass if onboard_watch ran on the same module
+    assert 'onboard_hires_total{result="succeeded"} 2' in scraped
+    assert proc.returncode == 0 and "Watch mode stopped" in output
+
+def move_column(mock, source, target):
+    with mock.state.lock:
+        for row in mock.state.sheet:
+            row.insert(target, row.pop(source))
+
+def test_pending_rows_have_an_email_and_no_status(mock):
+    mock.reset(employees=5, hires=2, completed=1)
+    assert SheetPoller(build_mock_sheets(MOCK_URL)).pending_rows() == [3, 4]
+
+def test_moved_columns_are_re_resolved(mock):
+    mock.reset(employees=5, hires=2, completed=1)
+    poller = SheetPoller(build_mock_sheets(MOCK_URL))
+    assert poller.pending_rows() == [3, 4]
+
+    # Email moves to the front, Overall status to the end
+    move_column(mock, 2, 0)
+    move_column(mock, STATUS, 15)
+    with mock.state.lock:
+        mock.state.sheet[3][15] = "SUCCESS"
+
+    assert poller.pending_rows() == [3]
+    assert (poller.key_col, poller.status_col) == ("A", "P")
+
+def test_without_a_status_column_every_row_with_an_email_is_pending(mock):
+    mock.reset(employees=5, hires=1, completed=1)
+    with mock.state.lock:
+        mock.state.sheet[0][STATUS] = "Status"
+
+    poller = SheetPoller(build_mock_sheets(MOCK_URL))
+    assert poller.pending_rows() == [2, 3]
+    assert poller.status_col is None
+
+def test_status_column_shorter_than_the_email_column(mock):
+    # The API drops the blank statuses at the bottom, so the status column comes back shorter
+    mock.reset(employees=5, hires=2, completed=2)
+    with mock.state.lock:
+        mock.state.sheet[2][STATUS] = ""
+
+    assert SheetPoller(build_mock_sheets(MOCK_URL)).pending_rows() == [3, 4, 5]
+
+class ScriptedStop:
+    """Stands in for the stop event: records each wait and runs the next scripted action instead of sleeping."""
+
+    def __init__(self, actions):
+        self.waits, self.actions = [], list(actions)
+
+    def is_set(self):
+        return not self.actions
+
+    def wait(self, delay):
+        self.waits.append(delay)
+        self.actions.pop(0)()
+
+def test_backoff_resets_when_new_rows_arrive(mock, monkeypatch):
+    mock.reset(employees=5, hires=0, completed=1)
+    passes = []
+    def run_pass(sheets, slack, bamboo_manager, first_row):
+        passes.append(first_row)
+        with mock.state.lock:
+            for row in mock.state.sheet[first_row - 1:]:
+                row[STATUS] = "SUCCESS"
+    monkeypatch.setattr(onboard_watch, "run_pass", run_pass)
+    idle = lambda: None
+    stop = ScriptedStop([idle, idle, lambda: mock.add_row("late@example.com"), idle, idle])
+
+    # On a worker thread, so watch() leaves the test runner's signal handlers alone
+    thread = threading.Thread(target=watch, args=(build_mock_sheets(MOCK_URL), None, None, 1, 8, stop))
+    thread.start()
+    thread.join(timeout=30)
+
+    assert passes == [3]
+    assert stop.waits == [2, 4, 8, 1, 2]
@@ -0,0 +1,76 @@
+import time
+import logging
+
+import pytest
+
+import onboard
+from benchmark_onboard import build_mock_sheets
+from conftest import MOCK_URL
+
+def buffer(**options):
+    return onboard.WriteBackBuffer(build_mock_sheets(MOCK_URL), **options)
+
+def batch_updates(mock):
+    return mock.calls("sheets POST /v4/spreadsheets/mock-sheet/values:batchUpdate")
+
+def statuses(mock):
+    return [(r["Overall status"], r["Notes"]) for r in mock.rows()]
+
+def test_flushes_once_max_rows_are_waiting(mock):
+    mock.reset(employees=5, hires=3)
+    write_backs = buffer(max_rows=2, max_age=60)
+
+    write_backs.add(2, "SUCCESS", "OK")
+    assert batch_updates(mock) == 0
+    write_backs.add(3, "FAILED", "WebWork down")
+
+    assert batch_updates(mock) == 1
+    assert statuses(mock) == [("SUCCESS", "OK"), ("FAILED", "WebWork down"), ("", "")]
+    assert write_backs.due_in() is None
+
+def test_flushes_once_the_oldest_update_is_max_age_old(mock):
+    mock.reset(employees=5, hires=1)
+    write_backs = buffer(max_rows=10, max_age=0.05)
+
+    write_backs.add(2, "SUCCESS", "OK")
+    assert 0 < write_backs.due_in() <= 0.05
+    write_backs.flush_if_due()
+    assert batch_updates(mock) == 0
+
+    time.sleep(0.06)
+    assert write_backs.due_in() == 0
+    write_backs.flush_if_due()
+    assert batch_updates(mock) == 1
+    assert statuses(mock) == [("SUCCESS", "OK")]
+
+def test_finished_rows_are_written_when_a_run_is_interrupted(mock, run_onboarding, monkeypatch):
+    mock.reset(employees=5, hires=2)
+    process_hire = onboard.process_hire
+    def crash_on_second(emp, *args):
+        if emp["Email"] == "hire1@example.com":
+            raise KeyboardInterrupt
+        return process_hire(emp, *args)
+    monkeypatch.setattr(onboard, "process_hire", crash_on_second)
+
+    with pytest.raises(KeyboardInterrupt):
+        run_onboarding()
+
+    assert statuses(mock) == [("SUCCESS", "OK"), ("", "")]
+
+def test_failed_batch_update_is_logged_and_left_for_the_next_run(mock, monkeypatch, caplog):
+    mock.reset(employees=5, hires=2)
+    write_backs = buffer()
+    sheets_execute = onboard.sheets_execute
+    def fail_updates(name, request):
+        if name == "values.batchUpdate":
+            raise onboard.requests.exceptions.ConnectionError("sheets unreachable")
+        return sheets_execute(name, request)
+    monkeypatch.setattr(onboard, "sheets_execute", fail_updates)
+
+    with caplog.at_level(logging.ERROR, logger=onboard.logger.name):
+        write_backs.add_all([(2, "SUCCESS", "OK"), (3, "SUCCESS", "OK")])
+
+    assert "Error updating Google Sheet: sheets unreachable" in caplog.text
+    # The rows stay pending: the next run answers them from the journal
+    assert statuses(mock) == [("", ""), ("", "")]
+    assert write_backs.pending == [] and write_backs.due_in() is None